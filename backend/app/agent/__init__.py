@@ -1,66 +1,103 @@
 from langchain.agents import create_agent
-from langchain.agents.middleware import after_agent, AgentState, ModelRetryMiddleware
+from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRetryMiddleware
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.runtime import Runtime
-from langchain.messages import AIMessage
-from typing import Any
+from langchain.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.runnables import RunnableConfig
+from typing import Any, AsyncIterator, NotRequired
+from agent.cache import cache_tool_results
+from agent.checkpointer import prune_thread
+from agent.context import manage_context
 from agent.llm import llm
-from agent.prompt import SYSTEM_PROMPT
+from agent.prompt import CUSTOMER_SNAPSHOT_PROMPT, SYSTEM_PROMPT
+from agent.response_cache import ResponseCache, is_cacheable
+from agent.router import checked_reply, parse_request, template_reply, turn_messages
+from agent.timing import time_checkpointer, time_model_attempts, time_turns, timed, turn_timing
+from agent.tracing import TraceExporter
+from agent.verification import AMOUNT_TOOLS, LAKH_PATTERN, amounts_match, current_turn
 from agent.tools import (
     verify_identity,
     calculate_emi,
+    calculate_emi_table,
     check_eligibility,
     fetch_credit_report,
+    fetch_customer_snapshot,
     fetch_financial_profile,
     generate_pre_approval,
     search_loan_products
 )
+from config import env
+from db import get_snapshot
+from metrics import AMOUNT_VERIFICATIONS, FAST_PATH, RESPONSE_CACHE
 from netra.decorators import agent
 from netra import Netra, ConversationType, SpanType, UsageModel
+from services.prequalification import Prequalification
 from langgraph.runtime import Runtime
 from langchain.messages import AnyMessage
+import asyncio
+import hashlib
+import json
 import logging
-import re
-from langgraph.types import Overwrite
+import uuid
+import weakref
 
-@after_agent
-def verify_agent_response(state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+class AmountVerificationState(AgentState):
+    last_eligibility_output: NotRequired[str | None]
+
+class AmountVerificationMiddleware(AgentMiddleware):
     """Verify if check_eligibility tool was called and AI response contains lakh figures."""
-    has_eligibility_check = False
-    eligibility_output = None
-    
-    # Check if check_eligibility tool was called in this turn
-    for message in state["messages"]:
-        # Only AIMessage has tool_calls
-        # if isinstance(message, AIMessage) and hasattr(message, "tool_calls"):
-        #     for tool_call in message.tool_calls:
-        #         if tool_call.get("name") == "check_eligibility":
-        #             has_eligibility_check = True
-        if hasattr(message, "type") and message.type == "tool" and hasattr(message, "name"):
-            if message.name == "check_eligibility":
+
+    state_schema = AmountVerificationState
+
+    def _verify(self, state: AmountVerificationState) -> tuple[str | None, dict[str, Any]]:
+        """Returns the LLM verification prompt, if one is needed, and the state updates to apply."""
+
+        updates: dict[str, Any] = {}
+
+        if not state["messages"]:
+            return None, updates
+
+        # Only this turn's messages are scanned, the latest eligibility output from earlier turns is kept in state
+        turn = current_turn(state["messages"])
+        eligibility_output = state.get("last_eligibility_output")
+        for message in reversed(turn):
+            if message.type == "tool" and message.name == "check_eligibility":
                 eligibility_output = message.content
-    
-    # Get the last AI message
-    if not state["messages"]:
-        return None
-    
-    last_message = state["messages"][-1]
-    if not isinstance(last_message, AIMessage):
-        return None
-    
-    ai_message = last_message.content
-    # Handle case where content might not be a string
-    if not isinstance(ai_message, str):
-        return None
-    
-    # Check if AI response contains lakh figures (e.g., "5 lakhs", "5L", "Rs. 5 lakh")
-    # or any large number (5+ digits), with or without comma/dot thousand separators
-    lakh_pattern = r'\d+\.?\d*\s*(?:lakh|lakhs|L\b)|\d{1,3}(?:[,.]?\d{2,3})+'
-    contains_lakh = bool(re.search(lakh_pattern, ai_message, re.IGNORECASE))
-    
-    if contains_lakh:
+                updates["last_eligibility_output"] = eligibility_output
+                break
+
+        # Get the last AI message
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, AIMessage):
+            return None, updates
+
+        ai_message = last_message.content
+        # Handle case where content might not be a string
+        if not isinstance(ai_message, str):
+            return None, updates
+
+        # Check if AI response contains lakh figures
+        if not LAKH_PATTERN.search(ai_message):
+            AMOUNT_VERIFICATIONS.labels(outcome="no_figures").inc()
+            return None, updates
+
+        # Only ask the LLM when a quoted amount cannot be traced back to this turn's tool outputs
+        tool_outputs = [message.content for message in turn if message.type == "tool" and message.name in AMOUNT_TOOLS]
+        if eligibility_output is not None:
+            tool_outputs.append(eligibility_output)
+
+        if amounts_match(ai_message, tool_outputs, has_eligibility_output=eligibility_output is not None):
+            AMOUNT_VERIFICATIONS.labels(outcome="deterministic").inc()
+            return None, updates
+
+        AMOUNT_VERIFICATIONS.labels(outcome="llm").inc()
+
         # Ask LLM to verify and correct the amounts
-        verification_prompt = f"""
+        return f"""
 You are verifying a loan agent's response for accuracy.
 
 Tool Output from check_eligibility:
@@ -79,67 +116,431 @@ If the response is correct, return it as-is.
 If incorrect, return a corrected version that accurately reflects the tool output data.
 If there's no eligibility output, round the amount up to the nearest lakh.
 Return ONLY the corrected response text, nothing else.
-"""
-        
+""", updates
+
+    def _corrected_message(self, state: AmountVerificationState, corrected_response: Any) -> AIMessage:
+        last_message = state["messages"][-1]
+        corrected_text = corrected_response.content if hasattr(corrected_response, "content") else str(corrected_response)
+
+        logging.info(f"Amount verification - Original: {last_message.text[:100]}... | Corrected: {corrected_text[:100]}...")
+
+        # Reusing the id makes the messages reducer replace the reply in place
+        return AIMessage(id=last_message.id, content=corrected_text, tool_calls=last_message.tool_calls, usage_metadata=last_message.usage_metadata) #type: ignore
+
+    def after_agent(self, state: AmountVerificationState, runtime: Runtime) -> dict[str, Any] | None:
+        verification_prompt, updates = self._verify(state)
+        if verification_prompt is None:
+            return updates or None
+
         try:
-            corrected_response = llm.invoke([{"role": "user", "content": verification_prompt}])
-            corrected_text = corrected_response.content if hasattr(corrected_response, "content") else str(corrected_response)
-            
-            logging.info(f"Amount verification - Original: {ai_message[:100]}... | Corrected: {corrected_text[:100]}...")
-            
-            updated_messages = state["messages"].copy()
-
-            updated_messages[-1] = AIMessage(content=corrected_text, tool_calls=last_message.tool_calls, usage_metadata=last_message.usage_metadata)
-            
-            return {"messages": Overwrite(updated_messages)}
+            with timed("verification"):
+                corrected_response = llm.invoke([{"role": "user", "content": verification_prompt}], config={"tags": [TAG_NOSTREAM]})
+            return {**updates, "messages": [self._corrected_message(state, corrected_response)]}
         except Exception as e:
             logging.error(f"Amount verification failed: {e}")
-            return None
-    
-    return None
-
-_agent = create_agent(
-    model=llm,
-    system_prompt=SYSTEM_PROMPT,
-    tools=[
-        verify_identity,
-        calculate_emi,
-        check_eligibility,
-        fetch_credit_report,
-        fetch_financial_profile,
-        generate_pre_approval,
-        search_loan_products
-    ],
-    checkpointer=InMemorySaver(),
-    middleware=[
-        verify_agent_response,
-        ModelRetryMiddleware(
-            max_delay=2,
-            max_retries=5
-        )
-    ]
-)
+            return updates or None
+
+    async def aafter_agent(self, state: AmountVerificationState, runtime: Runtime) -> dict[str, Any] | None:
+        verification_prompt, updates = self._verify(state)
+        if verification_prompt is None:
+            return updates or None
+
+        try:
+            with timed("verification"):
+                corrected_response = await llm.ainvoke([{"role": "user", "content": verification_prompt}], config={"tags": [TAG_NOSTREAM]})
+            return {**updates, "messages": [self._corrected_message(state, corrected_response)]}
+        except Exception as e:
+            logging.error(f"Amount verification failed: {e}")
+            return updates or None
+
+verify_agent_response = AmountVerificationMiddleware()
+
+# Bounds the number of agent turns running at once on an event loop. Turns beyond
+# the limit wait here instead of occupying a threadpool worker.
+_turn_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+def turn_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _turn_slots:
+        _turn_slots[loop] = asyncio.Semaphore(env.MAX_CONCURRENT_TURNS)
+
+    return _turn_slots[loop]
+
+agent_tools = [
+    verify_identity,
+    calculate_emi,
+    calculate_emi_table,
+    check_eligibility,
+    fetch_credit_report,
+    fetch_financial_profile,
+    generate_pre_approval,
+    search_loan_products
+]
+system_prompt = SYSTEM_PROMPT
+
+# Saves the model call between verifying the customer and fetching their reports
+if env.CUSTOMER_SNAPSHOT_TOOL:
+    agent_tools.append(fetch_customer_snapshot)
+    system_prompt += CUSTOMER_SNAPSHOT_PROMPT
+
+def build_agent(model: BaseChatModel, checkpointer: BaseCheckpointSaver):
+    return create_agent(
+        model=model,
+        system_prompt=system_prompt,
+        tools=agent_tools,
+        checkpointer=checkpointer,
+        middleware=[
+            time_turns,
+            verify_agent_response,
+            cache_tool_results,
+            manage_context,
+            ModelRetryMiddleware(
+                max_delay=2,
+                max_retries=5
+            ),
+            time_model_attempts
+        ]
+    )
+
+_agent = build_agent(llm, time_checkpointer(InMemorySaver()))
+
+def use_checkpointer(checkpointer: BaseCheckpointSaver):
+    """Swap the checkpointer the agent stores threads in, e.g. for one opened in the application lifespan."""
+
+    global _agent
+    _agent = _agent.copy(update={"checkpointer": time_checkpointer(checkpointer)})
+
+def use_model(model: BaseChatModel):
+    """Swap the model behind the agent and the amount verification, e.g. for a scripted one in benchmarks. Threads are kept."""
+
+    global _agent, llm
+    llm = model
+    _agent = build_agent(model, _agent.checkpointer) #type: ignore
+
+# Replies to prompts that do not depend on the customer are served without running the agent
+response_cache = ResponseCache(env.RESPONSE_CACHE_MAX_ENTRIES, env.RESPONSE_CACHE_TTL_SECONDS, env.RESPONSE_CACHE_SIMILARITY_THRESHOLD)
+# What a cached reply was answered with besides the prompt, the products come with the database version
+PROMPT_FINGERPRINT = hashlib.sha256(json.dumps([system_prompt, [convert_to_openai_tool(tool) for tool in agent_tools]], sort_keys=True).encode()).hexdigest()
+
+def response_fingerprint() -> tuple[str, int]:
+    return PROMPT_FINGERPRINT, get_snapshot().version
+
+def cached_reply(prompt: str, messages: list[AnyMessage]) -> tuple[str | None, bool]:
+    """
+    The cached reply to a turn, and whether the turn's own reply may be cached. Threads that
+    have called a tool hold customer state, so their turns always run the agent.
+    """
+
+    if not response_cache.enabled or not is_cacheable(prompt) or any(message.type == "tool" for message in messages):
+        RESPONSE_CACHE.labels(outcome="bypass").inc()
+        return None, False
+
+    reply, outcome = response_cache.get(prompt, response_fingerprint())
+    RESPONSE_CACHE.labels(outcome=outcome).inc()
+    return reply, reply is None
+
+def remember_reply(prompt: str, messages: list[AnyMessage]):
+    """Cache the reply of a turn that was answered without calling any tool."""
+
+    turn = current_turn(messages)
+    if any(message.type == "tool" or getattr(message, "tool_calls", None) for message in turn) or not messages[-1].text:
+        return
+
+    response_cache.set(prompt, response_fingerprint(), messages[-1].text)
+
+def cached_turn(prompt: str, reply: str) -> dict[str, Any]:
+    return {"messages": [HumanMessage(content=prompt, id=str(uuid.uuid4())), AIMessage(content=reply, id=str(uuid.uuid4()))]}
+
+# Cached turns are written to the thread as if the agent had just finished them
+CACHED_TURN_NODE = f"{verify_agent_response.name}.after_agent"
+
+def routed_turn(prompt: str, messages: list[AnyMessage]) -> tuple[Prequalification, list[AnyMessage]] | None:
+    """
+    With FAST_PATH_ROUTER, a first turn that names an identifier, an amount and a tenure runs the
+    verification, reports, eligibility and product search in code instead of one model call per
+    step. Returns the prequalification and the turn's messages up to the reply, None for the agent.
+    """
+
+    if not env.FAST_PATH_ROUTER or messages:
+        return None
+
+    request = parse_request(prompt)
+    if request is None:
+        return None
+
+    with timed("tools"):
+        prequalification = Prequalification(request)
+
+    return prequalification, turn_messages(prompt, prequalification)
+
+def phrasing_needed(prequalification: Prequalification) -> bool:
+    # Failed verification is answered the same way every time, without the model
+    if env.FAST_PATH_PHRASING and prequalification.customer is not None:
+        return True
+
+    FAST_PATH.labels(outcome="template").inc()
+    return False
+
+def phrasing_model():
+    # The agent's prompt and tools keep the provider's cached prefix, no tool may be called though
+    return llm.bind_tools(agent_tools, tool_choice="none")
+
+def phrased(reply: Any, prequalification: Prequalification, turn: list[AnyMessage]) -> str:
+    text = reply.text if isinstance(reply, AIMessage) else str(reply)
+    checked = checked_reply(text, prequalification, turn)
+    FAST_PATH.labels(outcome="phrased" if checked == text else "template").inc()
+    return checked
+
+def routed_update(prequalification: Prequalification, turn: list[AnyMessage], reply: str) -> dict[str, Any]:
+    update: dict[str, Any] = {"messages": turn + [AIMessage(content=reply, id=str(uuid.uuid4()))]}
+    # Later turns verify amounts against this eligibility output, as if the agent had checked it
+    for message in turn:
+        if message.type == "tool" and message.name == "check_eligibility":
+            update["last_eligibility_output"] = message.content
+
+    return update
+
+def answer_routed(config: RunnableConfig, thread_id: str, prequalification: Prequalification, turn: list[AnyMessage]) -> str:
+    reply = template_reply(prequalification)
+    if phrasing_needed(prequalification):
+        try:
+            with timed("model"):
+                reply = phrased(phrasing_model().invoke([SystemMessage(content=system_prompt), *turn]), prequalification, turn)
+        except Exception as e:
+            logging.error(f"Phrasing the fast path reply failed: {e}")
+            FAST_PATH.labels(outcome="template").inc()
+
+    _agent.update_state(config, routed_update(prequalification, turn, reply), as_node=CACHED_TURN_NODE)
+    forget_history(thread_id)
+    with timed("trace"):
+        tracer.submit(thread_id, turn + [AIMessage(content=reply)])
+    return reply
+
+async def aanswer_routed(config: RunnableConfig, thread_id: str, prequalification: Prequalification, turn: list[AnyMessage]) -> str:
+    reply = template_reply(prequalification)
+    if phrasing_needed(prequalification):
+        try:
+            async with turn_slots():
+                with timed("model"):
+                    reply = phrased(await phrasing_model().ainvoke([SystemMessage(content=system_prompt), *turn]), prequalification, turn)
+        except Exception as e:
+            logging.error(f"Phrasing the fast path reply failed: {e}")
+            FAST_PATH.labels(outcome="template").inc()
+
+    await _agent.aupdate_state(config, routed_update(prequalification, turn, reply), as_node=CACHED_TURN_NODE)
+    forget_history(thread_id)
+    with timed("trace"):
+        tracer.submit(thread_id, turn + [AIMessage(content=reply)])
+    return reply
+
+def forget_history(thread_id: str):
+    """
+    Drop the checkpoints of a thread in memory before its latest, unless CHECKPOINT_KEEP_HISTORY
+    is set. Database checkpointers are pruned by the eviction pass.
+    """
+
+    if not env.CHECKPOINT_KEEP_HISTORY:
+        with timed("checkpoint"):
+            prune_thread(_agent.checkpointer, thread_id) #type: ignore
+
+def delete_thread(thread_id: str):
+    _agent.checkpointer.delete_thread(thread_id) #type: ignore
+
+async def adelete_thread(thread_id: str) -> bool:
+    """Delete a thread and everything stored for it. Returns whether the thread existed."""
+
+    config: RunnableConfig = {
+        "configurable": {
+            "thread_id": thread_id
+        }
+    }
+    existed = bool((await _agent.aget_state(config)).values.get("messages"))
+    # Also drops the empty entry the in-memory saver makes for a thread it is asked about
+    await _agent.checkpointer.adelete_thread(thread_id) #type: ignore
+    return existed
 
 # @agent(name="Nova")
 def get_response(prompt: str, thread_id: str):
-    response = _agent.invoke({
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }, {
+    config: RunnableConfig = {
+        "configurable": {
+            "thread_id": thread_id
+        }
+    }
+
+    with turn_timing():
+        messages = _agent.get_state(config).values.get("messages", [])
+        routed = routed_turn(prompt, messages)
+        if routed is not None:
+            return answer_routed(config, thread_id, *routed)
+
+        reply, cacheable = cached_reply(prompt, messages)
+        if reply is not None:
+            _agent.update_state(config, cached_turn(prompt, reply), as_node=CACHED_TURN_NODE)
+            messages = _agent.get_state(config).values["messages"]
+            forget_history(thread_id)
+            with timed("trace"):
+                tracer.submit(thread_id, messages)
+            return reply
+
+        response = _agent.invoke({
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }, config)
+        forget_history(thread_id)
+
+        if cacheable:
+            remember_reply(prompt, response["messages"])
+
+        # Pass the actual response messages which include middleware modifications
+        with timed("trace"):
+            tracer.submit(thread_id, response["messages"])
+        return response["messages"][-1].text
+
+async def aget_response(prompt: str, thread_id: str):
+    config: RunnableConfig = {
+        "configurable": {
+            "thread_id": thread_id
+        }
+    }
+
+    with turn_timing():
+        messages = (await _agent.aget_state(config)).values.get("messages", [])
+        routed = routed_turn(prompt, messages)
+        if routed is not None:
+            return await aanswer_routed(config, thread_id, *routed)
+
+        reply, cacheable = cached_reply(prompt, messages)
+        if reply is not None:
+            await _agent.aupdate_state(config, cached_turn(prompt, reply), as_node=CACHED_TURN_NODE)
+            messages = (await _agent.aget_state(config)).values["messages"]
+            forget_history(thread_id)
+            with timed("trace"):
+                tracer.submit(thread_id, messages)
+            return reply
+
+        async with turn_slots():
+            response = await _agent.ainvoke({
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ]
+            }, config)
+            forget_history(thread_id)
+
+        if cacheable:
+            remember_reply(prompt, response["messages"])
+
+        with timed("trace"):
+            tracer.submit(thread_id, response["messages"])
+        return response["messages"][-1].text
+
+async def astream_response(prompt: str, thread_id: str) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    Stream a turn as (event, data) pairs:
+        token      - {"id", "content"} text chunk from the agent model, grouped by message id
+        tool_start - {"id", "name"} the model requested a tool call
+        tool_end   - {"id", "name"} the tool call finished
+        final      - {"response", "corrected"} the final message as stored in the thread. When the amount
+                     verification rewrote the streamed message, corrected is true and clients should replace
+                     the text they rendered from token events with response. With TIMING_HEADER set it
+                     also has "timing", the turn's breakdown in the format of the X-Timing header.
+    """
+
+    with turn_timing() as timing:
+        async for event, data in _astream_turn(prompt, thread_id):
+            if event == "final" and env.TIMING_HEADER:
+                data = {**data, "timing": timing.header()}
+            yield event, data
+
+async def _astream_turn(prompt: str, thread_id: str) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    config: RunnableConfig = {
         "configurable": {
             "thread_id": thread_id
         }
-    })
+    }
+    streamed_text = ""
+
+    messages = (await _agent.aget_state(config)).values.get("messages", [])
+    routed = routed_turn(prompt, messages)
+    if routed is not None:
+        for message in routed[1]:
+            for tool_call in getattr(message, "tool_calls", []):
+                yield "tool_start", {"id": tool_call["id"], "name": tool_call["name"]}
+            if isinstance(message, ToolMessage):
+                yield "tool_end", {"id": message.tool_call_id, "name": message.name}
+
+        reply = await aanswer_routed(config, thread_id, *routed)
+        yield "token", {"id": str(uuid.uuid4()), "content": reply}
+        yield "final", {"response": reply, "corrected": False}
+        return
+
+    reply, cacheable = cached_reply(prompt, messages)
+    if reply is not None:
+        turn = cached_turn(prompt, reply)
+        await _agent.aupdate_state(config, turn, as_node=CACHED_TURN_NODE)
+        forget_history(thread_id)
+        yield "token", {"id": turn["messages"][-1].id, "content": reply}
+        yield "final", {"response": reply, "corrected": False}
+
+        messages = (await _agent.aget_state(config)).values["messages"]
+        with timed("trace"):
+            tracer.submit(thread_id, messages)
+        return
+
+    async with turn_slots():
+        async for mode, chunk in _agent.astream({
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }, config, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                message, metadata = chunk #type: ignore
+                # Only stream the agent model, not the LLM call made by the amount verification
+                if metadata.get("langgraph_node") != "model" or not isinstance(message, AIMessageChunk):
+                    continue
+
+                if message.text:
+                    streamed_text += message.text
+                    yield "token", {"id": message.id, "content": message.text}
+            else:
+                for node, update in chunk.items(): #type: ignore
+                    if not update or node not in ("model", "tools"):
+                        continue
+
+                    for message in update.get("messages", []):
+                        if isinstance(message, AIMessage):
+                            # A new model call restarts the message the client is rendering
+                            streamed_text = message.text
+                            for tool_call in message.tool_calls:
+                                yield "tool_start", {"id": tool_call["id"], "name": tool_call["name"]}
+                        elif isinstance(message, ToolMessage):
+                            yield "tool_end", {"id": message.tool_call_id, "name": message.name}
+
+        messages = (await _agent.aget_state(config)).values["messages"]
+        forget_history(thread_id)
+
+    final_text = messages[-1].text
+    yield "final", {"response": final_text, "corrected": final_text != streamed_text}
+
+    if cacheable:
+        remember_reply(prompt, messages)
+
+    with timed("trace"):
+        tracer.submit(thread_id, messages)
+
+def trace_conversation(thread_id: str, messages: list[AnyMessage] | None = None, start: int = 0):
+    """Trace messages of a thread to Netra. start is the position of the first message in the thread."""
 
-    # Pass the actual response messages which include middleware modifications
-    trace_conversation(thread_id, response["messages"])
-    return response["messages"][-1].text
 
-def trace_conversation(thread_id: str, messages: list[AnyMessage] | None = None):
     # Use provided messages or fetch from state
     if messages is None:
         messages = _agent.get_state({
@@ -158,16 +559,18 @@ def trace_conversation(thread_id: str, messages: list[AnyMessage] | None = None)
 
         tool_calls = {}
 
-        # logging.info(f"{thread_id}: Processing system message: {SYSTEM_PROMPT}")
-        Netra.add_conversation(
-            conversation_type=ConversationType.INPUT,
-            content=SYSTEM_PROMPT,
-            role="System"
-        )
-        agent_span.set_attribute("gen_ai.system.role", "system")
-        agent_span.set_attribute("gen_ai.system.content", SYSTEM_PROMPT)
+        # The system prompt is only traced with the start of the thread
+        if start == 0:
+            # logging.info(f"{thread_id}: Processing system message: {system_prompt}")
+            Netra.add_conversation(
+                conversation_type=ConversationType.INPUT,
+                content=system_prompt,
+                role="System"
+            )
+            agent_span.set_attribute("gen_ai.system.role", "system")
+            agent_span.set_attribute("gen_ai.system.content", system_prompt)
 
-        for i, message in enumerate(messages):
+        for i, message in enumerate(messages, start=start):
             if message.type == "human":
                 # logging.info(f"{thread_id}: Processing human message: {message.text}")
                 Netra.add_conversation(
@@ -220,6 +623,7 @@ def trace_conversation(thread_id: str, messages: list[AnyMessage] | None = None)
                     )
             elif message.type == "tool":
                 # logging.info(f"{thread_id}: Processing tool output: {message.content}")
+                tool_calls.setdefault(message.tool_call_id, {"name": message.name, "args": {}})
                 tool_calls[message.tool_call_id]["output"] = message.content
 
                 with Netra.start_span(tool_calls[message.tool_call_id]["name"], as_type=SpanType.TOOL) as tool_span:
@@ -235,4 +639,6 @@ def trace_conversation(thread_id: str, messages: list[AnyMessage] | None = None)
                 agent_span.set_attribute(f"gen_ai.completion.{i}.role", "tool")
                 agent_span.set_attribute(f"gen_ai.completion.{i}.tool_call_id", message.tool_call_id)
                 agent_span.set_attribute(f"gen_ai.completion.{i}.name", tool_calls[message.tool_call_id]["name"])
-                agent_span.set_attribute(f"gen_ai.completion.{i}.content", str(message.content))
\ No newline at end of file
+                agent_span.set_attribute(f"gen_ai.completion.{i}.content", str(message.content))
+
+tracer = TraceExporter(trace_conversation)
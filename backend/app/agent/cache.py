@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from config import env
+from db import get_snapshot
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain.messages import ToolMessage
+from langchain_core.tools import BaseTool
+from langgraph.types import Command
+from metrics import TOOL_CACHE
+from typing import Any, Awaitable, Callable, Hashable
+import json
+import threading
+import time
+
+# Tools that only read the database or compute from their arguments. verify_identity sets the
+# Netra user and generate_pre_approval issues a reference, so both always run.
+CACHEABLE_TOOLS = frozenset((
+    "fetch_credit_report",
+    "fetch_financial_profile",
+    "check_eligibility",
+    "search_loan_products",
+    "calculate_emi",
+    "calculate_emi_table"
+))
+
+class ToolResultCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: str):
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def normalized_args(tool: BaseTool | None, args: dict[str, Any]) -> str:
+    """Arguments as the tool will see them, so "500000" and 500000 give the same key."""
+
+    if tool is not None:
+        try:
+            args = tool.tool_call_schema.model_validate(args).model_dump() #type: ignore
+        except Exception:
+            pass
+
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+def is_error(message: ToolMessage) -> bool:
+    if message.status == "error":
+        return True
+
+    try:
+        content = json.loads(message.content) #type: ignore
+    except (TypeError, ValueError):
+        return False
+
+    return isinstance(content, dict) and "error" in content
+
+class ToolCacheMiddleware(AgentMiddleware):
+    """
+    Reuses results of read-only tools called again with the same arguments.
+
+    A result is first looked up in the thread's own history, then in a process-wide LRU+TTL
+    cache. Both are keyed on the fingerprint of the db.json the result was computed from, so
+    results computed from other data are never reused, also when the thread was stored by
+    another worker or before a restart. Errors are never cached.
+    """
+
+    def __init__(self, cache: ToolResultCache):
+        super().__init__()
+        self.cache = cache
+        self._fingerprint: str | None = None
+
+    def _key(self, request: ToolCallRequest, fingerprint: str) -> tuple[str, str, str]:
+        return request.tool_call["name"], normalized_args(request.tool, request.tool_call["args"]), fingerprint
+
+    def _current_fingerprint(self) -> str:
+        fingerprint = get_snapshot().fingerprint
+        # Entries of other data can never be hit again, drop them instead of waiting for LRU eviction
+        if fingerprint != self._fingerprint:
+            self.cache.clear()
+            self._fingerprint = fingerprint
+
+        return fingerprint
+
+    def _from_history(self, request: ToolCallRequest, key: tuple[str, str, str]) -> str | None:
+        messages = request.state.get("messages", []) if isinstance(request.state, dict) else []
+        for message in reversed(messages):
+            if message.type == "tool" and message.artifact and message.artifact.get("tool_cache_key") == list(key):
+                return message.content
+
+        return None
+
+    def _lookup(self, request: ToolCallRequest) -> tuple[tuple[str, str, str] | None, ToolMessage | None]:
+        name = request.tool_call["name"]
+        if name not in CACHEABLE_TOOLS:
+            return None, None
+
+        key = self._key(request, self._current_fingerprint())
+
+        content = self._from_history(request, key)
+        outcome = "history_hit"
+        if content is None:
+            content = self.cache.get(key)
+            outcome = "hit"
+
+        if content is None:
+            TOOL_CACHE.labels(tool=name, outcome="miss").inc()
+            return key, None
+
+        TOOL_CACHE.labels(tool=name, outcome=outcome).inc()
+        return key, ToolMessage(content=content, name=name, tool_call_id=request.tool_call["id"], artifact={"tool_cache_key": list(key)})
+
+    def _store(self, key: tuple[str, str, str] | None, result: ToolMessage | Command) -> ToolMessage | Command:
+        if key is None or not isinstance(result, ToolMessage) or is_error(result) or not isinstance(result.content, str):
+            return result
+
+        self.cache.set(key, result.content)
+        # Marks the message in the thread history so a repeated call can reuse it
+        if result.artifact is None:
+            result.artifact = {"tool_cache_key": list(key)}
+
+        return result
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], ToolMessage | Command]) -> ToolMessage | Command:
+        key, cached = self._lookup(request)
+        if cached is not None:
+            return cached
+
+        return self._store(key, handler(request))
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]]) -> ToolMessage | Command:
+        key, cached = self._lookup(request)
+        if cached is not None:
+            return cached
+
+        return self._store(key, await handler(request))
+
+cache_tool_results = ToolCacheMiddleware(ToolResultCache(env.TOOL_CACHE_MAX_ENTRIES, env.TOOL_CACHE_TTL_SECONDS))
@@ -0,0 +1,225 @@
+from config import env
+from contextlib import asynccontextmanager
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from metrics import CHECKPOINT_BYTES, CHECKPOINT_THREADS
+from typing import Any, AsyncIterator
+import asyncio
+import logging
+import time
+import uuid
+
+# Offset between the UUID epoch (1582-10-15) and the unix epoch, in 100ns intervals
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[BaseCheckpointSaver]:
+    """
+    Open the checkpointer selected by the CHECKPOINTER setting.
+
+    memory   - in-process InMemorySaver, lost on restart and private to the worker
+    sqlite   - AsyncSqliteSaver on a WAL-mode database at CHECKPOINT_SQLITE_PATH
+    postgres - AsyncPostgresSaver on a connection pool to CHECKPOINT_POSTGRES_URL
+    """
+
+    if env.CHECKPOINTER == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with aiosqlite.connect(env.CHECKPOINT_SQLITE_PATH) as conn:
+            # WAL lets readers in other workers proceed while a turn is being written
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            logging.info(f"Using SQLite checkpointer at {env.CHECKPOINT_SQLITE_PATH}")
+            yield saver
+    elif env.CHECKPOINTER == "postgres":
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        async with AsyncConnectionPool(
+            env.CHECKPOINT_POSTGRES_URL, #type: ignore
+            min_size=env.CHECKPOINT_POOL_MIN_SIZE,
+            max_size=env.CHECKPOINT_POOL_MAX_SIZE,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False
+        ) as pool:
+            saver = AsyncPostgresSaver(pool) #type: ignore
+            await saver.setup()
+            logging.info(f"Using Postgres checkpointer with a pool of {env.CHECKPOINT_POOL_MIN_SIZE}-{env.CHECKPOINT_POOL_MAX_SIZE} connections")
+            yield saver
+    else:
+        yield InMemorySaver()
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time a checkpoint was written at. Checkpoint ids are time-ordered UUIDv6 values."""
+
+    value = uuid.UUID(checkpoint_id).int
+    timestamp = ((value >> 80) << 12) | ((value >> 64) & 0x0FFF)
+    return (timestamp - _UUID_EPOCH_OFFSET) / 1e7
+
+async def last_checkpoints(saver: BaseCheckpointSaver) -> dict[str, str]:
+    """Latest checkpoint id for every thread in the store."""
+
+    if isinstance(saver, InMemorySaver):
+        return {
+            thread_id: max(checkpoint_id for checkpoints in namespaces.values() for checkpoint_id in checkpoints)
+            for thread_id, namespaces in list(saver.storage.items())
+            if any(namespaces.values())
+        }
+
+    query = "SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id FROM checkpoints GROUP BY thread_id"
+    if env.CHECKPOINTER == "sqlite":
+        async with saver.conn.execute(query) as cursor: #type: ignore
+            return {thread_id: checkpoint_id async for thread_id, checkpoint_id in cursor}
+
+    async with saver.conn.connection() as conn: #type: ignore
+        cursor = await conn.execute(query)
+        return {row["thread_id"]: row["checkpoint_id"] for row in await cursor.fetchall()}
+
+def threads_to_evict(last_checkpoint: dict[str, str], ttl_seconds: int, max_threads: int, now: float | None = None) -> list[str]:
+    """Threads idle for longer than the TTL, then the least recently used threads beyond max_threads."""
+
+    now = now or time.time()
+    by_age = sorted(last_checkpoint.items(), key=lambda item: item[1])
+
+    expired = [thread_id for thread_id, checkpoint_id in by_age if ttl_seconds > 0 and now - checkpoint_time(checkpoint_id) > ttl_seconds]
+    remaining = [thread_id for thread_id, _ in by_age[len(expired):]]
+    overflow = remaining[:max(0, len(remaining) - max_threads)] if max_threads > 0 else []
+
+    return expired + overflow
+
+def prune_thread(saver: BaseCheckpointSaver, thread_id: str):
+    """
+    Delete every checkpoint of a thread in memory but the latest, with the writes and channel
+    values only they refer to. Each checkpoint holds a full copy of the messages as of its step,
+    so a thread otherwise keeps every earlier version of its history. Only the latest one is
+    ever read.
+
+    Only the thread's own entries are looked up, from the ids and channel versions of the
+    checkpoints dropped, so a turn costs the same however many threads are resident. The
+    database checkpointers are pruned in bulk by prune_checkpoints instead.
+    """
+
+    if not isinstance(saver, InMemorySaver):
+        return
+
+    for checkpoint_ns, checkpoints in list(saver.storage.get(thread_id, {}).items()):
+        if len(checkpoints) < 2:
+            continue
+
+        latest = max(checkpoints)
+        versions = saver.serde.loads_typed(checkpoints[latest][0])["channel_versions"]
+        saver.storage[thread_id][checkpoint_ns] = {latest: checkpoints[latest]}
+
+        for checkpoint_id, (checkpoint, _, _) in checkpoints.items():
+            if checkpoint_id == latest:
+                continue
+
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for channel, version in saver.serde.loads_typed(checkpoint)["channel_versions"].items():
+                if versions.get(channel) != version:
+                    saver.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+async def prune_checkpoints(saver: BaseCheckpointSaver):
+    """
+    Delete every checkpoint but the latest of each thread in a database checkpointer, with the
+    writes and channel values only they refer to. Run by the eviction pass rather than after
+    every turn, so a turn does not pay for the deletes.
+    """
+
+    if isinstance(saver, InMemorySaver):
+        return
+
+    if env.CHECKPOINTER == "sqlite":
+        async with saver.lock, saver.conn.cursor() as cursor: #type: ignore
+            await cursor.execute(
+                "DELETE FROM checkpoints WHERE checkpoint_id < "
+                "(SELECT MAX(checkpoint_id) FROM checkpoints AS latest WHERE latest.thread_id = checkpoints.thread_id AND latest.checkpoint_ns = checkpoints.checkpoint_ns)"
+            )
+            await cursor.execute(
+                "DELETE FROM writes WHERE NOT EXISTS "
+                "(SELECT 1 FROM checkpoints WHERE checkpoints.thread_id = writes.thread_id AND checkpoints.checkpoint_ns = writes.checkpoint_ns AND checkpoints.checkpoint_id = writes.checkpoint_id)"
+            )
+            await saver.conn.commit() #type: ignore
+        return
+
+    async with saver.conn.connection() as conn: #type: ignore
+        await conn.execute(
+            "DELETE FROM checkpoints WHERE checkpoint_id < "
+            "(SELECT MAX(checkpoint_id) FROM checkpoints AS latest WHERE latest.thread_id = checkpoints.thread_id AND latest.checkpoint_ns = checkpoints.checkpoint_ns)"
+        )
+        await conn.execute(
+            "DELETE FROM checkpoint_writes WHERE NOT EXISTS "
+            "(SELECT 1 FROM checkpoints WHERE checkpoints.thread_id = checkpoint_writes.thread_id AND checkpoints.checkpoint_ns = checkpoint_writes.checkpoint_ns AND checkpoints.checkpoint_id = checkpoint_writes.checkpoint_id)"
+        )
+        # Channel values are stored once per version, and only the versions of the latest checkpoint are still needed
+        await conn.execute(
+            "DELETE FROM checkpoint_blobs WHERE NOT EXISTS "
+            "(SELECT 1 FROM checkpoints WHERE checkpoints.thread_id = checkpoint_blobs.thread_id AND checkpoints.checkpoint_ns = checkpoint_blobs.checkpoint_ns "
+            "AND checkpoints.checkpoint -> 'channel_versions' ->> checkpoint_blobs.channel = checkpoint_blobs.version)"
+        )
+
+async def resident_usage(saver: BaseCheckpointSaver) -> tuple[int, int]:
+    """Threads in the store and the approximate bytes their checkpoints, writes and channel values take up."""
+
+    if isinstance(saver, InMemorySaver):
+        threads = sum(1 for namespaces in list(saver.storage.values()) if any(namespaces.values()))
+        checkpoint_bytes = sum(
+            len(checkpoint[1]) + len(metadata[1])
+            for namespaces in list(saver.storage.values())
+            for checkpoints in list(namespaces.values())
+            for checkpoint, metadata, _ in list(checkpoints.values())
+        )
+        write_bytes = sum(len(value[1]) for writes in list(saver.writes.values()) for _, _, value, _ in list(writes.values()))
+        blob_bytes = sum(len(value[1]) for value in list(saver.blobs.values()))
+        return threads, checkpoint_bytes + write_bytes + blob_bytes
+
+    if env.CHECKPOINTER == "sqlite":
+        async with saver.conn.execute( #type: ignore
+            "SELECT (SELECT COUNT(DISTINCT thread_id) FROM checkpoints), "
+            "(SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints) + (SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes)"
+        ) as cursor:
+            threads, size = await cursor.fetchone() #type: ignore
+            return threads, size
+
+    async with saver.conn.connection() as conn: #type: ignore
+        cursor = await conn.execute(
+            "SELECT (SELECT COUNT(DISTINCT thread_id) FROM checkpoints) AS threads, "
+            "pg_total_relation_size('checkpoints') + pg_total_relation_size('checkpoint_blobs') + pg_total_relation_size('checkpoint_writes') AS size"
+        )
+        row = await cursor.fetchone()
+        return row["threads"], row["size"]
+
+async def record_usage(saver: BaseCheckpointSaver):
+    threads, size = await resident_usage(saver)
+    CHECKPOINT_THREADS.set(threads)
+    CHECKPOINT_BYTES.set(size)
+
+async def evict_threads(saver: BaseCheckpointSaver) -> int:
+    thread_ids = threads_to_evict(await last_checkpoints(saver), env.CHECKPOINT_THREAD_TTL_SECONDS, env.CHECKPOINT_MAX_THREADS)
+
+    for thread_id in thread_ids:
+        await saver.adelete_thread(thread_id)
+
+    if thread_ids:
+        logging.info(f"Evicted {len(thread_ids)} idle threads from the checkpointer")
+
+    return len(thread_ids)
+
+async def run_thread_eviction(saver: BaseCheckpointSaver) -> Any:
+    """Periodically evict idle threads, prune the rest and record what is left in the store until cancelled."""
+
+    while True:
+        await asyncio.sleep(env.CHECKPOINT_EVICTION_INTERVAL_SECONDS)
+        try:
+            await evict_threads(saver)
+            if not env.CHECKPOINT_KEEP_HISTORY:
+                await prune_checkpoints(saver)
+            await record_usage(saver)
+        except Exception as e:
+            logging.error(f"Thread eviction failed: {e}")
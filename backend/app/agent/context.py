@@ -0,0 +1,166 @@
+from config import env
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import ModelRequest, ModelResponse
+from langchain.messages import AnyMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.runtime import Runtime
+from metrics import CONTEXT_TOKENS, MODEL_INPUT_TOKENS
+from typing import Any, Awaitable, Callable, NotRequired
+
+# Tools with large outputs that are only needed in the turn they were called in
+BULKY_TOOLS = ("search_loan_products", "calculate_emi_table", "calculate_emi")
+
+# Tools whose latest output stays known to the model after the turn it came from is dropped
+KEPT_TOOLS = ("verify_identity", "fetch_customer_snapshot", "fetch_credit_report", "fetch_financial_profile", "check_eligibility")
+
+class ContextState(AgentState):
+    # Messages before context_start are not sent to the model, and outputs of bulky tools
+    # before compact_before are replaced by a placeholder. Both only move when the history
+    # passes the budget, so the messages sent stay a stable prefix between compactions.
+    context_start: NotRequired[int]
+    compact_before: NotRequired[int]
+
+def turn_starts(messages: list[AnyMessage]) -> list[int]:
+    return [i for i, message in enumerate(messages) if message.type == "human"]
+
+def placeholder(name: str) -> str:
+    return f"[Output of {name} from an earlier turn removed to save context. Call {name} again if it is needed.]"
+
+def compacted(message: AnyMessage) -> AnyMessage:
+    if not isinstance(message, ToolMessage) or message.name not in BULKY_TOOLS:
+        return message
+
+    return message.model_copy(update={"content": placeholder(message.name)})
+
+def dropped_turns_note(dropped: list[AnyMessage], last_eligibility_output: str | None) -> SystemMessage:
+    """Stands in for the dropped turns, with the latest output of every tool the rest of the conversation relies on."""
+
+    latest: dict[str, Any] = {}
+    for message in dropped:
+        if message.type == "tool" and message.name in KEPT_TOOLS:
+            latest[message.name] = message.content
+
+    if last_eligibility_output is not None:
+        latest.setdefault("check_eligibility", last_eligibility_output)
+
+    outputs = "\n".join(f"{name}: {content}" for name, content in latest.items())
+    return SystemMessage(content=f"Earlier turns of this conversation were removed to keep it short. The latest outputs of the tools called in them were:\n{outputs}")
+
+class ContextManagementMiddleware(AgentMiddleware):
+    """
+    Keeps the context sent to the model within a token budget on long threads.
+
+    The system prompt and tool schemas are sent first and never change, so providers can
+    cache them as a prompt prefix. When the history passes the budget, outputs of bulky
+    tools from earlier turns are replaced by a placeholder and, if that is not enough, the
+    oldest turns are dropped in favour of a note with the latest outputs of the identity,
+    report and eligibility tools. Only what is sent to the model changes, the thread keeps
+    every message, except that with compact_storage the bulky outputs the model no longer
+    sees are replaced by the same placeholder in the stored thread after each turn.
+    """
+
+    state_schema = ContextState
+
+    def __init__(self, budget: int, target: int, compact_storage: bool = False):
+        super().__init__()
+        self.budget = budget
+        self.target = target
+        self.compact_storage = compact_storage
+
+    def _window(self, state: ContextState) -> list[AnyMessage]:
+        messages = state["messages"]
+        start = state.get("context_start", 0)
+        compact_before = state.get("compact_before", 0)
+
+        window = [compacted(message) if i < compact_before else message for i, message in enumerate(messages) if i >= start]
+        if start > 0:
+            window.insert(0, dropped_turns_note(messages[:start], state.get("last_eligibility_output")))
+
+        return window
+
+    def _compact(self, state: ContextState) -> dict[str, Any] | None:
+        if self.budget <= 0:
+            return None
+
+        messages = state["messages"]
+        if count_tokens_approximately(self._window(state)) <= self.budget:
+            return None
+
+        starts = turn_starts(messages)
+        if not starts:
+            return None
+
+        # Bulky outputs of every earlier turn go first, then whole turns until the rest fits the target
+        current = starts[-1]
+        updates: dict[str, Any] = {"compact_before": current}
+        state = {**state, **updates} #type: ignore
+
+        start = state.get("context_start", 0)
+        for candidate in starts:
+            if candidate < start:
+                continue
+            if count_tokens_approximately(self._window({**state, "context_start": candidate})) <= self.target: #type: ignore
+                updates["context_start"] = candidate
+                break
+        else:
+            updates["context_start"] = current
+
+        return updates
+
+    def before_model(self, state: ContextState, runtime: Runtime) -> dict[str, Any] | None:
+        return self._compact(state)
+
+    async def abefore_model(self, state: ContextState, runtime: Runtime) -> dict[str, Any] | None:
+        return self._compact(state)
+
+    def _compact_storage(self, state: ContextState) -> dict[str, Any] | None:
+        if not self.compact_storage:
+            return None
+
+        # The model already sees these as the placeholder, so the messages sent do not change
+        messages = state["messages"][:state.get("compact_before", 0)]
+        updates = [
+            # Reusing the id replaces the output in place, without the artifact the tool cache would serve it from
+            message.model_copy(update={"content": placeholder(message.name), "artifact": None}) #type: ignore
+            for message in messages
+            if isinstance(message, ToolMessage) and message.name in BULKY_TOOLS and message.content != placeholder(message.name)
+        ]
+
+        return {"messages": updates} if updates else None
+
+    def after_agent(self, state: ContextState, runtime: Runtime) -> dict[str, Any] | None:
+        return self._compact_storage(state)
+
+    async def aafter_agent(self, state: ContextState, runtime: Runtime) -> dict[str, Any] | None:
+        return self._compact_storage(state)
+
+    def _request(self, request: ModelRequest) -> ModelRequest:
+        state: ContextState = request.state #type: ignore
+        window = self._window(state)
+
+        prefix = [request.system_message] if request.system_message else []
+        CONTEXT_TOKENS.labels(stage="before").observe(count_tokens_approximately(prefix + request.messages, tools=request.tools))
+        CONTEXT_TOKENS.labels(stage="after").observe(count_tokens_approximately(prefix + window, tools=request.tools))
+
+        return request.override(messages=window)
+
+    def _record_usage(self, response: ModelResponse):
+        for message in response.result:
+            usage = getattr(message, "usage_metadata", None)
+            if not usage:
+                continue
+
+            MODEL_INPUT_TOKENS.labels(kind="input").observe(usage.get("input_tokens", 0))
+            MODEL_INPUT_TOKENS.labels(kind="cache_read").observe(usage.get("input_token_details", {}).get("cache_read", 0))
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        response = handler(self._request(request))
+        self._record_usage(response)
+        return response
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[ModelResponse]]) -> ModelResponse:
+        response = await handler(self._request(request))
+        self._record_usage(response)
+        return response
+
+manage_context = ContextManagementMiddleware(env.CONTEXT_TOKEN_BUDGET, env.CONTEXT_TARGET_TOKENS, env.COMPACT_STORED_TOOL_OUTPUTS)
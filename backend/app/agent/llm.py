@@ -1,9 +1,17 @@
+from agent.transport import http_clients, llm_guard
 from config import env
 
-from langchain_openai import ChatOpenAI
-from langchain_litellm import ChatLiteLLM
+# Every call to the provider goes through one pool of connections and the quota of the key
+http_client, http_async_client = http_clients(llm_guard)
 
+# Only the selected provider is imported, litellm alone takes seconds to import
 if env.OPENAI_API_KEY:
-    llm = ChatOpenAI(api_key=env.OPENAI_API_KEY, model="gpt-4.1") #type: ignore
+    from langchain_openai import ChatOpenAI
+    # Retries are left to the agent's retry middleware, so a failing call is not retried at two levels
+    llm = ChatOpenAI(api_key=env.OPENAI_API_KEY, base_url=env.OPENAI_BASE_URL, model="gpt-4.1", http_client=http_client, http_async_client=http_async_client, max_retries=0) #type: ignore
 elif env.LITELLM_API_KEY:
-    llm = ChatLiteLLM(api_key=env.LITELLM_API_KEY, api_base="https://llm.keyvalue.systems", model="litellm_proxy/gpt-4.1")
+    import litellm
+    from langchain_litellm import ChatLiteLLM
+    litellm.client_session = http_client
+    litellm.aclient_session = http_async_client
+    llm = ChatLiteLLM(api_key=env.LITELLM_API_KEY, api_base="https://llm.keyvalue.systems", model="litellm_proxy/gpt-4.1", max_retries=0)
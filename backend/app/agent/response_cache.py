@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from typing import Hashable
+import numpy as np
+import re
+import threading
+import time
+import zlib
+
+# Prompts shorter than this depend on the conversation ("yes", "the second one"), not only on themselves
+MIN_WORDS = 3
+# Amounts, phone, Aadhaar and PAN numbers make a turn about one customer
+CUSTOMER_DETAILS_PATTERN = re.compile(r"\d{4,}|\b[a-z]{5}\d{4}[a-z]\b", re.IGNORECASE)
+
+# Size of the hashed character trigram vectors compared for similar prompts
+DIMENSIONS = 512
+
+def normalize(prompt: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+def is_cacheable(prompt: str) -> bool:
+    return len(normalize(prompt).split()) >= MIN_WORDS and not CUSTOMER_DETAILS_PATTERN.search(prompt)
+
+def embed(normalized: str) -> np.ndarray:
+    """A local bag of hashed character trigrams, L2 normalised, so similar wordings have a high dot product."""
+
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    text = f" {normalized} "
+    for i in range(len(text) - 2):
+        h = zlib.crc32(text[i:i + 3].encode())
+        vector[h % DIMENSIONS] += 1 if h & 0x80000000 else -1
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class ResponseCache:
+    """
+    Replies to prompts that do not depend on the customer, by normalised prompt.
+
+    Entries are evicted least recently used and expire after ttl seconds. With a similarity
+    threshold, a prompt without an exact match is also served the reply of the most similar
+    cached prompt if their similarity reaches it. Every entry belongs to a fingerprint of the
+    system prompt, tools and products it was answered with, and a new fingerprint clears them.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, similarity_threshold: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[str, tuple[float, int, str]] = OrderedDict()
+        self._fingerprint: Hashable = None
+        self._lock = threading.Lock()
+
+        # Embeddings of cached prompts by slot, a slot is reused once its entry is evicted
+        self._vectors = np.zeros((max(max_entries, 0) if similarity_threshold > 0 else 0, DIMENSIONS), dtype=np.float32)
+        self._slot_prompts: list[str | None] = [None] * len(self._vectors)
+        self._free_slots = list(range(len(self._vectors) - 1, -1, -1))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _use(self, fingerprint: Hashable):
+        if fingerprint != self._fingerprint:
+            self._clear()
+            self._fingerprint = fingerprint
+
+    def _clear(self):
+        self._entries.clear()
+        self._vectors[:] = 0
+        self._slot_prompts = [None] * len(self._vectors)
+        self._free_slots = list(range(len(self._vectors) - 1, -1, -1))
+
+    def _remove(self, key: str):
+        _, slot, _ = self._entries.pop(key)
+        if slot >= 0:
+            self._vectors[slot] = 0
+            self._slot_prompts[slot] = None
+            self._free_slots.append(slot)
+
+    def _fresh(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, _, response = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return response
+
+    def get(self, prompt: str, fingerprint: Hashable) -> tuple[str | None, str]:
+        """The cached reply to a prompt, if any, and whether it was an exact_hit, a similar_hit or a miss."""
+
+        key = normalize(prompt)
+        with self._lock:
+            self._use(fingerprint)
+
+            response = self._fresh(key)
+            if response is not None:
+                return response, "exact_hit"
+
+            if not len(self._vectors) or not self._entries:
+                return None, "miss"
+
+            similarities = self._vectors @ embed(key)
+            slot = int(np.argmax(similarities))
+            match = self._slot_prompts[slot]
+            if match is None or similarities[slot] < self.similarity_threshold:
+                return None, "miss"
+
+            response = self._fresh(match)
+            return (response, "similar_hit") if response is not None else (None, "miss")
+
+    def set(self, prompt: str, fingerprint: Hashable, response: str):
+        if not self.enabled:
+            return
+
+        key = normalize(prompt)
+        with self._lock:
+            self._use(fingerprint)
+            if key in self._entries:
+                self._remove(key)
+
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            slot = -1
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._vectors[slot] = embed(key)
+                self._slot_prompts[slot] = key
+
+            self._entries[key] = (time.monotonic() + self.ttl, slot, response)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
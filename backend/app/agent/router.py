@@ -0,0 +1,98 @@
+from agent.verification import amounts_match, extract_amounts
+from langchain.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from langgraph.prebuilt.tool_node import msg_content_output
+from schema.eligibility import EligibilityRequest
+from services.prequalification import Prequalification
+import re
+import uuid
+
+PAN_PATTERN = re.compile(r"\b[A-Z]{5}\d{4}[A-Z]\b", re.IGNORECASE)
+AADHAAR_PATTERN = re.compile(r"(?<!\d)\d{4}[ -]?\d{4}[ -]?\d{4}(?!\d)")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+91[ -]?)?[6-9]\d{4}[ -]?\d{5}(?!\d)")
+# Not right after a digit or a decimal point, so "2.5 years" is not read as 5 years
+TENURE_PATTERN = re.compile(r"(?<![\d.])(\d{1,3}(?:\.\d+)?)\s*(months?|mos?|years?|yrs?)\b", re.IGNORECASE)
+
+# Prompts that need the agent's judgement even when they carry all the details, e.g. someone
+# acting for another customer, which ends the conversation
+NEEDS_AGENT_PATTERN = re.compile(r"\b(?:employee|staff|officer|manager|admin|behalf|agent|privileged|ignore|instead)\b", re.IGNORECASE)
+
+def parse_request(prompt: str) -> EligibilityRequest | None:
+    """
+    The eligibility request a prompt makes, when it names exactly one identifier, one amount
+    and one tenure, e.g. "PAN ABCDE1234F, I need 5 lakh for 3 years". None otherwise.
+    """
+
+    if NEEDS_AGENT_PATTERN.search(prompt):
+        return None
+
+    identifiers = [("PAN", match.upper()) for match in PAN_PATTERN.findall(prompt)]
+    identifiers += [("AADHAAR", re.sub(r"\D", "", match)) for match in AADHAAR_PATTERN.findall(prompt)]
+    identifiers += [("PHONE", re.sub(r"\D", "", match)[-10:]) for match in PHONE_PATTERN.findall(prompt)]
+    tenures = TENURE_PATTERN.findall(prompt)
+    if len(identifiers) != 1 or len(tenures) != 1:
+        return None
+
+    # The amount is looked for in what is left once the identifier and tenure are taken out
+    rest = TENURE_PATTERN.sub(" ", PHONE_PATTERN.sub(" ", AADHAAR_PATTERN.sub(" ", PAN_PATTERN.sub(" ", prompt))))
+    amounts = extract_amounts(rest)
+    if len(amounts) != 1 or amounts[0] <= 0:
+        return None
+
+    identifier_type, identifier_value = identifiers[0]
+    tenure, unit = tenures[0]
+    months = float(tenure) * (12 if unit.lower().startswith("y") else 1)
+    # Tenures that are not a whole number of months are left to the agent to clarify
+    if months <= 0 or not months.is_integer():
+        return None
+
+    return EligibilityRequest(identifier_type=identifier_type, identifier_value=identifier_value, requested_amount=int(amounts[0]), loan_tenure_months=int(months)) #type: ignore
+
+def turn_messages(prompt: str, prequalification: Prequalification) -> list[AnyMessage]:
+    """The turn as the agent would have stored it up to its reply: the prompt, then each step's tool calls and outputs."""
+
+    messages: list[AnyMessage] = [HumanMessage(content=prompt, id=str(uuid.uuid4()))]
+    for step in prequalification.steps:
+        calls = [(tool.name, args, output, f"call_{uuid.uuid4().hex[:24]}") for tool, args, output in step]
+        messages.append(AIMessage(
+            content="",
+            id=str(uuid.uuid4()),
+            tool_calls=[{"name": name, "args": args, "id": call_id, "type": "tool_call"} for name, args, _, call_id in calls]
+        ))
+        messages += [
+            ToolMessage(content=msg_content_output(output), name=name, tool_call_id=call_id, id=str(uuid.uuid4()))
+            for name, _, output, call_id in calls
+        ]
+
+    return messages
+
+def template_reply(prequalification: Prequalification) -> str:
+    """A reply written from the tool outputs alone, for when the LLM does not phrase it."""
+
+    if prequalification.customer is None:
+        return "I could not verify your identity with the details provided, please check them and try again."
+    if prequalification.error is not None:
+        return "Something went wrong while checking your eligibility, please try again."
+
+    eligibility = prequalification.eligibility
+    if not eligibility["eligible"]: #type: ignore
+        return f"You are not eligible for this loan: {' '.join(eligibility['rejection_reasons'])}" #type: ignore
+
+    rows = "\n".join(
+        f"| {product['name']} | {product['interest_rate_annual_pct']}% | Rs. {product['max_amount']} | {product['processing_fee_pct']}% |"
+        for product in prequalification.products
+    )
+    return (
+        f"You are eligible for a loan of Rs. {eligibility['max_approved_amount']} over {prequalification.request.loan_tenure_months} months, " #type: ignore
+        f"and these are the products you qualify for:\n\n"
+        f"| Product | Interest rate | Maximum amount | Processing fee |\n|---|---|---|---|\n{rows}"
+    )
+
+def checked_reply(reply: str, prequalification: Prequalification, messages: list[AnyMessage]) -> str:
+    """The phrased reply if every amount it quotes comes from the tool outputs, the template reply otherwise."""
+
+    tool_outputs = [message.content for message in messages if message.type == "tool"]
+    has_eligibility_output = prequalification.eligibility is not None
+    if reply and amounts_match(reply, tool_outputs, has_eligibility_output=has_eligibility_output):
+        return reply
+
+    return template_reply(prequalification)
@@ -0,0 +1,211 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ModelRequest, ModelResponse, ToolCallRequest
+from langchain.messages import ToolMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.types import Command
+from metrics import CHECKPOINT_SECONDS, MODEL_CALL_SECONDS, TOOL_CALL_SECONDS, TURN_PHASE_SECONDS
+from typing import Any, Awaitable, Callable, Iterator
+import functools
+import time
+
+# Phases reported for every turn, in the order of the X-Timing header
+PHASES = ("model", "retry_wait", "tools", "verification", "checkpoint", "trace", "other")
+
+class TurnTiming:
+    """
+    Time spent in each phase of one turn. Phases can overlap: tool calls of one step run
+    concurrently and checkpoints are written in the background, so the phases may add up to
+    more than the turn took. "other" is the rest of the turn, mostly graph overhead.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        # Attempts at model calls are only used to work out retry_wait
+        self.seconds = dict.fromkeys(PHASES + ("attempts",), 0.0)
+        self.counts = dict.fromkeys(PHASES + ("attempts",), 0)
+
+    def add(self, phase: str, seconds: float):
+        self.seconds[phase] += seconds
+        self.counts[phase] += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        # Without retries the gap between model calls and attempts is only the middleware in between
+        if self.counts["attempts"] > self.counts["model"]:
+            self.seconds["retry_wait"] = max(0.0, self.seconds["model"] - self.seconds["attempts"])
+            self.counts["retry_wait"] = self.counts["attempts"] - self.counts["model"]
+        measured = self.seconds["model"] + self.seconds["tools"] + self.seconds["verification"] + self.seconds["trace"]
+        self.seconds["other"] = max(0.0, self.total - measured)
+
+    def header(self) -> str:
+        """The breakdown so far in Server-Timing syntax, e.g. "total;dur=812.4, model;dur=700.1;count=2"."""
+
+        self.finish()
+        phases = [f"total;dur={self.total * 1000:.1f}"]
+        for phase in PHASES:
+            if self.seconds[phase] or phase == "other":
+                count = f";count={self.counts[phase]}" if self.counts[phase] else ""
+                phases.append(f"{phase};dur={self.seconds[phase] * 1000:.1f}{count}")
+
+        return ", ".join(phases)
+
+_current: ContextVar[TurnTiming | None] = ContextVar("nova_turn_timing", default=None)
+
+@contextmanager
+def turn_timing() -> Iterator[TurnTiming]:
+    """
+    Time a turn. Nested calls share the outer turn's timing, so a caller can read the
+    breakdown of a turn timed further down, e.g. to send it as a header.
+    """
+
+    timing = _current.get()
+    if timing is not None:
+        yield timing
+        return
+
+    timing = TurnTiming()
+    _current.set(timing)
+    try:
+        yield timing
+    finally:
+        # Set rather than reset with a token, so it also works across the yields of a streamed turn
+        _current.set(None)
+        timing.finish()
+        for phase in PHASES:
+            TURN_PHASE_SECONDS.labels(phase=phase).observe(timing.seconds[phase])
+        TURN_PHASE_SECONDS.labels(phase="total").observe(timing.total)
+
+def record(phase: str, seconds: float):
+    timing = _current.get()
+    if timing is not None:
+        timing.add(phase, seconds)
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - started)
+
+class TurnTimingMiddleware(AgentMiddleware):
+    """Times model calls, including retries, and tool calls. Goes first so it wraps every other middleware."""
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        with timed("model"):
+            return handler(request)
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[ModelResponse]]) -> ModelResponse:
+        with timed("model"):
+            return await handler(request)
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], ToolMessage | Command]) -> ToolMessage | Command:
+        started = time.perf_counter()
+        try:
+            return handler(request)
+        finally:
+            self._record_tool(request, time.perf_counter() - started)
+
+    async def awrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]]) -> ToolMessage | Command:
+        started = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            self._record_tool(request, time.perf_counter() - started)
+
+    def _record_tool(self, request: ToolCallRequest, seconds: float):
+        TOOL_CALL_SECONDS.labels(tool=request.tool_call["name"]).observe(seconds)
+        record("tools", seconds)
+
+def model_name(model: Any) -> str:
+    """The name of the model a request goes to, e.g. "gpt-4.1", looking through any bound tools."""
+
+    model = getattr(model, "bound", model)
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+class ModelAttemptTimingMiddleware(AgentMiddleware):
+    """
+    Times every attempt at a model call. Goes after ModelRetryMiddleware, so the time a
+    turn spent in model calls but not in attempts is the retries' backoff.
+    """
+
+    def _record(self, request: ModelRequest, started: float, outcome: str):
+        seconds = time.perf_counter() - started
+        MODEL_CALL_SECONDS.labels(model=model_name(request.model), outcome=outcome).observe(seconds)
+        record("attempts", seconds)
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        started = time.perf_counter()
+        try:
+            response = handler(request)
+        except Exception:
+            self._record(request, started, "error")
+            raise
+        self._record(request, started, "ok")
+        return response
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[ModelResponse]]) -> ModelResponse:
+        started = time.perf_counter()
+        try:
+            response = await handler(request)
+        except Exception:
+            self._record(request, started, "error")
+            raise
+        self._record(request, started, "ok")
+        return response
+
+# Checkpointer methods whose time counts as checkpoint I/O
+CHECKPOINT_METHODS = ("get_tuple", "put", "put_writes", "aget_tuple", "aput", "aput_writes")
+
+# Set while a checkpointer call is timed, so backends whose async methods call their sync ones are counted once
+_in_checkpoint: ContextVar[bool] = ContextVar("nova_in_checkpoint", default=False)
+
+def _record_checkpoint(operation: str, seconds: float):
+    CHECKPOINT_SECONDS.labels(operation=operation).observe(seconds)
+    record("checkpoint", seconds)
+
+def _timed_checkpoint(operation: str, method: Callable) -> Callable:
+    if operation.startswith("a"):
+        @functools.wraps(method)
+        async def timed_async(*args: Any, **kwargs: Any):
+            if _in_checkpoint.get():
+                return await method(*args, **kwargs)
+
+            token = _in_checkpoint.set(True)
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                _in_checkpoint.reset(token)
+                _record_checkpoint(operation.removeprefix("a"), time.perf_counter() - started)
+
+        return timed_async
+
+    @functools.wraps(method)
+    def timed_sync(*args: Any, **kwargs: Any):
+        if _in_checkpoint.get():
+            return method(*args, **kwargs)
+
+        token = _in_checkpoint.set(True)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _in_checkpoint.reset(token)
+            _record_checkpoint(operation, time.perf_counter() - started)
+
+    return timed_sync
+
+def time_checkpointer(checkpointer: BaseCheckpointSaver) -> BaseCheckpointSaver:
+    """Time the reads and writes of a checkpointer, whichever backend it is, by wrapping its methods in place."""
+
+    for operation in CHECKPOINT_METHODS:
+        setattr(checkpointer, operation, _timed_checkpoint(operation, getattr(checkpointer, operation)))
+
+    return checkpointer
+
+time_turns = TurnTimingMiddleware()
+time_model_attempts = ModelAttemptTimingMiddleware()
@@ -1,11 +1,40 @@
-from langchain.tools import tool
-from db import get_db
+from langchain.tools import BaseTool, tool
+from db import get_customers, get_products, get_snapshot
+from db.repository import CustomerNotFoundError
 from datetime import date, timedelta
 import logging
 from netra.decorators import task
 from netra import Netra
-import math
+from services.amortization import amortization_schedule, emi_table
+from services.policy import MAX_DEBT_TO_INCOME, POLICY_VERSION, amount_exceeded, credit_score_too_low, debt_to_income_exceeded, rounded_amount, tenure_unavailable
 
+# What verify_identity answers for an identifier no customer has
+CUSTOMER_NOT_FOUND = "Customer does not exist"
+
+def on_event_loop(sync_tool: BaseTool) -> BaseTool:
+    """
+    Give a tool an async version that runs it directly on the event loop, instead of in a worker
+    thread when the agent is awaited. Only for tools that answer from memory without blocking.
+    """
+
+    func = sync_tool.func #type: ignore
+
+    async def coroutine(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    sync_tool.coroutine = coroutine #type: ignore
+    return sync_tool
+
+def identity(customer) -> dict:
+    return {
+        "verified": customer["verified"],
+        "customer_id": customer["customer_id"],
+        "full_name": customer["full_name"],
+        "kyc_status": customer["kyc_status"],
+        "risk_flag": customer["risk_flag"]
+    }
+
+@on_event_loop
 @tool
 # @task
 def verify_identity(identifier_type: str, identifier_value: str):
@@ -18,28 +47,21 @@ def verify_identity(identifier_type: str, identifier_value: str):
     """
 
     try:
-        db = get_db()
         if identifier_type not in ["PAN", "AADHAAR", "PHONE"]:
             logging.error(f"Invalid identifier type: {identifier_type}, value: {identifier_value}")
             return {
                 "error": "invalid identifier type"
             }
 
-        [customer] = [customer for customer in db["customers"] if customer[identifier_type.lower()] == identifier_value]
+        customer = get_customers().find(identifier_type.lower(), identifier_value)
 
         Netra.set_user_id(customer["customer_id"])
 
-        return {
-            "verified": customer["verified"],
-            "customer_id": customer["customer_id"],
-            "full_name": customer["full_name"],
-            "kyc_status": customer["kyc_status"],
-            "risk_flag": customer["risk_flag"]
-        }
-    except IndexError as e:
+        return identity(customer)
+    except CustomerNotFoundError as e:
         logging.error(f"verify_identity - Customer not found: identifier_type={identifier_type}, identifier_value={identifier_value}, error={e}")
         return {
-            "error": "Customer does not exist"
+            "error": CUSTOMER_NOT_FOUND
         }
     except Exception as e:
         logging.error(f"verify_identity - Unexpected error: identifier_type={identifier_type}, identifier_value={identifier_value}, error={e}")
@@ -47,6 +69,7 @@ def verify_identity(identifier_type: str, identifier_value: str):
             "error": "An error occurred"
         }
 
+@on_event_loop
 @tool
 # @task
 def fetch_credit_report(customer_id: str):
@@ -58,10 +81,9 @@ def fetch_credit_report(customer_id: str):
     """
 
     try:
-        db = get_db()
-        [customer] = [customer for customer in db["customers"] if customer["customer_id"] == customer_id]
+        customer = get_customers().get(customer_id)
         return customer["credit_report"]
-    except IndexError as e:
+    except CustomerNotFoundError as e:
         logging.error(f"fetch_credit_report - Customer not found: customer_id={customer_id}, error={e}")
         return {
             "error": "Customer does not exist"
@@ -72,6 +94,7 @@ def fetch_credit_report(customer_id: str):
             "error": "An error occurred"
         }
     
+@on_event_loop
 @tool
 # @task
 def fetch_financial_profile(customer_id: str):
@@ -83,10 +106,9 @@ def fetch_financial_profile(customer_id: str):
     """
 
     try:
-        db = get_db()
-        [customer] = [customer for customer in db["customers"] if customer["customer_id"] == customer_id]
+        customer = get_customers().get(customer_id)
         return customer["financial_profile"]
-    except IndexError as e:
+    except CustomerNotFoundError as e:
         logging.error(f"fetch_financial_profile - Customer not found: customer_id={customer_id}, error={e}")
         return {
             "error": "Customer does not exist"
@@ -97,6 +119,47 @@ def fetch_financial_profile(customer_id: str):
             "error": "An error occurred"
         }
     
+@on_event_loop
+@tool
+# @task
+def fetch_customer_snapshot(identifier_type: str, identifier_value: str):
+    """
+    Verify customer identity using PAN, Aadhaar, or phone number and fetch their credit report and financial profile in one call.
+    Use this instead of calling verify_identity, fetch_credit_report and fetch_financial_profile one after the other.
+
+    Parameters:
+        identifier_type (str): one of these values - "PAN", "AADHAAR", "PHONE"
+        identifier_value (str): value of the identifier type
+    """
+
+    try:
+        if identifier_type not in ["PAN", "AADHAAR", "PHONE"]:
+            logging.error(f"fetch_customer_snapshot - Invalid identifier type: {identifier_type}, value: {identifier_value}")
+            return {
+                "error": "invalid identifier type"
+            }
+
+        customer = get_customers().find(identifier_type.lower(), identifier_value)
+
+        Netra.set_user_id(customer["customer_id"])
+
+        return {
+            "identity": identity(customer),
+            "credit_report": customer["credit_report"],
+            "financial_profile": customer["financial_profile"]
+        }
+    except CustomerNotFoundError as e:
+        logging.error(f"fetch_customer_snapshot - Customer not found: identifier_type={identifier_type}, identifier_value={identifier_value}, error={e}")
+        return {
+            "error": "Customer does not exist"
+        }
+    except Exception as e:
+        logging.error(f"fetch_customer_snapshot - Unexpected error: identifier_type={identifier_type}, identifier_value={identifier_value}, error={e}")
+        return {
+            "error": "An error occurred"
+        }
+
+@on_event_loop
 @tool
 # @task
 def search_loan_products(approved_amount: int, credit_score: int, employment_type: str):
@@ -109,11 +172,8 @@ def search_loan_products(approved_amount: int, credit_score: int, employment_typ
         employment_type (str): Type of employment (e.g., "salaried", "self-employed", "business")
     """
     try:
-        db = get_db()
-        products = [product for product in db["products"] if product["min_credit_score"] <= credit_score]
-
         return {
-            "loan_products": products
+            "loan_products": get_products().search(credit_score, approved_amount, employment_type)
         }
     except Exception as e:
         logging.error(f"search_loan_products - Error: approved_amount={approved_amount}, credit_score={credit_score}, employment_type={employment_type}, error={e}")
@@ -121,6 +181,7 @@ def search_loan_products(approved_amount: int, credit_score: int, employment_typ
             "error": "An error occurred"
         }
     
+@on_event_loop
 @tool
 # @task
 def check_eligibility(customer_id: str, credit_score: int, monthly_income: int, existing_monthly_emi: int, requested_amount: int, employment_type: str, loan_tenure_months: int):
@@ -138,14 +199,15 @@ def check_eligibility(customer_id: str, credit_score: int, monthly_income: int,
     """
 
     try:
-        db = get_db()
-        [customer] = [customer for customer in db["customers"] if customer["customer_id"] == customer_id]
+        # Customers and products come from the same database version even if it is reloaded meanwhile
+        loaded = get_snapshot()
+        products = loaded.products
+        customer = loaded.customers.get(customer_id)
 
         dti = customer["credit_report"]["defaults_last_3_years"] / monthly_income
-        eligible_loan_products = sorted([product for product in db["products"] if product["min_credit_score"] <= credit_score], key=lambda product: product["max_amount"])
-        eligible_loan_products_by_tenure = [product for product in db["products"] if loan_tenure_months in product["available_tenures_months"]]
+        best_max_amount = products.best_max_amount(credit_score)
 
-        appr_requested_amount = math.ceil(requested_amount / 100000) * 100000
+        appr_requested_amount = rounded_amount(requested_amount)
 
         eligibility_payload = {
             "eligible": True,
@@ -153,30 +215,30 @@ def check_eligibility(customer_id: str, credit_score: int, monthly_income: int,
             "requested_amount": appr_requested_amount,
             "debt_to_income_ratio": dti,
             "rejection_reasons": [],
-            "policy_version": "v3.2.1"
+            "policy_version": POLICY_VERSION
         }
 
-        if dti > 0.5:
+        if dti > MAX_DEBT_TO_INCOME:
             eligibility_payload["eligible"] = False
-            eligibility_payload["rejection_reasons"].append(f"Debt-to-income ratio of {dti} exceeds maximum of 0.50")
+            eligibility_payload["rejection_reasons"].append(debt_to_income_exceeded(dti))
         
-        if len(eligible_loan_products) == 0:
+        if best_max_amount is None:
             eligibility_payload["eligible"] = False
-            eligibility_payload["rejection_reasons"].append(f"Credit score {credit_score} is below minimum threshold of 600")
+            eligibility_payload["rejection_reasons"].append(credit_score_too_low(credit_score))
         else:
-            eligibility_payload["max_approved_amount"] = min(appr_requested_amount, eligible_loan_products[-1]["max_amount"])
+            eligibility_payload["max_approved_amount"] = min(appr_requested_amount, best_max_amount)
 
-        if len(eligible_loan_products_by_tenure) == 0:
+        if not products.offers_tenure(loan_tenure_months):
             eligibility_payload["eligible"] = False
-            eligibility_payload["rejection_reasons"].append(f"Requested tenure of {loan_tenure_months} months is not available.")
+            eligibility_payload["rejection_reasons"].append(tenure_unavailable(loan_tenure_months))
 
-        if len(eligible_loan_products) > 0 and eligible_loan_products[-1]["max_amount"] < requested_amount:
+        if best_max_amount is not None and best_max_amount < requested_amount:
             eligibility_payload["eligible"] = False
-            eligibility_payload["rejection_reasons"].append(f"Requested amount of Rs.{requested_amount} is more than the maximum loanable amount")
+            eligibility_payload["rejection_reasons"].append(amount_exceeded(requested_amount))
 
     
         return eligibility_payload
-    except IndexError as e:
+    except CustomerNotFoundError as e:
         logging.error(f"check_eligibility - Customer not found: customer_id={customer_id}, error={e}")
         return {
             "error": "Customer does not exist"
@@ -189,7 +251,7 @@ def check_eligibility(customer_id: str, credit_score: int, monthly_income: int,
     
 @tool
 # @task
-def calculate_emi(principal: int, annual_rate_pct: float, tenure_months: int):
+def calculate_emi(principal: int, annual_rate_pct: float, tenure_months: int, include_schedule: bool = False):
     """
     Calculate exact EMI for a given loan amount, interest rate, and tenure.
 
@@ -197,21 +259,54 @@ def calculate_emi(principal: int, annual_rate_pct: float, tenure_months: int):
         principal (int): The loan principal amount
         annual_rate_pct (int): The annual interest rate as a percentage
         tenure_months (int): The loan tenure in months
+        include_schedule (bool): Also return the month-by-month amortization schedule, only when the customer asks for it
     """
 
     try:
-        r = annual_rate_pct/12/100
-        emi = principal * r * ((1+r)**tenure_months)/((1+r)**tenure_months - 1)
+        result = emi_table([principal], [annual_rate_pct], [tenure_months])[0]
+        if include_schedule:
+            result["schedule"] = amortization_schedule(principal, annual_rate_pct, tenure_months)
 
+        return result
+    except ValueError as e:
+        logging.error(f"calculate_emi - Invalid input: principal={principal}, annual_rate_pct={annual_rate_pct}, tenure_months={tenure_months}, error={e}")
         return {
-            "emi": emi
+            "error": str(e)
         }
     except Exception as e:
         logging.error(f"calculate_emi - Error: principal={principal}, annual_rate_pct={annual_rate_pct}, tenure_months={tenure_months}, error={e}")
         return {
             "error": "An error occurred"
         }
+
+@tool
+# @task
+def calculate_emi_table(principals: list[int], annual_rates_pct: list[float], tenures_months: list[int]):
+    """
+    Calculate EMIs for every combination of loan amounts, interest rates, and tenures in one call. Use this instead of calling calculate_emi repeatedly when comparing options.
+
+    Parameters:
+        principals (list[int]): The loan principal amounts to compare
+        annual_rates_pct (list[float]): The annual interest rates to compare, as percentages (e.g. the rates of the products being compared)
+        tenures_months (list[int]): The loan tenures to compare, in months
+    """
+
+    try:
+        return {
+            "emis": emi_table(principals, annual_rates_pct, tenures_months)
+        }
+    except ValueError as e:
+        logging.error(f"calculate_emi_table - Invalid input: principals={principals}, annual_rates_pct={annual_rates_pct}, tenures_months={tenures_months}, error={e}")
+        return {
+            "error": str(e)
+        }
+    except Exception as e:
+        logging.error(f"calculate_emi_table - Error: principals={principals}, annual_rates_pct={annual_rates_pct}, tenures_months={tenures_months}, error={e}")
+        return {
+            "error": "An error occurred"
+        }
     
+@on_event_loop
 @tool
 # @task
 def generate_pre_approval(customer_id: str, product_id: str, amount: int, annual_rate_pct: float, tenure_months: int):
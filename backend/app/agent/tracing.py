@@ -0,0 +1,106 @@
+from config import env
+from langchain.messages import AnyMessage
+from metrics import TRACE_EXPORT_SECONDS, TRACES
+from typing import Callable
+import logging
+import queue
+import threading
+import time
+import zlib
+
+TraceFunction = Callable[[str, list[AnyMessage], int], None]
+
+def turn_start(messages: list[AnyMessage]) -> int:
+    """Position of the latest human message, where the latest turn starts."""
+
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].type == "human":
+            return i
+
+    return 0
+
+class TraceExporter:
+    """
+    Exports conversation traces to Netra from a background thread.
+
+    Each turn only the messages from its own human message on are queued. They are found from
+    the thread itself rather than remembered per thread, so any worker can trace any turn. The queue
+    is bounded, so when Netra is slow or down turns are dropped instead of slowing down /chat.
+    Threads are sampled as a whole by TRACE_SAMPLE_RATE so sampled conversations stay complete.
+    """
+
+    def __init__(self, trace: TraceFunction):
+        self._trace = trace
+        self._queue: queue.Queue[tuple[str, list[AnyMessage], int]] = queue.Queue(maxsize=env.TRACE_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    def _sampled(self, thread_id: str) -> bool:
+        return zlib.crc32(thread_id.encode()) / 2**32 < env.TRACE_SAMPLE_RATE
+
+    def submit(self, thread_id: str, messages: list[AnyMessage]):
+        """Queue the messages of the thread's latest turn. Never blocks."""
+
+        if not self._sampled(thread_id):
+            TRACES.labels(outcome="sampled_out").inc()
+            return
+
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="netra-trace-exporter", daemon=True)
+                self._worker.start()
+
+        start = turn_start(messages)
+        if start == len(messages):
+            return
+
+        try:
+            self._queue.put_nowait((thread_id, messages[start:], start))
+        except queue.Full:
+            TRACES.labels(outcome="dropped").inc()
+
+    def _next_batch(self) -> list[tuple[str, list[AnyMessage], int]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + env.TRACE_FLUSH_INTERVAL_SECONDS
+        while len(batch) < env.TRACE_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+
+            # Consecutive turns of the same thread are exported as a single trace
+            merged: dict[str, tuple[list[AnyMessage], int, int]] = {}
+            for thread_id, messages, start in batch:
+                if thread_id in merged:
+                    merged_messages, merged_start, turns = merged[thread_id]
+                    merged[thread_id] = (merged_messages + messages, merged_start, turns + 1)
+                else:
+                    merged[thread_id] = (messages, start, 1)
+
+            for thread_id, (messages, start, turns) in merged.items():
+                try:
+                    with TRACE_EXPORT_SECONDS.time():
+                        self._trace(thread_id, messages, start)
+                    TRACES.labels(outcome="exported").inc(turns)
+                except Exception as e:
+                    TRACES.labels(outcome="failed").inc(turns)
+                    logging.error(f"Tracing failed: thread_id={thread_id}, error={e}")
+
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5):
+        """Wait up to timeout seconds for queued traces to be exported."""
+
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
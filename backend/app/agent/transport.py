@@ -0,0 +1,310 @@
+from config import env
+from email.utils import parsedate_to_datetime
+from metrics import LLM_CIRCUIT_OPEN, LLM_IN_FLIGHT, LLM_REQUEST_WAIT_SECONDS, LLM_REQUESTS
+from ratelimit import TokenBucket
+from typing import AsyncIterator, Callable, Iterator
+import asyncio
+import httpx
+import math
+import threading
+import time
+import weakref
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a provider that keeps failing.
+
+    After `failures` failed requests in a row the circuit opens and requests are rejected
+    without being sent for reset_seconds. Then one request at a time is let through, at most
+    one every reset_seconds: if it succeeds the circuit closes, if it fails it opens again.
+    A threshold of 0 never opens it.
+    """
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self._failed = 0
+        self._opened_at: float | None = None
+        self._trial_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            now = time.monotonic()
+            # A trial that never finished, e.g. because it was cancelled, does not block the next one forever
+            if now - self._opened_at < self.reset_seconds or (self._trial_at is not None and now - self._trial_at < self.reset_seconds):
+                return False
+
+            self._trial_at = now
+            return True
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._trial_at = None
+            if ok:
+                self._failed = 0
+                self._opened_at = None
+            else:
+                self._failed += 1
+                if self.failures and (self._failed >= self.failures or self._opened_at is not None):
+                    self._opened_at = time.monotonic()
+
+        LLM_CIRCUIT_OPEN.set(1 if self.is_open else 0)
+
+def retry_after(response: httpx.Response) -> float:
+    """Seconds the provider asked to wait in a Retry-After header, 0 if it did not."""
+
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = response.headers.get("retry-after")
+    if not value:
+        return 0
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+
+class LLMGuard:
+    """
+    Limits on every request to the LLM provider, whether it is a first attempt or a retry:
+    requests in flight, requests per second (a token bucket), and a circuit breaker. The
+    limits are the key's quota split between the worker processes, so that together they
+    never send more than the provider accepts. A rate or concurrency of 0 disables that limit.
+
+    Sync and async requests share the in-flight slots. Async requests first queue, in order, on
+    a semaphore of their event loop of the same size, so only as many of them as could be
+    sent at once contend for the shared slots, and only while sync requests hold some of them.
+    """
+
+    def __init__(self, max_concurrent: int, rate: float, burst: int, breaker: CircuitBreaker):
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._loop_slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.breaker = breaker
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            LLM_REQUESTS.labels(outcome="rejected").inc()
+            raise CircuitOpenError("The LLM provider is failing, requests are paused")
+
+    def acquire(self):
+        self._check_circuit()
+        started = time.perf_counter()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+        except BaseException:
+            self.release_slot()
+            raise
+        LLM_REQUEST_WAIT_SECONDS.observe(time.perf_counter() - started)
+        LLM_IN_FLIGHT.inc()
+
+    async def aacquire(self) -> asyncio.Semaphore | None:
+        """acquire() for requests on an event loop. Returns the loop's semaphore it took, to pass to release()."""
+
+        self._check_circuit()
+        started = time.perf_counter()
+        loop_slots = await self._acquire_loop_slot() if self._slots is not None else None
+        try:
+            if self.bucket is not None:
+                await self.bucket.aacquire()
+        except BaseException:
+            self.release_slot(loop_slots)
+            raise
+        LLM_REQUEST_WAIT_SECONDS.observe(time.perf_counter() - started)
+        LLM_IN_FLIGHT.inc()
+
+        return loop_slots
+
+    async def _acquire_loop_slot(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._loop_slots:
+            self._loop_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        loop_slots = self._loop_slots[loop]
+
+        await loop_slots.acquire()
+        if self._slots.acquire(blocking=False): #type: ignore
+            return loop_slots
+
+        # Sync requests hold the shared slots, wait for one of them in a thread
+        waiting = loop.run_in_executor(None, self._slots.acquire) #type: ignore
+        try:
+            await asyncio.shield(waiting)
+        except BaseException:
+            # The thread still takes the slot, give it back once it has
+            waiting.add_done_callback(lambda _: self._slots.release()) #type: ignore
+            loop_slots.release()
+            raise
+
+        return loop_slots
+
+    def release_slot(self, loop_slots: asyncio.Semaphore | None = None):
+        if self._slots is not None:
+            self._slots.release()
+        if loop_slots is not None:
+            loop_slots.release()
+
+    def release(self, loop_slots: asyncio.Semaphore | None = None):
+        LLM_IN_FLIGHT.dec()
+        self.release_slot(loop_slots)
+
+    def record(self, response: httpx.Response | None):
+        """Record how a request went, None if it failed without a response."""
+
+        if response is None or response.status_code >= 500:
+            outcome = "failed"
+        elif response.status_code == 429:
+            outcome = "throttled"
+            # Retries of every turn wait for the provider's quota to come back rather than adding to the throttling
+            if self.bucket is not None:
+                self.bucket.hold(retry_after(response))
+        elif response.status_code >= 400:
+            outcome = "client_error"
+        else:
+            outcome = "ok"
+
+        LLM_REQUESTS.labels(outcome=outcome).inc()
+        # A throttling provider is up, the rate limiter rather than the breaker deals with it
+        self.breaker.record(outcome != "failed")
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+def _release_once(guard: LLMGuard, loop_slots: asyncio.Semaphore | None = None) -> Callable[[], None]:
+    released = threading.Event()
+
+    def release():
+        if not released.is_set():
+            released.set()
+            guard.release(loop_slots)
+
+    return release
+
+class GuardedTransport(httpx.BaseTransport):
+    """An HTTP transport that holds a slot of the guard from sending a request until its response is closed."""
+
+    def __init__(self, transport: httpx.BaseTransport, guard: LLMGuard):
+        self._transport = transport
+        self._guard = guard
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._guard.acquire()
+        release = _release_once(self._guard)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                self._guard.record(None)
+            release()
+            raise
+
+        self._guard.record(response)
+        return httpx.Response(response.status_code, headers=response.headers, stream=_ReleasingStream(response.stream, release), extensions=response.extensions) #type: ignore
+
+    def close(self):
+        self._transport.close()
+
+class AsyncGuardedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, guard: LLMGuard):
+        self._transport = transport
+        self._guard = guard
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        release = _release_once(self._guard, await self._guard.aacquire())
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                self._guard.record(None)
+            release()
+            raise
+
+        self._guard.record(response)
+        return httpx.Response(response.status_code, headers=response.headers, stream=_AsyncReleasingStream(response.stream, release), extensions=response.extensions) #type: ignore
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+def per_worker(limit: float) -> float:
+    """A limit of the whole key, split between the worker processes."""
+
+    return limit / max(env.WORKERS, 1)
+
+def build_guard() -> LLMGuard:
+    return LLMGuard(
+        max_concurrent=math.ceil(per_worker(env.LLM_MAX_CONCURRENT_REQUESTS)),
+        rate=per_worker(env.LLM_REQUESTS_PER_SECOND),
+        burst=max(1, math.ceil(per_worker(env.LLM_REQUEST_BURST))),
+        breaker=CircuitBreaker(env.LLM_CIRCUIT_FAILURES, env.LLM_CIRCUIT_RESET_SECONDS)
+    )
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=env.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=env.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=env.LLM_KEEPALIVE_SECONDS
+    )
+
+def http_clients(guard: LLMGuard) -> tuple[httpx.Client, httpx.AsyncClient]:
+    """The sync and async HTTP clients every LLM call goes through, on one connection pool each."""
+
+    timeout = httpx.Timeout(env.LLM_TIMEOUT_SECONDS, connect=10)
+    client = httpx.Client(
+        transport=GuardedTransport(httpx.HTTPTransport(limits=pool_limits(), http2=env.LLM_HTTP2), guard),
+        timeout=timeout
+    )
+    async_client = httpx.AsyncClient(
+        transport=AsyncGuardedTransport(httpx.AsyncHTTPTransport(limits=pool_limits(), http2=env.LLM_HTTP2), guard),
+        timeout=timeout
+    )
+
+    return client, async_client
+
+llm_guard = build_guard()
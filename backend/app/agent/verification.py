@@ -0,0 +1,109 @@
+from langchain.messages import AnyMessage
+from typing import Any
+import json
+import re
+
+# Tools whose outputs contain the figures the agent is allowed to quote
+AMOUNT_TOOLS = ("check_eligibility", "calculate_emi", "calculate_emi_table", "search_loan_products")
+
+# Replies that mention lakh figures (e.g., "5 lakhs", "5L", "Rs. 5 lakh") or any large number (5+ digits),
+# with or without comma/dot thousand separators, are the ones the verification hook checks
+LAKH_PATTERN = re.compile(r'\d+\.?\d*\s*(?:lakh|lakhs|L\b)|\d{1,3}(?:[,.]?\d{2,3})+', re.IGNORECASE)
+
+# Rupee figures as the agent writes them: "Rs. 5,00,000", "₹16,488.00", "INR 500000", "5 lakh", "4.5L", "1 crore"
+AMOUNT_PATTERN = re.compile(
+    r"(?<![\w.,-])(?P<currency>₹|\bRs\.?|\bINR)?\s*"
+    r"(?P<number>\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+    r"\s*(?P<unit>lakhs?\b|lacs?\b|L\b|crores?\b|cr\b|rupees\b)?",
+    re.IGNORECASE
+)
+
+UNIT_MULTIPLIERS = {
+    "lakh": 100000,
+    "lakhs": 100000,
+    "lac": 100000,
+    "lacs": 100000,
+    "l": 100000,
+    "crore": 10000000,
+    "crores": 10000000,
+    "cr": 10000000,
+    "rupees": 1
+}
+
+# Quoted figures may be rounded to the rupee, e.g. an EMI of 16488.0032 quoted as Rs. 16,488
+TOLERANCE = 1.0
+
+def current_turn(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """Messages after the latest human message."""
+
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].type == "human":
+            return messages[i + 1:]
+
+    return messages
+
+def extract_amounts(text: str) -> list[float]:
+    """
+    Rupee amounts mentioned in an agent reply, normalised to rupees.
+
+    Only numbers written as money are considered: with a currency marker, a lakh/crore unit,
+    thousands separators, or bare numbers of five to nine digits such as table cells. Tenures,
+    percentages, years and identifiers are ignored.
+    """
+
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(text):
+        number = match.group("number")
+        unit = (match.group("unit") or "").lower()
+        currency = match.group("currency")
+
+        if text[match.end("number"):match.end("number") + 1] == "%":
+            continue
+        # Bare numbers only count at amount scale, below the length of phone and Aadhaar numbers
+        if not currency and not unit and "," not in number and not 5 <= len(number.split(".")[0]) <= 9:
+            continue
+
+        value = float(number.replace(",", ""))
+        amounts.append(round(value * UNIT_MULTIPLIERS.get(unit, 1), 2))
+
+    return amounts
+
+def tool_figures(output: Any) -> set[float]:
+    """All numeric values in a tool output, as stored in a ToolMessage."""
+
+    if isinstance(output, str):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            return {float(number) for number in re.findall(r"\d+(?:\.\d+)?", output)}
+
+    if isinstance(output, bool):
+        return set()
+    if isinstance(output, (int, float)):
+        return {float(output)}
+    if isinstance(output, dict):
+        return set().union(*[tool_figures(value) for value in output.values()])
+    if isinstance(output, list):
+        return set().union(*[tool_figures(value) for value in output])
+
+    return set()
+
+def amounts_match(reply: str, tool_outputs: list[Any], has_eligibility_output: bool) -> bool:
+    """
+    Whether every amount quoted in the reply can be traced back to the tool outputs.
+
+    When no eligibility check has been run, amounts are expected to be rounded to whole lakhs
+    instead, matching what the LLM verification asks for.
+    """
+
+    figures = set().union(*[tool_figures(output) for output in tool_outputs])
+
+    for amount in extract_amounts(reply):
+        if any(abs(amount - figure) <= TOLERANCE for figure in figures):
+            continue
+        if not has_eligibility_output and amount % 100000 == 0:
+            continue
+
+        return False
+
+    return True
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, model_validator
+from typing import Literal
 
 class Environment(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -9,6 +10,122 @@ class Environment(BaseSettings):
 
     LITELLM_API_KEY: str | None = None
     OPENAI_API_KEY: str | None = None
+    OPENAI_BASE_URL: str | None = None
+
+    # Serving: worker processes started by python main.py, and how long a worker waits for in-flight
+    # requests to finish on shutdown. More than one worker needs a shared checkpointer (sqlite or postgres)
+    # and should serve customers from DB_SNAPSHOT_PATH so the workers share one copy of them.
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 1
+    SHUTDOWN_GRACE_SECONDS: int = 30
+    # How long a worker may take to start up or answer the supervisor's health check before it is
+    # restarted. Importing the agent alone takes seconds, more when several workers start together.
+    WORKER_HEALTHCHECK_TIMEOUT_SECONDS: int = 60
+    # Start serving before Netra, the database and the agent are loaded, and load them in the background.
+    # /health/live answers at once, /health/ready once they are loaded, other requests wait for them.
+    LAZY_STARTUP: bool = False
+
+    # Customer database, and an optional memory-mapped snapshot of it shared by all workers
+    DB_PATH: str = "./app/db/db.json"
+    DB_SNAPSHOT_PATH: str | None = None
+    # How often db.json is checked for changes to reload, 0 disables the watcher
+    DB_WATCH_INTERVAL_SECONDS: float = 0
+    # Required in the X-Admin-Key header of /admin endpoints, which answer 404 when it is not set
+    ADMIN_API_KEY: str | None = None
+
+    # Results of read-only tools are reused for repeated calls with the same arguments, until the
+    # database reloads. Set either to 0 to disable the cache, thread history is still reused.
+    TOOL_CACHE_MAX_ENTRIES: int = 10000
+    TOOL_CACHE_TTL_SECONDS: float = 300
+
+    # Offer the agent fetch_customer_snapshot, which verifies a customer and fetches both of their reports in one call
+    CUSTOMER_SNAPSHOT_TOOL: bool = False
+
+    # Approximate tokens of thread history sent to the model before older tool outputs and turns are
+    # trimmed, and what the history is trimmed down to. A budget of 0 sends the whole history.
+    CONTEXT_TOKEN_BUDGET: int = 8000
+    CONTEXT_TARGET_TOKENS: int = 4000
+
+    # Replies to turns that do not depend on the customer are reused for the same normalised prompt, and
+    # with a similarity threshold above 0 also for similar prompts. Set max entries or TTL to 0 to disable it.
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = 0
+
+    # Send each turn's timing breakdown in an X-Timing header of /chat, and in the final event of /chat/stream
+    TIMING_HEADER: bool = False
+
+    # HTTP connection pool to the LLM provider, shared by the agent and the amount verification. HTTP/2 needs
+    # the http2 extra (httpx[http2]).
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_SECONDS: float = 30
+    LLM_HTTP2: bool = False
+    LLM_TIMEOUT_SECONDS: float = 60
+
+    # The LLM key's quota across all workers: requests in flight and requests per second with a burst. Every
+    # attempt counts, retries included, and a 429 pauses requests for its Retry-After. After LLM_CIRCUIT_FAILURES
+    # failed requests in a row (5xx or no response), requests fail without being sent for LLM_CIRCUIT_RESET_SECONDS.
+    # Set any of them to 0 to disable it.
+    LLM_MAX_CONCURRENT_REQUESTS: int = 0
+    LLM_REQUESTS_PER_SECOND: float = 0
+    LLM_REQUEST_BURST: int = 10
+    LLM_CIRCUIT_FAILURES: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30
+
+    # A chat that opens with an identifier, an amount and a tenure is prequalified by calling the
+    # tools in code, with one model call to phrase the reply, or none without FAST_PATH_PHRASING
+    FAST_PATH_ROUTER: bool = False
+    FAST_PATH_PHRASING: bool = True
+
+    # Maximum number of agent turns processed at once across all /chat requests
+    MAX_CONCURRENT_TURNS: int = 64
+
+    # Where conversation threads are stored: memory, sqlite or postgres
+    CHECKPOINTER: Literal["memory", "sqlite", "postgres"] = "memory"
+    CHECKPOINT_SQLITE_PATH: str = "./checkpoints.sqlite"
+    CHECKPOINT_POSTGRES_URL: str | None = None
+    CHECKPOINT_POOL_MIN_SIZE: int = 1
+    CHECKPOINT_POOL_MAX_SIZE: int = 10
+
+    # Threads idle for longer than the TTL are evicted, as are the least recently used
+    # threads beyond CHECKPOINT_MAX_THREADS. Set either to 0 to disable it.
+    CHECKPOINT_THREAD_TTL_SECONDS: int = 24 * 60 * 60
+    CHECKPOINT_MAX_THREADS: int = 10000
+    CHECKPOINT_EVICTION_INTERVAL_SECONDS: int = 300
+
+    # Threads keep only their latest checkpoint unless set, earlier ones are only needed to replay
+    # or fork a thread from a past step, which nothing here does. Threads in memory are pruned after
+    # every turn, sqlite and postgres once every CHECKPOINT_EVICTION_INTERVAL_SECONDS
+    CHECKPOINT_KEEP_HISTORY: bool = False
+
+    # Outputs of bulky tools that context management has replaced by a placeholder are also
+    # replaced in the stored thread, rather than kept in full after the model stopped seeing them
+    COMPACT_STORED_TOOL_OUTPUTS: bool = True
+
+    # Netra tracing runs in the background: the fraction of threads traced, how many turns may wait
+    # for export before new ones are dropped, and how turns are batched per export
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_QUEUE_SIZE: int = 1000
+    TRACE_BATCH_SIZE: int = 50
+    TRACE_FLUSH_INTERVAL_SECONDS: float = 1.0
+
+    # Items run in parallel by the simulation and evaluation runners, and the agent turns per second
+    # they may start on one LLM key (0 disables the limit)
+    SIMULATION_MAX_CONCURRENCY: int = 5
+    EVALUATION_MAX_CONCURRENCY: int = 10
+    RUNNER_TURNS_PER_SECOND: float = 5
+    RUNNER_TURN_BURST: int = 10
+
+    # /chat/batch jobs: turns run at once across all jobs (on top of the runner rate limit), items
+    # queued across jobs before new batches are refused, the items one batch may hold, and how long
+    # and how many finished jobs are kept for polling
+    BATCH_MAX_CONCURRENCY: int = 16
+    BATCH_MAX_PENDING_ITEMS: int = 10000
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_MAX_JOBS: int = 100
+    BATCH_JOB_TTL_SECONDS: float = 3600
 
     @model_validator(mode="after")
     def llm_api_key_validator(self) -> 'Environment':
@@ -17,6 +134,12 @@ class Environment(BaseSettings):
         elif self.LITELLM_API_KEY and self.OPENAI_API_KEY:
             raise AttributeError("More than one LLM api key has been set. Comment one out.")
 
+        if self.WORKERS > 1 and self.CHECKPOINTER == "memory":
+            raise AttributeError("CHECKPOINTER must be sqlite or postgres to run more than one worker, threads in memory are private to a worker")
+
+        if self.CHECKPOINTER == "postgres" and not self.CHECKPOINT_POSTGRES_URL:
+            raise AttributeError("CHECKPOINT_POSTGRES_URL must be set to use the postgres checkpointer")
+
         return self
     
 env = Environment() #type: ignore
\ No newline at end of file
@@ -1,15 +1,150 @@
-import json
+import asyncio
+import gc
+import logging
+import os
+import threading
+import time
 from schema.db import Database
+from db.loader import stream_collections
+from db.products import ProductIndex
+from db.records import CustomerRecord
+from db.repository import CustomerRepository
+from metrics import DB_RELOAD_SECONDS, DB_SNAPSHOT_VERSION
+from typing import TYPE_CHECKING
 
-db: Database | None = None
+if TYPE_CHECKING:
+    from db.snapshot import CustomerSnapshot
 
-def init_db():
-    with open("./app/db/db.json", "r") as f:
-        global db
-        db = json.loads(f.read())
+DB_PATH = "./app/db/db.json"
 
-def get_db():
-    if not db:
+class LoadedDB:
+    """
+    One consistent version of the database: the data and every index built from it.
+
+    A LoadedDB is never modified. Reloading builds a new one and swaps it in, so a tool
+    that takes the current LoadedDB once sees the same data for the rest of its call.
+
+    version counts the loads of this process and starts at 1 again on every start. fingerprint
+    identifies the db.json the data came from across restarts and workers, for anything kept
+    outside the process, such as tool results stored in a thread.
+    """
+
+    def __init__(self, version: int, path: str, snapshot_path: str | None, source_mtime: float, fingerprint: str, db: Database, customers: "CustomerRepository | CustomerSnapshot", products: ProductIndex):
+        self.version = version
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.source_mtime = source_mtime
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.db = db
+        self.customers = customers
+        self.products = products
+
+current: LoadedDB | None = None
+# Serialises reloads, requests never take it
+_reload_lock = threading.Lock()
+
+def _load_json(path: str) -> tuple[list, list]:
+    """Stream db.json and keep every customer as a compact CustomerRecord."""
+
+    loaded: dict[str, list] = {"products": [], "customers": []}
+    for collection, item in stream_collections(path):
+        if collection == "customers":
+            item = CustomerRecord.from_dict(item)
+        loaded.setdefault(collection, []).append(item)
+
+    return loaded["products"], loaded["customers"]
+
+def load_db(version: int, path: str = DB_PATH, snapshot_path: str | None = None) -> LoadedDB:
+    """
+    Load the customer database and build its indexes, without making it current.
+
+    Parameters:
+        version (int): Version number of the loaded database
+        path (str): Path to db.json
+        snapshot_path (str | None): Path to a memory-mapped snapshot of db.json. It is rebuilt when it is
+            missing or older than db.json, and customers are then served from it instead of from memory.
+    """
+
+    # Taken first so a change to db.json while it is loading is picked up by the next reload
+    source = os.stat(path)
+    fingerprint = f"{source.st_mtime_ns:x}-{source.st_size:x}"
+
+    if snapshot_path:
+        # Imported here so python -m db.snapshot does not import itself twice
+        from db.snapshot import CustomerSnapshot, ensure_snapshot
+
+        ensure_snapshot(path, snapshot_path)
+        snapshot = CustomerSnapshot(snapshot_path)
+        customers = snapshot
+        db = {"products": snapshot.products, "customers": snapshot}
+    else:
+        product_list, customer_list = _load_json(path)
+        customers = CustomerRepository(customer_list) #type: ignore
+        db = {"products": product_list, "customers": customer_list}
+
+    return LoadedDB(version, path, snapshot_path, source.st_mtime, fingerprint, db, customers, ProductIndex(db["products"])) #type: ignore
+
+def use_db(loaded: LoadedDB):
+    """Make a loaded database current. Assigning the reference is atomic, so readers see either version whole."""
+
+    global current
+    current = loaded
+    DB_SNAPSHOT_VERSION.set(loaded.version)
+
+def init_db(path: str = DB_PATH, snapshot_path: str | None = None):
+    with _reload_lock:
+        use_db(load_db(1, path, snapshot_path))
+
+    # The first version lives as long as most workers do, so move it out of the collector's reach
+    # instead of rescanning it on every full collection. Only done here, at startup: reloads run
+    # while requests are served, and freezing then would keep their objects from ever being collected
+    gc.freeze()
+
+def reload_db() -> LoadedDB:
+    """
+    Load the database again from the same files and swap it in. Requests keep being served
+    from the current version while the new one is built.
+    """
+
+    with _reload_lock:
+        previous = get_snapshot()
+        started = time.perf_counter()
+        try:
+            loaded = load_db(previous.version + 1, previous.path, previous.snapshot_path)
+        except Exception:
+            DB_RELOAD_SECONDS.labels(outcome="failed").observe(time.perf_counter() - started)
+            raise
+
+        use_db(loaded)
+        DB_RELOAD_SECONDS.labels(outcome="reloaded").observe(time.perf_counter() - started)
+        logging.info(f"Reloaded customer database: version={loaded.version}, customers={len(loaded.customers)}, seconds={time.perf_counter() - started:.2f}")
+
+        return loaded
+
+async def watch_db(interval: float):
+    """Reload the database whenever db.json changes, checking every interval seconds until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            loaded = get_snapshot()
+            if os.path.getmtime(loaded.path) != loaded.source_mtime:
+                await asyncio.to_thread(reload_db)
+        except Exception as e:
+            logging.error(f"Database reload failed: {e}")
+
+def get_snapshot() -> LoadedDB:
+    if current is None:
         raise ValueError("DB is not initialized")
-    
-    return db
\ No newline at end of file
+
+    return current
+
+def get_db():
+    return get_snapshot().db
+
+def get_customers():
+    return get_snapshot().customers
+
+def get_products():
+    return get_snapshot().products
@@ -0,0 +1,97 @@
+import json
+from typing import IO, Any, Iterator
+
+CHUNK_SIZE = 1 << 20
+
+# Characters that may follow a complete value inside the collections
+DELIMITERS = frozenset(" \t\r\n,:]}")
+
+class _StreamReader:
+    """A window over a text file that grows as values are decoded from it."""
+
+    def __init__(self, f: IO[str], chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next character that is not whitespace, or "" at the end of the file."""
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of the streamed JSON")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next value, reading more of the file until the whole value is in the buffer."""
+
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number cut off by the end of the buffer may continue in the next chunk
+                if (end < len(self._buffer) and self._buffer[end] in DELIMITERS) or not self._fill():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+def stream_collections(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, Any]]:
+    """
+    Stream the items of every top level array in a JSON object, one item at a time,
+    without reading the whole file into memory.
+
+    Parameters:
+        path (str): Path to a JSON file like db.json, an object whose values are arrays
+        chunk_size (int): Number of characters read from the file at a time
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _StreamReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+            reader.expect("[")
+
+            if reader.peek() != "]":
+                while True:
+                    yield key, reader.decode()
+                    if reader.peek() != ",":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+
+            if reader.peek() != ",":
+                break
+            reader.expect(",")
+
+        reader.expect("}")
@@ -0,0 +1,80 @@
+from bisect import bisect_right
+from itertools import islice
+from schema.product import Product
+
+class ProductIndex:
+    """
+    Loan products indexed for the eligibility rules.
+
+    Products are kept sorted by min_credit_score, so the products a credit score qualifies
+    for are always a prefix of that order and are found by bisection. Alongside it the index
+    keeps, over that order, the running maximum and minimum max_amount and the products that
+    lend the running maximum, and a map from tenure to products.
+    """
+
+    def __init__(self, products: list[Product]):
+        self._products = sorted(products, key=lambda product: product["min_credit_score"])
+        self._min_credit_scores = [product["min_credit_score"] for product in self._products]
+
+        # _best_max_amounts[i] is the largest max_amount among the first i products, _best_products[i]
+        # the products that lend it and _least_max_amounts[i] the smallest max_amount among them
+        self._best_max_amounts = [0]
+        self._best_products: list[list[Product]] = [[]]
+        self._least_max_amounts = [0]
+        for i, product in enumerate(self._products):
+            best = self._best_max_amounts[-1]
+            if product["max_amount"] > best:
+                self._best_products.append([product])
+            elif product["max_amount"] == best:
+                self._best_products.append(self._best_products[-1] + [product])
+            else:
+                self._best_products.append(self._best_products[-1])
+            self._best_max_amounts.append(max(best, product["max_amount"]))
+            self._least_max_amounts.append(min(self._least_max_amounts[-1], product["max_amount"]) if i else product["max_amount"])
+
+        self._by_tenure: dict[int, list[Product]] = {}
+        for product in self._products:
+            for tenure in product["available_tenures_months"]:
+                self._by_tenure.setdefault(tenure, []).append(product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _qualifying(self, credit_score: int) -> int:
+        return bisect_right(self._min_credit_scores, credit_score)
+
+    def for_credit_score(self, credit_score: int) -> list[Product]:
+        """Products whose minimum credit score the given score meets, lowest threshold first."""
+
+        return self._products[:self._qualifying(credit_score)]
+
+    def best_max_amount(self, credit_score: int) -> int | None:
+        """The largest amount any product available at this credit score lends, or None if there is no such product."""
+
+        qualifying = self._qualifying(credit_score)
+        return self._best_max_amounts[qualifying] if qualifying else None
+
+    def offers_tenure(self, tenure_months: int) -> bool:
+        return tenure_months in self._by_tenure
+
+    def search(self, credit_score: int, approved_amount: int, employment_type: str) -> list[Product]:
+        """
+        Products a customer can take, narrowed to the ones that lend the whole approved amount,
+        or to the ones that come closest when none does.
+
+        When every qualifying product lends the amount, or none does, the answer comes from the
+        index. Only when some do and some do not are the qualifying products filtered.
+
+        Parameters:
+            credit_score (int): The customer's current credit score
+            approved_amount (int): The maximum loan amount approved for the customer
+            employment_type (str): Type of employment. Not used, the products in db.json are offered to every employment type
+        """
+
+        qualifying = self._qualifying(credit_score)
+        if self._least_max_amounts[qualifying] >= approved_amount:
+            return self._products[:qualifying]
+        if self._best_max_amounts[qualifying] < approved_amount:
+            return list(self._best_products[qualifying])
+
+        return [product for product in islice(self._products, qualifying) if product["max_amount"] >= approved_amount]
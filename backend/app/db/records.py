@@ -0,0 +1,149 @@
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Any, Iterator
+import sys
+
+CUSTOMER_FIELDS = ("customer_id", "verified", "full_name", "kyc_status", "risk_flag", "pan", "aadhaar", "phone")
+
+# Nested sections are stored as tuples of their values in this order
+SECTION_FIELDS = {
+    "credit_report": ("credit_score", "active_loans", "defaults_last_3_years", "credit_utilization_pct"),
+    "financial_profile": ("monthly_income", "employer", "employment_type", "employment_tenure_months", "existing_monthly_emi", "average_bank_balance_6m"),
+    "eligibility": ("eligible", "max_approved_amount", "requested_amount", "debt_to_income_ratio", "rejection_reasons", "policy_version")
+}
+
+ACTIVE_LOAN_FIELDS = ("type", "outstanding", "monthly_emi")
+ACTIVE_LOAN_KEYS = frozenset(ACTIVE_LOAN_FIELDS)
+KNOWN_FIELDS = frozenset(CUSTOMER_FIELDS) | frozenset(SECTION_FIELDS)
+SECTION_KEYS = {section: frozenset(fields) for section, fields in SECTION_FIELDS.items()}
+
+# Low-cardinality strings shared by many customers are interned so each value is stored once
+INTERNED_FIELDS = frozenset(("kyc_status", "risk_flag", "employer", "employment_type", "policy_version", "type"))
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<missing>"
+
+MISSING = _Missing()
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _pack_loans(loans: Any) -> Any:
+    if not isinstance(loans, list):
+        return loans
+
+    return tuple(
+        (_intern(loan["type"]), loan["outstanding"], loan["monthly_emi"]) if isinstance(loan, dict) and loan.keys() == ACTIVE_LOAN_KEYS else loan
+        for loan in loans
+    )
+
+def _pack_reasons(reasons: Any) -> Any:
+    return tuple(reasons) if isinstance(reasons, list) else reasons
+
+# How a field is packed, for the fields not stored as they are
+PACKERS = {
+    **{field: _intern for field in INTERNED_FIELDS},
+    "active_loans": _pack_loans,
+    "rejection_reasons": _pack_reasons
+}
+
+# For each tuple layout: a getter for all of its fields at once, its keys, and the fields that need packing
+LAYOUTS = {
+    fields: (itemgetter(*fields), frozenset(fields), tuple((index, PACKERS[field]) for index, field in enumerate(fields) if field in PACKERS))
+    for fields in (CUSTOMER_FIELDS, *SECTION_FIELDS.values())
+}
+
+def _expand(field: str, value: Any) -> Any:
+    if field == "active_loans" and isinstance(value, tuple):
+        return [dict(zip(ACTIVE_LOAN_FIELDS, loan)) if isinstance(loan, tuple) else loan for loan in value]
+    if field == "rejection_reasons" and isinstance(value, tuple):
+        return list(value)
+
+    return value
+
+def _pack(fields: tuple[str, ...], values: dict[str, Any]) -> tuple:
+    getter, keys, packers = LAYOUTS[fields]
+    if values.keys() >= keys:
+        packed = list(getter(values))
+    else:
+        packed = [values.get(field, MISSING) for field in fields]
+
+    for index, packer in packers:
+        packed[index] = packer(packed[index])
+
+    return tuple(packed)
+
+class CustomerRecord(Mapping):
+    """
+    A customer held in __slots__ with its nested sections packed into tuples, instead of
+    nested dicts. It reads like the Customer dict it was built from, and nested sections are
+    rebuilt as plain dicts when they are accessed so tools can return them as they did before.
+    """
+
+    __slots__ = CUSTOMER_FIELDS + tuple(SECTION_FIELDS) + ("extra",)
+
+    @classmethod
+    def from_dict(cls, customer: dict[str, Any]) -> "CustomerRecord":
+        record = cls()
+        extra: dict[str, Any] = {}
+
+        for field, value in zip(CUSTOMER_FIELDS, _pack(CUSTOMER_FIELDS, customer)):
+            setattr(record, field, value)
+
+        for section, fields in SECTION_FIELDS.items():
+            values = customer.get(section, MISSING)
+            if not isinstance(values, dict):
+                setattr(record, section, values)
+                continue
+
+            setattr(record, section, _pack(fields, values))
+            # Anything the layout does not know about is kept as it is
+            if not values.keys() <= SECTION_KEYS[section]:
+                extra[section] = {key: value for key, value in values.items() if key not in SECTION_KEYS[section]}
+
+        if not customer.keys() <= KNOWN_FIELDS:
+            extra.update((key, value) for key, value in customer.items() if key not in KNOWN_FIELDS)
+
+        record.extra = extra or None
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        if key in SECTION_FIELDS:
+            values = getattr(self, key)
+            if values is MISSING:
+                raise KeyError(key)
+            if not isinstance(values, tuple):
+                return values
+
+            section = {field: _expand(field, value) for field, value in zip(SECTION_FIELDS[key], values) if value is not MISSING}
+            if self.extra and key in self.extra:
+                section.update(self.extra[key])
+            return section
+
+        if key in CUSTOMER_FIELDS:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return value
+
+        if self.extra and key in self.extra:
+            return self.extra[key]
+
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in CUSTOMER_FIELDS + tuple(SECTION_FIELDS):
+            if getattr(self, field) is not MISSING:
+                yield field
+
+        if self.extra:
+            yield from (key for key in self.extra if key not in SECTION_FIELDS)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: self[key] for key in self}
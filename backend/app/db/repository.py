@@ -0,0 +1,59 @@
+import logging
+from typing import Iterator
+from schema.customer import Customer
+
+INDEXED_FIELDS = ("customer_id", "pan", "aadhaar", "phone")
+
+class CustomerNotFoundError(LookupError):
+    pass
+
+class CustomerRepository:
+    """
+    Customer store with hash indexes on every identifier the agent tools look customers up by.
+
+    The indexes are built once when the database is loaded so that each lookup is O(1)
+    instead of a scan over the full customer list.
+    """
+
+    def __init__(self, customers: list[Customer]):
+        self._customers = customers
+        self._indexes: dict[str, dict[str, Customer]] = {field: {} for field in INDEXED_FIELDS}
+
+        for customer in customers:
+            for field, index in self._indexes.items():
+                value = customer.get(field)
+                if value is None:
+                    continue
+
+                if value in index:
+                    logging.warning(f"Duplicate {field} in customer data, keeping the first record: {field}={value}")
+                    continue
+
+                index[value] = customer
+
+    def __len__(self) -> int:
+        return len(self._customers)
+
+    def __iter__(self) -> Iterator[Customer]:
+        return iter(self._customers)
+
+    def find(self, field: str, value: str) -> Customer:
+        """
+        Find a customer by one of the indexed identifier fields.
+
+        Parameters:
+            field (str): one of "customer_id", "pan", "aadhaar", "phone"
+            value (str): value of the identifier
+        """
+
+        if field not in self._indexes:
+            raise ValueError(f"{field} is not an indexed customer field")
+
+        customer = self._indexes[field].get(value)
+        if customer is None:
+            raise CustomerNotFoundError(f"No customer with {field}={value}")
+
+        return customer
+
+    def get(self, customer_id: str) -> Customer:
+        return self.find("customer_id", customer_id)
@@ -0,0 +1,183 @@
+"""
+Memory-mapped binary snapshot of db.json.
+
+The snapshot holds every customer as compact JSON in one blob, with an offset per row, and
+for each indexed identifier a sorted array of keys with the row each key belongs to. Workers
+map the file read-only, so they all share the same pages from the OS page cache. Lookups
+bisect the key arrays and only decode the one customer they return.
+
+Build it from the backend directory with:
+    PYTHONPATH=app python -m db.snapshot app/db/db.json app/db/db.snapshot
+"""
+from db.loader import stream_collections
+from db.repository import INDEXED_FIELDS, CustomerNotFoundError
+from schema.customer import Customer
+from schema.product import Product
+from typing import Iterator
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import numpy as np
+
+MAGIC = b"NOVADB01"
+ALIGNMENT = 64
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_snapshot(source: str, path: str):
+    """
+    Build a snapshot of a db.json file. The snapshot is written next to its final path and
+    moved into place, so workers that open it concurrently never see a partial file.
+
+    Parameters:
+        source (str): Path to the db.json file
+        path (str): Path to write the snapshot to
+    """
+
+    products: list[Product] = []
+    offsets = [0]
+    keys: dict[str, list[bytes]] = {field: [] for field in INDEXED_FIELDS}
+    rows: dict[str, list[int]] = {field: [] for field in INDEXED_FIELDS}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=directory) as blob:
+        for collection, item in stream_collections(source):
+            if collection == "products":
+                products.append(item)
+            elif collection == "customers":
+                for field in INDEXED_FIELDS:
+                    if item.get(field) is not None:
+                        keys[field].append(str(item[field]).encode())
+                        rows[field].append(len(offsets) - 1)
+
+                encoded = json.dumps(item, separators=(",", ":")).encode()
+                blob.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+
+        sections: dict[str, np.ndarray] = {"offsets": np.array(offsets, dtype=np.int64)}
+        for field in INDEXED_FIELDS:
+            field_keys = np.array(keys[field], dtype=f"S{max(map(len, keys[field]), default=0) or 1}")
+            # A stable sort keeps duplicates in file order, so a lookup finds the first record like CustomerRepository
+            order = np.argsort(field_keys, kind="stable")
+            sections[f"{field}.keys"] = field_keys[order]
+            sections[f"{field}.rows"] = np.array(rows[field], dtype=np.int64)[order]
+
+            duplicates = int(np.count_nonzero(field_keys[order][1:] == field_keys[order][:-1]))
+            if duplicates:
+                logging.warning(f"{duplicates} duplicate {field} values in customer data, lookups return the first record")
+
+        # Lay the sections out after the header, each aligned so it can be viewed in place
+        layout = {}
+        offset = 0
+        for name, array in sections.items():
+            layout[name] = {"offset": offset, "dtype": array.dtype.str, "count": len(array)}
+            offset = _aligned(offset + array.nbytes)
+        layout["records"] = {"offset": offset, "dtype": "|u1", "count": offsets[-1]}
+
+        header = json.dumps({"customers": len(offsets) - 1, "products": products, "sections": layout}).encode()
+        data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+        output = tempfile.NamedTemporaryFile(dir=directory, prefix=".snapshot-", delete=False)
+        try:
+            with output:
+                output.write(MAGIC + struct.pack("<Q", len(header)) + header)
+                for name, array in sections.items():
+                    output.seek(data_start + layout[name]["offset"])
+                    output.write(array.tobytes())
+
+                output.seek(data_start + layout["records"]["offset"])
+                blob.seek(0)
+                while chunk := blob.read(1 << 20):
+                    output.write(chunk)
+
+            os.replace(output.name, path)
+        except BaseException:
+            os.unlink(output.name)
+            raise
+
+def ensure_snapshot(source: str, path: str) -> bool:
+    """Build the snapshot at path unless one at least as new as source exists. Returns whether it was built."""
+
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return False
+
+    logging.info(f"Building customer snapshot: {path}")
+    write_snapshot(source, path)
+    return True
+
+class CustomerSnapshot:
+    """Read-only customer store backed by a memory-mapped snapshot, with the same lookups as CustomerRepository."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a customer snapshot")
+
+        (header_length,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+        data_start = _aligned(len(MAGIC) + 8 + header_length)
+
+        self.path = path
+        self.products: list[Product] = header["products"]
+        self._count: int = header["customers"]
+        self._sections = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(section["dtype"]), count=section["count"], offset=data_start + section["offset"])
+            for name, section in header["sections"].items()
+        }
+        self._offsets = self._sections["offsets"]
+        self._records_start = data_start + header["sections"]["records"]["offset"]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, row: int) -> Customer:
+        start = self._records_start + int(self._offsets[row])
+        end = self._records_start + int(self._offsets[row + 1])
+        return json.loads(self._mmap[start:end])
+
+    def __iter__(self) -> Iterator[Customer]:
+        for row in range(self._count):
+            yield self._record(row)
+
+    def find(self, field: str, value: str) -> Customer:
+        """
+        Find a customer by one of the indexed identifier fields.
+
+        Parameters:
+            field (str): one of "customer_id", "pan", "aadhaar", "phone"
+            value (str): value of the identifier
+        """
+
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"{field} is not an indexed customer field")
+
+        keys = self._sections[f"{field}.keys"]
+        key = str(value).encode()
+        if len(key) > keys.dtype.itemsize:
+            raise CustomerNotFoundError(f"No customer with {field}={value}")
+
+        # The key must have the array's dtype, otherwise numpy converts the whole array to compare them
+        position = int(np.searchsorted(keys, np.array(key, dtype=keys.dtype)))
+        if position == len(keys) or keys[position] != key:
+            raise CustomerNotFoundError(f"No customer with {field}={value}")
+
+        return self._record(int(self._sections[f"{field}.rows"][position]))
+
+    def get(self, customer_id: str) -> Customer:
+        return self.find("customer_id", customer_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a memory-mapped snapshot of the customer database")
+    parser.add_argument("source", help="path to db.json")
+    parser.add_argument("output", help="path to write the snapshot to")
+    args = parser.parse_args()
+
+    write_snapshot(args.source, args.output)
+    print(f"Wrote {len(CustomerSnapshot(args.output))} customers to {args.output}")
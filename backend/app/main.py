@@ -1,43 +1,84 @@
-from fastapi import FastAPI, Response
+from fastapi import BackgroundTasks, FastAPI, Header, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from schema.chat_request import ChatRequest
-from agent import get_response
+from prometheus_client import CollectorRegistry, make_asgi_app, multiprocess
+from schema.chat_request import BatchChatRequest, ChatRequest
+from schema.eligibility import BatchEligibilityRequest, EligibilityRequest
+import asyncio
+import json
 import logging
+import os
+import secrets
+import tempfile
 import uuid
 import uvicorn
+from typing import AsyncIterator
 from config import env
-from contextlib import asynccontextmanager
-from db import init_db
-from netra import Netra
-from netra.version import __version__ as netra_version
-from netra.instrumentation.instruments import InstrumentSet
-from services.simulation import run_simulation
-from services.evaluation import run_evaluation
+from contextlib import AsyncExitStack, asynccontextmanager
+from db import get_snapshot, init_db, reload_db, watch_db
+from db.repository import CustomerNotFoundError
+from services.eligibility import evaluate_book
+from services.policy import POLICY_VERSION
+from startup import init_tracing, load_agent, startup
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-Netra.init(
-    app_name="Nova Agent",
-    environment=env.ENVIRONMENT,
-    headers=f"x-api-key={env.NETRA_API_KEY}",
-    debug_mode=True,
-    block_instruments={InstrumentSet.FASTAPI, InstrumentSet.LANGCHAIN, InstrumentSet.LITELLM, InstrumentSet.OPENAI, InstrumentSet.REQUESTS, InstrumentSet.HTTPX} #type: ignore
-)
+# Netra and the agent are imported by the routes that use them, once startup has loaded them
+if not env.LAZY_STARTUP:
+    init_tracing()
+    load_agent()
+
+async def start(resources: AsyncExitStack, tasks: list[asyncio.Task]):
+    """Load everything requests need. The checkpointer is closed by resources, tasks are cancelled on shutdown."""
+
+    try:
+        await asyncio.to_thread(init_tracing)
+
+        logging.info("Starting application - initializing database")
+        await asyncio.to_thread(init_db, env.DB_PATH, env.DB_SNAPSHOT_PATH)
+        logging.info("Mock DB has been initialized successfully")
 
-Netra.set_tenant_id("Nova")
+        if env.DB_WATCH_INTERVAL_SECONDS > 0:
+            tasks.append(asyncio.create_task(watch_db(env.DB_WATCH_INTERVAL_SECONDS)))
 
-logging.info(f"Initialised Netra v{netra_version}")
+        agent = await asyncio.to_thread(load_agent)
+        from agent.checkpointer import open_checkpointer, run_thread_eviction
+
+        checkpointer = await resources.enter_async_context(open_checkpointer())
+        agent.use_checkpointer(checkpointer)
+        tasks.append(asyncio.create_task(run_thread_eviction(checkpointer)))
+    except Exception as e:
+        logging.error(f"Startup failed: {e}")
+        startup.finish(e)
+        return
+
+    startup.finish()
+    logging.info(f"Application ready after {startup.ready_after:.1f}s")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logging.info("Starting application - initializing database")
-    init_db()
-    logging.info("Mock DB has been initialized successfully")
-    yield
-    logging.info("Shutting down application")
+    tasks: list[asyncio.Task] = []
+
+    async with AsyncExitStack() as resources:
+        if env.LAZY_STARTUP:
+            # Runs once the port is bound, requests that need it wait for it
+            tasks.append(asyncio.create_task(start(resources, tasks)))
+        else:
+            await start(resources, tasks)
+            if startup.error is not None:
+                raise startup.error
+
+        yield
+        logging.info("Shutting down application")
+        for task in tasks:
+            task.cancel()
+        if startup.ready:
+            await asyncio.to_thread(load_agent().tracer.flush)
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            multiprocess.mark_process_dead(os.getpid())
 
 app = FastAPI(lifespan=lifespan)
 
@@ -46,17 +87,52 @@ app.add_middleware(
     allow_origins=["http://localhost:3000", "http://localhost:8000"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Timing"]
 ) 
 
+def metrics_app():
+    # With several workers each one writes its metrics to PROMETHEUS_MULTIPROC_DIR, and they are merged on scrape
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return make_asgi_app(registry)
+
+    return make_asgi_app()
+
+app.mount("/metrics", metrics_app())
+
+@app.get("/health/live")
+def liveness():
+    return {
+        "status": "alive"
+    }
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    if not startup.ready:
+        response.status_code = 503
+
+    return startup.status()
+
 @app.post("/chat")
-def chat(chat: ChatRequest, response: Response):
+async def chat(chat: ChatRequest, response: Response):
     try:
+        await startup.await_ready()
+        from agent import aget_response
+        from agent.timing import turn_timing
+        from netra import Netra
+
         thread_id = chat.thread_id or uuid.uuid4().hex
         Netra.set_session_id(thread_id)
 
+        with turn_timing() as timing:
+            reply = await aget_response(chat.prompt, thread_id)
+            if env.TIMING_HEADER:
+                response.headers["X-Timing"] = timing.header()
+
         return {
-            "response": get_response(chat.prompt, thread_id),
+            "response": reply,
             "thread_id": thread_id
         }
     except Exception as e:
@@ -66,9 +142,185 @@ def chat(chat: ChatRequest, response: Response):
             "error": "An error occurred"
         }
     
+@app.post("/chat/stream")
+async def chat_stream(chat: ChatRequest):
+    thread_id = chat.thread_id or uuid.uuid4().hex
+
+    async def events():
+        yield f"event: thread\ndata: {json.dumps({'thread_id': thread_id})}\n\n"
+        try:
+            await startup.await_ready()
+            from agent import astream_response
+            from netra import Netra
+
+            Netra.set_session_id(thread_id)
+            async for event, data in astream_response(chat.prompt, thread_id):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logging.error(msg=e)
+            yield f"event: error\ndata: {json.dumps({'error': 'An error occurred'})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.delete("/chat/{thread_id}")
+async def delete_chat(thread_id: str, response: Response):
+    try:
+        await startup.await_ready()
+        from agent import adelete_thread
+
+        if not await adelete_thread(thread_id):
+            response.status_code = 404
+            return {
+                "error": "Thread not found"
+            }
+
+        return {
+            "thread_id": thread_id,
+            "deleted": True
+        }
+    except Exception as e:
+        logging.error(msg=e)
+        response.status_code = 500
+        return {
+            "error": "An error occurred"
+        }
+
+def ndjson(lines: AsyncIterator[dict]) -> StreamingResponse:
+    async def body():
+        async for line in lines:
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def submit_batch(batch: BatchChatRequest, response: Response):
+    """The started job, or the error to answer with when the batch is refused."""
+
+    if len(batch.items) > env.BATCH_MAX_ITEMS:
+        response.status_code = 413
+        return None, {
+            "error": f"A batch may hold at most {env.BATCH_MAX_ITEMS} items"
+        }
+
+    await startup.await_ready()
+    from services.batch import TooManyPendingItemsError, batch_runner
+
+    try:
+        return batch_runner.submit(batch.items, batch.keep_threads), None
+    except TooManyPendingItemsError as e:
+        logging.error(msg=e)
+        response.status_code = 429
+        response.headers["Retry-After"] = "60"
+        return None, {
+            "error": "Too many batch items are pending, retry later"
+        }
+
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchChatRequest, response: Response):
+    """
+    Answer many prompts at once, streaming NDJSON: a line with the job_id, a line per item as
+    it finishes ({"seq", "index", "thread_id", "response"} or "error" instead of "response"),
+    and a last line with the job's summary. The job keeps running if the client disconnects,
+    it can resume from GET /chat/batch/{job_id}/results?after=<next seq>.
+    """
+
+    try:
+        job, error = await submit_batch(batch, response)
+        if job is None:
+            return error
+
+        async def lines():
+            yield {"job_id": job.id, "items": len(job.items)}
+            async for result in job.follow():
+                yield result
+            yield job.summary()
+
+        return ndjson(lines())
+    except Exception as e:
+        logging.error(msg=e)
+        response.status_code = 500
+        return {
+            "error": "An error occurred"
+        }
+
+@app.post("/chat/batch/jobs", status_code=202)
+async def start_batch_job(batch: BatchChatRequest, response: Response):
+    try:
+        job, error = await submit_batch(batch, response)
+        if job is None:
+            return error
+
+        return job.summary()
+    except Exception as e:
+        logging.error(msg=e)
+        response.status_code = 500
+        return {
+            "error": "An error occurred"
+        }
+
+async def batch_job(job_id: str, response: Response):
+    """
+    The job, or None with a 404 set. Jobs are kept by the worker that accepted them, and only
+    read or changed on its event loop, so every route that uses them is async.
+    """
+
+    await startup.await_ready()
+    from services.batch import batch_runner
+
+    job = batch_runner.get(job_id)
+    if job is None:
+        response.status_code = 404
+
+    return job
+
+@app.get("/chat/batch/{job_id}")
+async def batch_job_status(job_id: str, response: Response, after: int = 0):
+    job = await batch_job(job_id, response)
+    if job is None:
+        return {
+            "error": "Batch job not found"
+        }
+
+    return {
+        **job.summary(),
+        "results": job.results[after:]
+    }
+
+@app.get("/chat/batch/{job_id}/results")
+async def batch_job_results(job_id: str, response: Response, after: int = 0):
+    """The job's results from seq `after` on as NDJSON, following the job until it is over."""
+
+    job = await batch_job(job_id, response)
+    if job is None:
+        return {
+            "error": "Batch job not found"
+        }
+
+    async def lines():
+        async for result in job.follow(after):
+            yield result
+        yield job.summary()
+
+    return ndjson(lines())
+
+@app.delete("/chat/batch/{job_id}")
+async def cancel_batch_job(job_id: str, response: Response):
+    job = await batch_job(job_id, response)
+    if job is None:
+        return {
+            "error": "Batch job not found"
+        }
+
+    from services.batch import batch_runner
+
+    await batch_runner.cancel(job)
+    return job.summary()
+
 @app.post("/simulation/{dataset_id}")
 def start_simulation(dataset_id: str, response: Response):
     try:
+        startup.wait()
+        from services.simulation import run_simulation
+
         result = run_simulation(dataset_id)
         if not result:
             raise ValueError("Simulation failed")
@@ -84,6 +336,9 @@ def start_simulation(dataset_id: str, response: Response):
 @app.post("/single-turn/{dataset_id}")
 def run_single_turn_evaluation(dataset_id: str, response: Response):
     try:
+        startup.wait()
+        from services.evaluation import run_evaluation
+
         result = run_evaluation(dataset_id)
         if not result:
             raise ValueError("Evaluation failed")
@@ -96,11 +351,152 @@ def run_single_turn_evaluation(dataset_id: str, response: Response):
             "error": "An error occurred"
         }
 
+@app.post("/eligibility")
+def eligibility(request: EligibilityRequest, response: Response):
+    """Prequalify one customer by running the agent's tools in code, without calling the LLM."""
+
+    try:
+        startup.wait()
+        from metrics import FAST_PATH
+        from services.prequalification import Prequalification
+
+        prequalification = Prequalification(request)
+        if prequalification.status == "failed":
+            raise ValueError(prequalification.error)
+        if prequalification.status != "ok":
+            response.status_code = 404 if prequalification.status == "not_found" else 403
+            return {
+                "error": prequalification.error
+            }
+
+        FAST_PATH.labels(outcome="api").inc()
+        return {
+            "policy_version": POLICY_VERSION,
+            **prequalification.result()
+        }
+    except Exception as e:
+        logging.error(msg=e)
+        response.status_code = 500
+        return {
+            "error": "An error occurred"
+        }
+
+@app.post("/eligibility/batch")
+def batch_eligibility(request: BatchEligibilityRequest, response: Response):
+    try:
+        startup.wait()
+        result = evaluate_book(request.requested_amount, request.loan_tenure_months, request.customer_ids)
+
+        return {
+            "policy_version": POLICY_VERSION,
+            "customers": len(result),
+            "eligible": int(result.eligible.sum()),
+            "decisions": result.decisions()
+        }
+    except CustomerNotFoundError as e:
+        logging.error(msg=e)
+        response.status_code = 404
+        return {
+            "error": "Customer does not exist"
+        }
+    except Exception as e:
+        logging.error(msg=e)
+        response.status_code = 500
+        return {
+            "error": "An error occurred"
+        }
+
+def db_status() -> dict:
+    startup.wait()
+    loaded = get_snapshot()
+    return {
+        # Every worker loads and reloads its own copy, this is the one that served the request
+        "worker": os.getpid(),
+        "version": loaded.version,
+        "customers": len(loaded.customers),
+        "products": len(loaded.products),
+        "loaded_at": loaded.loaded_at,
+        "source_mtime": loaded.source_mtime,
+        "fingerprint": loaded.fingerprint
+    }
+
+def admin_error(admin_key: str | None, response: Response) -> dict | None:
+    """
+    The error to answer an /admin request with, None if the key is right. Without ADMIN_API_KEY
+    the admin endpoints are not served at all, rather than open to every client.
+    """
+
+    if not env.ADMIN_API_KEY:
+        response.status_code = 404
+        return {
+            "error": "Not found"
+        }
+
+    if admin_key is None or not secrets.compare_digest(admin_key, env.ADMIN_API_KEY):
+        response.status_code = 401
+        return {
+            "error": "Unauthorized"
+        }
+
+    return None
+
+@app.get("/admin/db")
+def database_status(response: Response, x_admin_key: str | None = Header(default=None)):
+    error = admin_error(x_admin_key, response)
+    if error is not None:
+        return error
+
+    return db_status()
+
+@app.post("/admin/db/reload", status_code=202)
+def reload_database(background_tasks: BackgroundTasks, response: Response, x_admin_key: str | None = Header(default=None)):
+    error = admin_error(x_admin_key, response)
+    if error is not None:
+        return error
+
+    # The new version is built after the response is sent, requests keep using the current one meanwhile
+    background_tasks.add_task(reload_db)
+
+    return {
+        "status": "reloading",
+        **db_status()
+    }
+
+@app.post("/admin/response-cache/clear")
+def clear_response_cache(response: Response, x_admin_key: str | None = Header(default=None)):
+    error = admin_error(x_admin_key, response)
+    if error is not None:
+        return error
+
+    startup.wait()
+    from agent import response_cache
+
+    # Replies are also dropped on their own when the prompt, tools or database version change
+    cleared = len(response_cache)
+    response_cache.clear()
+
+    return {
+        "cleared": cleared
+    }
+
 if __name__ == "__main__":
+    if env.WORKERS > 1:
+        # Built once here rather than by every worker at once
+        if env.DB_SNAPSHOT_PATH:
+            from db.snapshot import ensure_snapshot
+            ensure_snapshot(env.DB_PATH, env.DB_SNAPSHOT_PATH)
+
+        # Must be set before the workers import prometheus_client
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="nova-metrics-"))
+
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=env.ENVIRONMENT == "dev",
+        host=env.HOST,
+        port=env.PORT,
+        workers=env.WORKERS,
+        reload=env.ENVIRONMENT == "dev" and env.WORKERS == 1,
+        # Stop accepting requests and let in-flight turns finish before the worker exits
+        timeout_graceful_shutdown=env.SHUTDOWN_GRACE_SECONDS,
+        timeout_worker_healthcheck=env.WORKER_HEALTHCHECK_TIMEOUT_SECONDS,
         log_level="info"
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,142 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+AMOUNT_VERIFICATIONS = Counter(
+    "nova_amount_verifications_total",
+    "Agent replies checked by the amount verification hook, by how they were resolved",
+    ["outcome"]
+)
+
+TRACES = Counter(
+    "nova_traces_total",
+    "Conversation turns handled by the background Netra exporter, by outcome",
+    ["outcome"]
+)
+
+DB_SNAPSHOT_VERSION = Gauge(
+    "nova_db_snapshot_version",
+    "Version of the customer database currently served, incremented on every reload",
+    # Each worker reloads on its own, so with several workers every live worker reports its version
+    multiprocess_mode="liveall"
+)
+
+DB_RELOAD_SECONDS = Histogram(
+    "nova_db_reload_seconds",
+    "Time taken to load a new version of the customer database and its indexes, by outcome",
+    ["outcome"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+TOOL_CACHE = Counter(
+    "nova_tool_cache_total",
+    "Calls to cacheable tools, by tool and whether the result came from the thread history, the cache or the tool",
+    ["tool", "outcome"]
+)
+
+CONTEXT_TOKENS = Histogram(
+    "nova_context_tokens",
+    "Approximate input tokens of a model call, before and after context management trims the history",
+    ["stage"],
+    buckets=(1000, 2000, 4000, 6000, 8000, 12000, 16000, 32000, 64000, 128000)
+)
+
+MODEL_INPUT_TOKENS = Histogram(
+    "nova_model_input_tokens",
+    "Input tokens of a model call as reported by the model, and how many of them were read from the provider's prompt cache",
+    ["kind"],
+    buckets=(0, 1000, 2000, 4000, 6000, 8000, 12000, 16000, 32000, 64000, 128000)
+)
+
+RESPONSE_CACHE = Counter(
+    "nova_response_cache_total",
+    "Chat turns checked against the response cache: exact_hit, similar_hit, miss, or bypass for turns that depend on the customer",
+    ["outcome"]
+)
+
+TURN_PHASE_SECONDS = Histogram(
+    "nova_turn_phase_seconds",
+    "Time a chat turn spent in each phase: model calls, retry backoff, tools, amount verification, checkpoint I/O, tracing, other, and the total",
+    ["phase"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+MODEL_CALL_SECONDS = Histogram(
+    "nova_model_call_seconds",
+    "Duration of every attempt at an agent model call, by model and outcome",
+    ["model", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+)
+
+TOOL_CALL_SECONDS = Histogram(
+    "nova_tool_call_seconds",
+    "Duration of every tool call, including tool cache lookups, by tool",
+    ["tool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+)
+
+CHECKPOINT_SECONDS = Histogram(
+    "nova_checkpoint_seconds",
+    "Duration of checkpointer reads and writes, by operation",
+    ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+
+TRACE_EXPORT_SECONDS = Histogram(
+    "nova_trace_export_seconds",
+    "Duration of exporting one thread's turns to Netra in the background",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+LLM_REQUESTS = Counter(
+    "nova_llm_requests_total",
+    "HTTP requests to the LLM provider, retries included, by outcome: ok, client_error, throttled (429), failed (5xx or no response) or rejected by the open circuit breaker",
+    ["outcome"]
+)
+
+LLM_REQUEST_WAIT_SECONDS = Histogram(
+    "nova_llm_request_wait_seconds",
+    "Time an LLM request waited for a concurrency slot and a rate limit token before it was sent",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "nova_llm_requests_in_flight",
+    "LLM requests sent and not finished yet",
+    multiprocess_mode="livesum"
+)
+
+LLM_CIRCUIT_OPEN = Gauge(
+    "nova_llm_circuit_open",
+    "1 while the circuit breaker rejects LLM requests",
+    multiprocess_mode="livemax"
+)
+
+CHECKPOINT_THREADS = Gauge(
+    "nova_checkpoint_threads",
+    "Threads held by the checkpointer, as of the last eviction pass",
+    # Workers share the sqlite and postgres stores, so they all report the same threads
+    multiprocess_mode="livemax"
+)
+
+CHECKPOINT_BYTES = Gauge(
+    "nova_checkpoint_bytes",
+    "Approximate bytes of checkpoints, writes and channel values held by the checkpointer, as of the last eviction pass",
+    multiprocess_mode="livemax"
+)
+
+BATCH_ITEMS = Counter(
+    "nova_batch_items_total",
+    "Items of /chat/batch jobs, by outcome: ok, failed or cancelled before they ran",
+    ["outcome"]
+)
+
+BATCH_PENDING_ITEMS = Gauge(
+    "nova_batch_pending_items",
+    "Items of /chat/batch jobs accepted and not answered yet",
+    multiprocess_mode="livesum"
+)
+
+FAST_PATH = Counter(
+    "nova_fast_path_total",
+    "Eligibility requests answered by running the tools in code: api for /eligibility, phrased when the chat reply came from one model call, template when it was written without the model",
+    ["outcome"]
+)
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a token is available, aacquire() awaits it."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going into debt, and return how long to wait before using it."""
+
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+
+            return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Take a token, and return how long it was waited for."""
+
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        return wait
+
+    def hold(self, seconds: float):
+        """Hand out no token that can be used within the next seconds, e.g. when a server asked to retry after them."""
+
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+class KeyedRateLimiter:
+    """One token bucket per key, e.g. per LLM API key. A rate of 0 disables limiting."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+
+            return self._buckets[key]
+
+    def acquire(self, key: str):
+        if self.rate > 0:
+            self.bucket(key).acquire()
@@ -2,4 +2,13 @@ from pydantic import BaseModel
 
 class ChatRequest(BaseModel):
     prompt: str
-    thread_id: str | None
\ No newline at end of file
+    thread_id: str | None
+
+class BatchChatItem(BaseModel):
+    prompt: str
+    thread_id: str | None = None
+
+class BatchChatRequest(BaseModel):
+    items: list[BatchChatItem]
+    # Delete the items' threads once the job is over, for one-off pre-qualification
+    keep_threads: bool = True
@@ -12,6 +12,6 @@ class Customer(TypedDict):
     credit_report: CreditReport
     financial_profile: FinancialProfile
     pan: str
-    aadhar: str
+    aadhaar: str
     phone: str
     eligibility: Eligibility
\ No newline at end of file
@@ -1,4 +1,5 @@
-from typing import TypedDict
+from pydantic import BaseModel
+from typing import Literal, TypedDict
 
 class Eligibility(TypedDict):
     eligible: bool
@@ -6,4 +7,15 @@ class Eligibility(TypedDict):
     requested_amount: int
     debt_to_income_ratio: float
     rejection_reasons: list[str]
-    policy_version: str
\ No newline at end of file
+    policy_version: str
+
+class BatchEligibilityRequest(BaseModel):
+    requested_amount: int
+    loan_tenure_months: int
+    customer_ids: list[str] | None = None
+
+class EligibilityRequest(BaseModel):
+    identifier_type: Literal["PAN", "AADHAAR", "PHONE"]
+    identifier_value: str
+    requested_amount: int
+    loan_tenure_months: int
@@ -0,0 +1,137 @@
+"""
+EMI and amortization engine.
+
+EMIs are computed in closed form over NumPy arrays, so a whole comparison grid of
+principals, rates and tenures is a single call. Every amount is rounded half-up to the
+paise. Schedules and totals are computed in integer paise, with interest rounded every
+month and the last installment closing the balance at exactly zero.
+"""
+from itertools import product
+import numpy as np
+
+MAX_TENURE_MONTHS = 600
+# Upper bound on the cells of one table, so a single tool call cannot flood the context
+MAX_TABLE_CELLS = 100
+# Float error in the closed form is far below this, so it only matters for exact half paise
+ROUNDING_TOLERANCE = 1e-6
+
+# Rates are applied as integer ten-thousandths of a percent, so monthly interest is
+# balance * rate_units / RATE_DIVISOR and can be rounded without float error
+RATE_SCALE = 10000
+RATE_DIVISOR = 1200 * RATE_SCALE
+
+def to_rupees(paise: int) -> float:
+    return paise / 100
+
+def rate_units(annual_rate_pct):
+    return np.round(np.asarray(annual_rate_pct, dtype=np.float64) * RATE_SCALE).astype(np.int64)
+
+def monthly_interest(balance, units):
+    """Interest in paise on a balance in paise for one month, rounded half-up. Works on ints and arrays."""
+
+    return (balance * units * 2 + RATE_DIVISOR) // (2 * RATE_DIVISOR)
+
+def emi_paise(principal, annual_rate_pct, tenure_months) -> np.ndarray:
+    """
+    EMIs in paise for every combination of the broadcast inputs.
+
+    Parameters:
+        principal (array-like): Loan principals in rupees
+        annual_rate_pct (array-like): Annual interest rates as percentages, 0 for interest-free loans
+        tenure_months (array-like): Loan tenures in months
+    """
+
+    principal_paise = np.asarray(principal, dtype=np.float64) * 100
+    rate = np.asarray(annual_rate_pct, dtype=np.float64) / 1200
+    months = np.asarray(tenure_months, dtype=np.float64)
+
+    if np.any(principal_paise < 0):
+        raise ValueError("principal must not be negative")
+    if np.any(rate < 0):
+        raise ValueError("annual_rate_pct must not be negative")
+    if np.any((months < 1) | (months > MAX_TENURE_MONTHS) | (months != np.floor(months))):
+        raise ValueError(f"tenure_months must be a whole number of months between 1 and {MAX_TENURE_MONTHS}")
+
+    # (1 + r)^n - 1 without losing precision for small rates
+    growth = np.expm1(months * np.log1p(rate))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        emi = np.where(rate == 0, principal_paise / months, principal_paise * rate * (growth + 1) / growth)
+
+    return np.floor(emi + 0.5 + ROUNDING_TOLERANCE).astype(np.int64)
+
+def total_payable_paise(principal_paise: np.ndarray, units: np.ndarray, months: np.ndarray, emi: np.ndarray) -> np.ndarray:
+    """What each loan costs in total when repaid on its schedule, stepping every loan a month at a time."""
+
+    balance = principal_paise.copy()
+    last_installment = np.zeros_like(balance)
+    for month in range(1, int(months.max(initial=0)) + 1):
+        interest = monthly_interest(balance, units)
+        last_installment = np.where(months == month, balance + interest, last_installment)
+        balance = np.where(months > month, balance - (emi - interest), balance)
+
+    return emi * (months - 1) + last_installment
+
+def emi_table(principals: list[int], annual_rates_pct: list[float], tenures_months: list[int]) -> list[dict]:
+    """
+    EMI, total interest and total payable for every combination of the given principals, rates and tenures.
+
+    Parameters:
+        principals (list[int]): Loan principals in rupees
+        annual_rates_pct (list[float]): Annual interest rates as percentages
+        tenures_months (list[int]): Loan tenures in months
+    """
+
+    cells = list(product(principals, annual_rates_pct, tenures_months))
+    if len(cells) > MAX_TABLE_CELLS:
+        raise ValueError(f"A table can have at most {MAX_TABLE_CELLS} combinations, got {len(cells)}")
+    if not cells:
+        return []
+
+    principal, rate, tenure = (np.array(column) for column in zip(*cells))
+    emis = emi_paise(principal, rate, tenure)
+    principal_paise = np.round(principal * 100).astype(np.int64)
+    totals = total_payable_paise(principal_paise, rate_units(rate), tenure.astype(np.int64), emis)
+
+    return [
+        {
+            "principal": cell_principal,
+            "annual_rate_pct": cell_rate,
+            "tenure_months": cell_tenure,
+            "emi": to_rupees(emi),
+            "total_interest": to_rupees(total - paise),
+            "total_payable": to_rupees(total)
+        }
+        for (cell_principal, cell_rate, cell_tenure), emi, total, paise in zip(cells, emis.tolist(), totals.tolist(), principal_paise.tolist())
+    ]
+
+def amortization_schedule(principal: int, annual_rate_pct: float, tenure_months: int) -> list[dict]:
+    """
+    Month-by-month split of each installment into interest and principal, in exact paise.
+    Interest is rounded half-up every month and the last installment absorbs the rounding,
+    so it can differ from the EMI by a few paise.
+
+    Parameters:
+        principal (int): Loan principal in rupees
+        annual_rate_pct (float): Annual interest rate as a percentage
+        tenure_months (int): Loan tenure in months
+    """
+
+    emi = int(emi_paise(principal, annual_rate_pct, tenure_months))
+    units = int(rate_units(annual_rate_pct))
+    balance = round(principal * 100)
+
+    schedule = []
+    for month in range(1, tenure_months + 1):
+        interest = monthly_interest(balance, units)
+        installment = emi if month < tenure_months else balance + interest
+        balance -= installment - interest
+
+        schedule.append({
+            "month": month,
+            "installment": to_rupees(installment),
+            "principal": to_rupees(installment - interest),
+            "interest": to_rupees(interest),
+            "balance": to_rupees(balance)
+        })
+
+    return schedule
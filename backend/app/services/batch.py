@@ -0,0 +1,183 @@
+from agent import adelete_thread, aget_response
+from collections import OrderedDict
+from config import env
+from metrics import BATCH_ITEMS, BATCH_PENDING_ITEMS
+from netra import Netra
+from schema.chat_request import BatchChatItem
+from services.runner import llm_key, turn_rate_limiter
+from typing import Any, AsyncIterator
+import asyncio
+import logging
+import time
+import uuid
+
+class TooManyPendingItemsError(Exception):
+    """Raised when accepting a batch would queue more items than BATCH_MAX_PENDING_ITEMS."""
+
+class BatchJob:
+    """
+    A list of prompts answered by the agent in the background.
+
+    Items on the same thread run one after another in the order given, so a batch can hold a
+    whole conversation, items on different threads run in parallel. Results are kept in the
+    order they finished, each with its seq, so a reader can pick up after the last one it saw.
+    """
+
+    def __init__(self, items: list[BatchChatItem], keep_threads: bool):
+        self.id = uuid.uuid4().hex
+        self.items = [(item.prompt, item.thread_id or uuid.uuid4().hex) for item in items]
+        self.keep_threads = keep_threads
+        self.status = "queued"
+        self.results: list[dict[str, Any]] = []
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled")
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "items": len(self.items),
+            "completed": len(self.results),
+            "failed": sum(1 for result in self.results if "error" in result),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+    async def _add(self, result: dict[str, Any]):
+        async with self._changed:
+            self.results.append({"seq": len(self.results), **result})
+            self._changed.notify_all()
+        BATCH_PENDING_ITEMS.dec()
+
+    async def _finish(self, status: str):
+        async with self._changed:
+            self.status = status
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def follow(self, after: int = 0) -> AsyncIterator[dict[str, Any]]:
+        """Results from seq `after` on as they finish, until the job is over."""
+
+        position = after
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.results) > position or self.finished)
+                new = self.results[position:]
+                finished = self.finished
+
+            for result in new:
+                yield result
+            position += len(new)
+
+            if finished and position >= len(self.results):
+                return
+
+class BatchRunner:
+    """
+    Runs batch jobs for throughput rather than latency.
+
+    All jobs together run at most max_concurrency turns at a time, well below the turns /chat
+    may run, so interactive requests are not queued behind a large batch. Turns also take a token
+    from the runners' rate limit for the LLM key. Jobs queue at most max_pending items between
+    them, beyond that new batches are refused until some finish. Finished jobs are kept for
+    ttl seconds, and only the latest max_jobs of them.
+
+    Jobs live in the worker process that accepted them and are only read or changed on its event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int, max_jobs: int, ttl: float):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.jobs: OrderedDict[str, BatchJob] = OrderedDict()
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(job.items) - len(job.results) for job in self.jobs.values() if not job.finished)
+
+    def _expire(self):
+        now = time.time()
+        finished = [job for job in self.jobs.values() if job.finished]
+        for i, job in enumerate(finished):
+            if now - job.finished_at > self.ttl or i < len(finished) - self.max_jobs: #type: ignore
+                del self.jobs[job.id]
+
+    def get(self, job_id: str) -> BatchJob | None:
+        self._expire()
+        return self.jobs.get(job_id)
+
+    def submit(self, items: list[BatchChatItem], keep_threads: bool = True) -> BatchJob:
+        """Start a job. Must be called on the event loop that runs it."""
+
+        self._expire()
+        if self.pending + len(items) > self.max_pending:
+            raise TooManyPendingItemsError(f"{self.pending} batch items are already pending")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        job = BatchJob(items, keep_threads)
+        self.jobs[job.id] = job
+        BATCH_PENDING_ITEMS.inc(len(job.items))
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    async def cancel(self, job: BatchJob):
+        if job.task is not None and not job.finished:
+            job.task.cancel()
+            await asyncio.gather(job.task, return_exceptions=True)
+
+    async def _answer(self, job: BatchJob, index: int) -> dict[str, Any]:
+        prompt, thread_id = job.items[index]
+        async with self._slots: #type: ignore
+            if turn_rate_limiter.rate > 0:
+                await turn_rate_limiter.bucket(llm_key()).aacquire()
+
+            try:
+                Netra.set_session_id(thread_id)
+                response = await aget_response(prompt, thread_id)
+                BATCH_ITEMS.labels(outcome="ok").inc()
+                return {"index": index, "thread_id": thread_id, "response": response}
+            except Exception as e:
+                logging.error(f"Batch item failed: job_id={job.id}, index={index}, error={e}")
+                BATCH_ITEMS.labels(outcome="failed").inc()
+                return {"index": index, "thread_id": thread_id, "error": "An error occurred"}
+
+    async def _run_thread(self, job: BatchJob, indexes: list[int]):
+        for index in indexes:
+            await job._add(await self._answer(job, index))
+
+    async def _run(self, job: BatchJob):
+        threads: dict[str, list[int]] = {}
+        for index, (_, thread_id) in enumerate(job.items):
+            threads.setdefault(thread_id, []).append(index)
+
+        job.status = "running"
+        try:
+            # One task per thread, the shared slots bound how many of them run a turn at once
+            await asyncio.gather(*(self._run_thread(job, indexes) for indexes in threads.values()))
+            status = "done"
+        except asyncio.CancelledError:
+            remaining = len(job.items) - len(job.results)
+            BATCH_ITEMS.labels(outcome="cancelled").inc(remaining)
+            BATCH_PENDING_ITEMS.dec(remaining)
+            status = "cancelled"
+
+        if not job.keep_threads:
+            for thread_id in threads:
+                try:
+                    await adelete_thread(thread_id)
+                except Exception as e:
+                    logging.error(f"Deleting batch thread failed: job_id={job.id}, thread_id={thread_id}, error={e}")
+
+        await job._finish(status)
+
+batch_runner = BatchRunner(env.BATCH_MAX_CONCURRENCY, env.BATCH_MAX_PENDING_ITEMS, env.BATCH_MAX_JOBS, env.BATCH_JOB_TTL_SECONDS)
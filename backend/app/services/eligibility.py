@@ -0,0 +1,187 @@
+"""
+Batch eligibility engine for re-scoring the whole customer book.
+
+Applies the rules of services.policy, as the check_eligibility tool does, but to NumPy columns of every
+customer at once. Each customer is scored on their own credit score, income and defaults
+for a requested amount and tenure, which may be one value for the whole book or one per
+customer.
+
+Run from the backend directory:
+    PYTHONPATH=app python -m services.eligibility --amount 500000 --tenure 36
+"""
+from db import get_snapshot
+from schema.customer import Customer
+from schema.eligibility import Eligibility
+from schema.product import Product
+from services.policy import AMOUNT_STEP, MAX_DEBT_TO_INCOME, POLICY_VERSION, amount_exceeded, credit_score_too_low, debt_to_income_exceeded, tenure_unavailable
+from typing import Iterable
+import argparse
+import json
+import numpy as np
+
+# Rejection reasons are kept as bit flags until the decisions are built
+DTI_EXCEEDED = 1
+CREDIT_SCORE_TOO_LOW = 2
+TENURE_UNAVAILABLE = 4
+AMOUNT_EXCEEDED = 8
+
+class CustomerColumns:
+    """The customer fields the eligibility rules read, one array per field."""
+
+    def __init__(self, customers: Iterable[Customer]):
+        customers = list(customers)
+
+        reports = [customer.get("credit_report") for customer in customers]
+
+        self.customer_ids = [customer["customer_id"] for customer in customers]
+        # Customers without a credit report are scored as 0 and marked, the tool cannot score them
+        self.missing_reports = np.fromiter((report is None for report in reports), dtype=bool, count=len(customers))
+        self.credit_scores = np.fromiter((report["credit_score"] if report is not None else 0 for report in reports), dtype=np.int64, count=len(customers))
+        self.defaults = np.fromiter((report["defaults_last_3_years"] if report is not None else 0 for report in reports), dtype=np.int64, count=len(customers))
+        self.monthly_incomes = np.fromiter((customer["financial_profile"]["monthly_income"] for customer in customers), dtype=np.int64, count=len(customers))
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+class ProductColumns:
+    """The product catalogue arranged so each rule is a single array lookup."""
+
+    def __init__(self, products: Iterable[Product]):
+        products = sorted(products, key=lambda product: product["min_credit_score"])
+
+        self.min_credit_scores = np.array([product["min_credit_score"] for product in products], dtype=np.int64)
+        # best_max_amounts[i] is the largest max_amount among the i products with the lowest
+        # credit score thresholds, with 0 in front for customers who qualify for none
+        self.best_max_amounts = np.concatenate(([0], np.maximum.accumulate(np.array([product["max_amount"] for product in products], dtype=np.int64))))
+        self.tenures = np.array(sorted({tenure for product in products for tenure in product["available_tenures_months"]}), dtype=np.int64)
+
+class BatchEligibility:
+    """Eligibility decisions for a batch of customers, stored column-wise."""
+
+    def __init__(self, customers: CustomerColumns, products: ProductColumns, requested_amount: int | np.ndarray, loan_tenure_months: int | np.ndarray):
+        size = len(customers)
+        requested_amount = np.broadcast_to(np.asarray(requested_amount, dtype=np.int64), size)
+        loan_tenure_months = np.broadcast_to(np.asarray(loan_tenure_months, dtype=np.int64), size)
+
+        self.customer_ids = customers.customer_ids
+        self.credit_scores = customers.credit_scores
+        self.loan_tenure_months = loan_tenure_months
+        self.raw_requested_amounts = requested_amount
+        # The tool cannot score customers without an income or a credit report, they get an error instead
+        self.failed = (customers.monthly_incomes == 0) | customers.missing_reports
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.debt_to_income_ratios = customers.defaults / customers.monthly_incomes
+
+        self.requested_amounts = -(-requested_amount // AMOUNT_STEP) * AMOUNT_STEP
+
+        qualifying_products = np.searchsorted(products.min_credit_scores, customers.credit_scores, side="right")
+        best_max_amounts = products.best_max_amounts[qualifying_products]
+        has_products = qualifying_products > 0
+
+        self.max_approved_amounts = np.where(has_products, np.minimum(self.requested_amounts, best_max_amounts), 0)
+
+        self.reasons = (
+            np.where(self.debt_to_income_ratios > MAX_DEBT_TO_INCOME, DTI_EXCEEDED, 0)
+            | np.where(has_products, 0, CREDIT_SCORE_TOO_LOW)
+            | np.where(np.isin(loan_tenure_months, products.tenures), 0, TENURE_UNAVAILABLE)
+            | np.where(has_products & (best_max_amounts < requested_amount), AMOUNT_EXCEEDED, 0)
+        )
+        self.eligible = (self.reasons == 0) & ~self.failed
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+    def rejection_reasons(self, index: int) -> list[str]:
+        reasons = int(self.reasons[index])
+        rejection_reasons = []
+
+        if reasons & DTI_EXCEEDED:
+            rejection_reasons.append(debt_to_income_exceeded(float(self.debt_to_income_ratios[index])))
+        if reasons & CREDIT_SCORE_TOO_LOW:
+            rejection_reasons.append(credit_score_too_low(int(self.credit_scores[index])))
+        if reasons & TENURE_UNAVAILABLE:
+            rejection_reasons.append(tenure_unavailable(int(self.loan_tenure_months[index])))
+        if reasons & AMOUNT_EXCEEDED:
+            rejection_reasons.append(amount_exceeded(int(self.raw_requested_amounts[index])))
+
+        return rejection_reasons
+
+    def decision(self, index: int) -> Eligibility | dict[str, str]:
+        """The decision for one customer, in the same shape check_eligibility returns."""
+
+        if self.failed[index]:
+            return {
+                "error": "An error occurred"
+            }
+
+        return {
+            "eligible": bool(self.eligible[index]),
+            "max_approved_amount": int(self.max_approved_amounts[index]),
+            "requested_amount": int(self.requested_amounts[index]),
+            "debt_to_income_ratio": float(self.debt_to_income_ratios[index]),
+            "rejection_reasons": self.rejection_reasons(index) if self.reasons[index] else [],
+            "policy_version": POLICY_VERSION
+        }
+
+    def decisions(self) -> dict[str, Eligibility | dict[str, str]]:
+        """Every decision keyed by customer id. Columns are converted to Python values once, not per customer."""
+
+        rows = zip(
+            self.customer_ids,
+            self.failed.tolist(),
+            self.eligible.tolist(),
+            self.max_approved_amounts.tolist(),
+            self.requested_amounts.tolist(),
+            self.debt_to_income_ratios.tolist(),
+            self.reasons.tolist(),
+            range(len(self))
+        )
+
+        return {
+            customer_id: {"error": "An error occurred"} if failed else {
+                "eligible": eligible,
+                "max_approved_amount": max_approved_amount,
+                "requested_amount": requested_amount,
+                "debt_to_income_ratio": debt_to_income_ratio,
+                "rejection_reasons": self.rejection_reasons(index) if reasons else [],
+                "policy_version": POLICY_VERSION
+            }
+            for customer_id, failed, eligible, max_approved_amount, requested_amount, debt_to_income_ratio, reasons, index in rows
+        }
+
+def evaluate_book(requested_amount: int | np.ndarray, loan_tenure_months: int | np.ndarray, customer_ids: list[str] | None = None) -> BatchEligibility:
+    """
+    Score every customer in the loaded book, or only the given customers, in one pass.
+
+    Parameters:
+        requested_amount (int | ndarray): Requested loan amount, for every customer or one per customer
+        loan_tenure_months (int | ndarray): Requested tenure in months, for every customer or one per customer
+        customer_ids (list[str] | None): Customers to score, defaults to the whole book
+    """
+
+    loaded = get_snapshot()
+    if customer_ids is not None:
+        records = [loaded.customers.get(customer_id) for customer_id in customer_ids]
+    else:
+        records = list(loaded.customers)
+
+    return BatchEligibility(CustomerColumns(records), ProductColumns(loaded.db["products"]), requested_amount, loan_tenure_months)
+
+if __name__ == "__main__":
+    from db import init_db
+
+    parser = argparse.ArgumentParser(description="Re-score the customer book against the current eligibility policy")
+    parser.add_argument("--amount", type=int, required=True, help="requested loan amount")
+    parser.add_argument("--tenure", type=int, required=True, help="requested tenure in months")
+    parser.add_argument("--customer", action="append", dest="customer_ids", help="score only this customer, may be repeated")
+    args = parser.parse_args()
+
+    init_db()
+    result = evaluate_book(args.amount, args.tenure, args.customer_ids)
+    print(json.dumps({
+        "policy_version": POLICY_VERSION,
+        "customers": len(result),
+        "eligible": int(result.eligible.sum()),
+        "decisions": result.decisions()
+    }, indent=2))
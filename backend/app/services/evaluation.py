@@ -1,12 +1,34 @@
-from agent import get_response
+from agent import delete_thread, get_response
+from config import env
 from netra import Netra
+from services.runner import rate_limited, with_run_stats
 from uuid import uuid4
+import time
+
+def answer_item(message: str) -> str:
+    """Answer an item on a thread of its own, so items cannot see each other's history, and delete the thread afterwards."""
+
+    thread_id = uuid4().hex
+    try:
+        return get_response(message, thread_id=thread_id)
+    finally:
+        delete_thread(thread_id)
 
 def run_evaluation(dataset_id: str) -> dict | None:
     dataset = Netra.evaluation.get_dataset(dataset_id) #type: ignore
+    if dataset is None:
+        return None
 
-    return Netra.evaluation.run_test_suite( #type: ignore
+    started = time.perf_counter()
+    result = Netra.evaluation.run_test_suite( #type: ignore
         name="Loan Agent Single Turn",
         data=dataset,
-        task=lambda message: get_response(message, thread_id=uuid4().hex)
-    )
\ No newline at end of file
+        task=rate_limited(answer_item),
+        max_concurrency=env.EVALUATION_MAX_CONCURRENCY
+    )
+
+    # Items are collected as they finish, report them in dataset order
+    if result is not None:
+        result["items"] = sorted(result.get("items", []), key=lambda item: item["index"])
+
+    return with_run_stats(result, len(dataset.items), started)
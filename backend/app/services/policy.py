@@ -0,0 +1,29 @@
+"""
+The eligibility policy: its version, limits and rejection reasons.
+
+Shared by the check_eligibility tool and the batch eligibility engine, so a change to the
+policy changes both and the two cannot disagree.
+"""
+import math
+
+POLICY_VERSION = "v3.2.1"
+MAX_DEBT_TO_INCOME = 0.5
+# Only shown in the rejection reason, the threshold applied is the lowest min_credit_score of the products
+MIN_CREDIT_SCORE = 600
+# Requested amounts are rounded up to a whole lakh before they are compared with product limits
+AMOUNT_STEP = 100000
+
+def rounded_amount(requested_amount: int) -> int:
+    return math.ceil(requested_amount / AMOUNT_STEP) * AMOUNT_STEP
+
+def debt_to_income_exceeded(debt_to_income_ratio: float) -> str:
+    return f"Debt-to-income ratio of {debt_to_income_ratio} exceeds maximum of {MAX_DEBT_TO_INCOME:.2f}"
+
+def credit_score_too_low(credit_score: int) -> str:
+    return f"Credit score {credit_score} is below minimum threshold of {MIN_CREDIT_SCORE}"
+
+def tenure_unavailable(loan_tenure_months: int) -> str:
+    return f"Requested tenure of {loan_tenure_months} months is not available."
+
+def amount_exceeded(requested_amount: int) -> str:
+    return f"Requested amount of Rs.{requested_amount} is more than the maximum loanable amount"
@@ -0,0 +1,104 @@
+from agent.tools import CUSTOMER_NOT_FOUND, check_eligibility, fetch_credit_report, fetch_financial_profile, search_loan_products, verify_identity
+from langchain.tools import BaseTool
+from schema.eligibility import EligibilityRequest
+from typing import Any, Literal
+
+# A tool call of the pipeline: the tool, its arguments and its output
+Step = tuple[BaseTool, dict[str, Any], dict[str, Any]]
+# How the pipeline ended: every step ran, no customer has the identifier, the customer is not
+# verified, or a tool failed. A rejection is "ok", the decision is in eligibility
+Status = Literal["ok", "not_found", "not_verified", "failed"]
+
+def call(tool: BaseTool, args: dict[str, Any]) -> Step:
+    return tool, args, tool.func(**args) #type: ignore
+
+class Prequalification:
+    """
+    The fixed part of the operational flow run in code: verify the customer, fetch their
+    credit report and financial profile, check eligibility for the requested amount and
+    tenure, and search the products they qualify for when they are eligible. The same tools
+    the agent calls are called with the same arguments, so the outputs are the agent's.
+
+    steps holds the tool calls in the order the agent makes them, calls of one step together.
+    status tells how it ended, error holds the message for anything but "ok".
+    """
+
+    def __init__(self, request: EligibilityRequest):
+        self.request = request
+        self.steps: list[list[Step]] = []
+        self.status: Status = "ok"
+        self.error: str | None = None
+        self.customer: dict[str, Any] | None = None
+        self.eligibility: dict[str, Any] | None = None
+        self.products: list[dict[str, Any]] = []
+
+        self._run()
+
+    def _step(self, *calls: tuple[BaseTool, dict[str, Any]]) -> list[dict[str, Any]]:
+        step = [call(tool, args) for tool, args in calls]
+        self.steps.append(step)
+
+        outputs = [output for _, _, output in step]
+        self.error = next((output["error"] for output in outputs if "error" in output), None)
+        if self.error is not None:
+            self.status = "failed"
+        return outputs
+
+    def _run(self):
+        request = self.request
+
+        [identity] = self._step((verify_identity, {"identifier_type": request.identifier_type, "identifier_value": request.identifier_value}))
+        if self.error is not None:
+            if self.error == CUSTOMER_NOT_FOUND:
+                self.status = "not_found"
+            return
+        if not identity["verified"]:
+            self.status = "not_verified"
+            self.error = "Customer is not verified"
+            return
+        self.customer = identity
+
+        customer_id = identity["customer_id"]
+        credit_report, profile = self._step((fetch_credit_report, {"customer_id": customer_id}), (fetch_financial_profile, {"customer_id": customer_id}))
+        if self.error is not None:
+            return
+
+        [self.eligibility] = self._step((check_eligibility, {
+            "customer_id": customer_id,
+            "credit_score": credit_report["credit_score"],
+            "monthly_income": profile["monthly_income"],
+            "existing_monthly_emi": profile["existing_monthly_emi"],
+            "requested_amount": request.requested_amount,
+            "employment_type": profile["employment_type"],
+            "loan_tenure_months": request.loan_tenure_months
+        }))
+        if self.status != "ok" or not self.eligibility["eligible"]:
+            return
+
+        # Products are only searched for eligible customers, the agent does not go on after a rejection
+        [search] = self._step((search_loan_products, {
+            "approved_amount": self.eligibility["max_approved_amount"],
+            "credit_score": credit_report["credit_score"],
+            "employment_type": profile["employment_type"]
+        }))
+        if self.status == "ok":
+            self.products = search["loan_products"]
+
+    def result(self) -> dict[str, Any]:
+        """The outcome for API clients, without the internal fields customers must not see."""
+
+        if self.status != "ok":
+            return {
+                "error": self.error
+            }
+
+        return {
+            "customer_id": self.customer["customer_id"], #type: ignore
+            "full_name": self.customer["full_name"], #type: ignore
+            "eligible": self.eligibility["eligible"], #type: ignore
+            "requested_amount": self.eligibility["requested_amount"], #type: ignore
+            "max_approved_amount": self.eligibility["max_approved_amount"], #type: ignore
+            "loan_tenure_months": self.request.loan_tenure_months,
+            "rejection_reasons": self.eligibility["rejection_reasons"], #type: ignore
+            "loan_products": self.products
+        }
@@ -0,0 +1,38 @@
+from config import env
+from ratelimit import KeyedRateLimiter
+from typing import Any, Callable, TypeVar
+import hashlib
+import time
+
+T = TypeVar("T")
+
+def llm_key() -> str:
+    """Identifies the LLM key in use without keeping the key itself around."""
+
+    key = env.OPENAI_API_KEY or env.LITELLM_API_KEY or ""
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+# Shared by every runner so concurrent simulation and evaluation runs stay within one key's limit
+turn_rate_limiter = KeyedRateLimiter(env.RUNNER_TURNS_PER_SECOND, env.RUNNER_TURN_BURST)
+
+def rate_limited(task: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a runner task so that every call first takes a token for the current LLM key."""
+
+    def wrapper(*args, **kwargs) -> T:
+        turn_rate_limiter.acquire(llm_key())
+        return task(*args, **kwargs)
+
+    return wrapper
+
+def with_run_stats(result: dict[str, Any] | None, items: int, started: float) -> dict[str, Any] | None:
+    """Add the wall-clock time and throughput of a run to its result."""
+
+    if result is None:
+        return None
+
+    wall_clock = time.perf_counter() - started
+    return {
+        **result,
+        "wall_clock_s": round(wall_clock, 3),
+        "items_per_s": round(items / wall_clock, 3) if wall_clock > 0 else None
+    }
@@ -2,18 +2,30 @@ from netra import Netra
 from netra.simulation import BaseTask, TaskResult
 from typing import Optional
 from uuid import uuid4
-from agent import get_response
+from agent import delete_thread, get_response
+from config import env
+from services.runner import rate_limited, with_run_stats
+import threading
+import time
 
 class LoanAgentTask(BaseTask):
+
+    def __init__(self):
+        super().__init__()
+        # Threads of the simulated conversations, deleted once the run is over
+        self.thread_ids: set[str] = set()
+        self._lock = threading.Lock()
     
     def run(self, message: str, session_id: Optional[str] = None) -> TaskResult:
         thread_id = uuid4().hex if not session_id else session_id
+        with self._lock:
+            self.thread_ids.add(thread_id)
     
         Netra.set_session_id(thread_id)
 
         # Get response from the agent
         try:
-            response = get_response(message, thread_id)
+            response = rate_limited(get_response)(message, thread_id)
             final_message = response
         except Exception as e:
             
@@ -25,8 +37,17 @@ class LoanAgentTask(BaseTask):
         )
     
 def run_simulation(dataset_id: str) -> dict | None:
-    return Netra.simulation.run_simulation( #type: ignore
-        name="Loan Agent Simulation",
-        dataset_id=dataset_id,
-        task=LoanAgentTask()
-    )
\ No newline at end of file
+    started = time.perf_counter()
+    task = LoanAgentTask()
+    try:
+        result = Netra.simulation.run_simulation( #type: ignore
+            name="Loan Agent Simulation",
+            dataset_id=dataset_id,
+            task=task,
+            max_concurrency=env.SIMULATION_MAX_CONCURRENCY
+        )
+    finally:
+        for thread_id in task.thread_ids:
+            delete_thread(thread_id)
+
+    return with_run_stats(result, result.get("total_items", 0) if result else 0, started)
\ No newline at end of file
@@ -0,0 +1,100 @@
+from config import env
+from types import ModuleType
+import asyncio
+import importlib
+import logging
+import threading
+import time
+
+_tracing_lock = threading.Lock()
+_tracing_initialised = False
+_agent_lock = threading.Lock()
+_agent: ModuleType | None = None
+
+def init_tracing():
+    """Initialise Netra once. Its import and setup take about a second."""
+
+    global _tracing_initialised
+    with _tracing_lock:
+        if _tracing_initialised:
+            return
+
+        from netra import Netra
+        from netra.instrumentation.instruments import InstrumentSet
+        from netra.version import __version__ as netra_version
+
+        Netra.init(
+            app_name="Nova Agent",
+            environment=env.ENVIRONMENT,
+            headers=f"x-api-key={env.NETRA_API_KEY}",
+            debug_mode=True,
+            block_instruments={InstrumentSet.FASTAPI, InstrumentSet.LANGCHAIN, InstrumentSet.LITELLM, InstrumentSet.OPENAI, InstrumentSet.REQUESTS, InstrumentSet.HTTPX} #type: ignore
+        )
+
+        Netra.set_tenant_id("Nova")
+        _tracing_initialised = True
+
+    logging.info(f"Initialised Netra v{netra_version}")
+
+def load_agent() -> ModuleType:
+    """
+    The agent package, imported on first use. Importing it imports LangChain and the LLM
+    provider and compiles the agent graph, which takes seconds.
+    """
+
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            _agent = importlib.import_module("agent")
+
+    return _agent
+
+class StartupFailedError(Exception):
+    pass
+
+class Startup:
+    """
+    Whether the app has finished starting: tracing, the database, the agent and its checkpointer.
+
+    With LAZY_STARTUP the app starts serving before that, so liveness can be checked right away.
+    Requests that need any of it wait here until it is done, readiness reports it.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready_after: float | None = None
+        self.error: BaseException | None = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def finish(self, error: BaseException | None = None):
+        self.error = error
+        self.ready_after = time.monotonic() - self.started_at
+        self._done.set()
+
+    def wait(self):
+        """Block until startup has finished. Raises StartupFailedError if it failed."""
+
+        self._done.wait()
+        if self.error is not None:
+            raise StartupFailedError(f"Startup failed: {self.error}")
+
+    async def await_ready(self):
+        if not self._done.is_set():
+            await asyncio.to_thread(self._done.wait)
+
+        self.wait()
+
+    def status(self) -> dict:
+        if not self._done.is_set():
+            return {"status": "starting", "seconds": time.monotonic() - self.started_at}
+
+        if self.error is not None:
+            return {"status": "failed", "error": str(self.error)}
+
+        return {"status": "ready", "seconds": self.ready_after}
+
+startup = Startup()
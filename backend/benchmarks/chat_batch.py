@@ -0,0 +1,77 @@
+"""
+Pre-qualifying a list of leads: one /chat call per lead in sequence, the way partner
+channels do it without a batch API, against a single /chat/batch call streaming NDJSON.
+
+Each lead is a prompt on its own thread, answered by the stub LLM with --latency seconds
+per call. Prints the wall clock time and leads per second of both, and for the batch how
+long it took until the first result was streamed back.
+
+Run from the backend directory:
+    python benchmarks/chat_batch.py --leads 200 --concurrency 16
+"""
+import argparse
+import json
+import time
+import uuid
+
+import httpx
+
+from harness import backend, stub_llm
+
+PROMPT = "Hi, I would like to check if I qualify for a personal loan"
+
+def sequential(url: str, leads: int) -> tuple[float, int]:
+    failed = 0
+    start = time.perf_counter()
+    with httpx.Client(timeout=300) as client:
+        for _ in range(leads):
+            response = client.post(f"{url}/chat", json={"prompt": PROMPT, "thread_id": uuid.uuid4().hex})
+            failed += response.status_code != 200
+
+    return time.perf_counter() - start, failed
+
+def batch(url: str, leads: int) -> tuple[float, float, int]:
+    items = [{"prompt": PROMPT} for _ in range(leads)]
+    first_result: float | None = None
+    failed = 0
+
+    start = time.perf_counter()
+    with httpx.Client(timeout=None) as client:
+        with client.stream("POST", f"{url}/chat/batch", json={"items": items, "keep_threads": False}) as response:
+            for line in response.iter_lines():
+                result = json.loads(line)
+                if "seq" not in result:
+                    continue
+                if first_result is None:
+                    first_result = time.perf_counter() - start
+                failed += "error" in result
+
+    return time.perf_counter() - start, first_result or 0, failed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="BATCH_MAX_CONCURRENCY")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    env = {
+        "BATCH_MAX_CONCURRENCY": str(args.concurrency),
+        # Only the batch's own concurrency limits it, and every lead reaches the model
+        "RUNNER_TURNS_PER_SECOND": "0",
+        "RESPONSE_CACHE_MAX_ENTRIES": "0"
+    }
+
+    with stub_llm(args.llm_port, args.latency), backend(args.port, args.llm_port, env=env):
+        seconds, failed = sequential(url, args.leads)
+        print(f"{'':<12} {'wall (s)':>9} {'leads/s':>8} {'first (s)':>10} {'failed':>7}")
+        print(f"{'sequential':<12} {seconds:>9.2f} {args.leads / seconds:>8.1f} {'':>10} {failed:>7}")
+
+        seconds, first, failed = batch(url, args.leads)
+        print(f"{'/chat/batch':<12} {seconds:>9.2f} {args.leads / seconds:>8.1f} {first:>10.2f} {failed:>7}")
+
+if __name__ == "__main__":
+    main()
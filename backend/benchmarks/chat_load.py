@@ -0,0 +1,31 @@
+"""
+Load test for /chat against the stub LLM. Each session sends a few turns on its
+own thread_id; throughput should keep scaling with the number of concurrent
+sessions until MAX_CONCURRENT_TURNS is reached, rather than stalling at the
+size of the threadpool.
+
+Run from the backend directory:
+    python benchmarks/chat_load.py --sessions 25 50 100 200
+"""
+import argparse
+import asyncio
+
+from harness import backend, run_sessions, stub_llm
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[25, 50, 100, 200])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    with stub_llm(args.llm_port, args.latency), backend(args.port, args.llm_port, env={"MAX_CONCURRENT_TURNS": str(max(args.sessions))}):
+        print(f"{'sessions':>9} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+        for sessions in args.sessions:
+            result = asyncio.run(run_sessions(f"http://127.0.0.1:{args.port}", sessions, args.turns))
+            print(f"{result['sessions']:>9} {result['requests']:>9} {result['errors']:>7} {result['requests_per_s']:>8.1f} {result['p50_s']:>8.2f} {result['p95_s']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
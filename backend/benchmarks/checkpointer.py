@@ -0,0 +1,90 @@
+"""
+Per-turn checkpoint read and write latency for each checkpointer backend.
+
+Each thread is driven through the agent with a scripted model whose replies
+carry a product-list sized payload, so checkpoints grow like a real session.
+The saver's read (aget_tuple) and write (aput, aput_writes) calls are timed for
+every turn.
+
+Run from the backend directory:
+    python benchmarks/checkpointer.py --backends memory sqlite
+    CHECKPOINT_POSTGRES_URL=postgresql://... python benchmarks/checkpointer.py --backends postgres
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain.agents import create_agent
+from langchain.messages import AIMessage
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+from config import env
+from agent.checkpointer import open_checkpointer
+
+PAYLOAD = "| Product | Rate | Tenures | Max amount |\n" + "| FlexiLoan | 11.5% | 12, 24, 36, 48, 60 | 500000 |\n" * 20
+
+def timed(method, samples: list[float]):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+async def run_backend(backend: str, threads: int, turns: int) -> dict[int, dict[str, float]]:
+    env.CHECKPOINTER = backend #type: ignore
+    per_turn: dict[int, dict[str, list[float]]] = defaultdict(lambda: {"read": [], "write": []})
+
+    async with open_checkpointer() as saver:
+        model = GenericFakeChatModel(messages=iter([AIMessage(content=PAYLOAD)] * threads * turns))
+        agent = create_agent(model=model, system_prompt="You are a test agent", checkpointer=saver)
+
+        reads: list[float] = []
+        writes: list[float] = []
+        saver.aget_tuple = timed(saver.aget_tuple, reads) #type: ignore
+        saver.aput = timed(saver.aput, writes) #type: ignore
+        saver.aput_writes = timed(saver.aput_writes, writes) #type: ignore
+
+        for _ in range(threads):
+            thread_id = uuid.uuid4().hex
+            for turn in range(turns):
+                reads.clear()
+                writes.clear()
+                await agent.ainvoke({"messages": [{"role": "user", "content": f"Turn {turn}"}]}, {"configurable": {"thread_id": thread_id}})
+                per_turn[turn]["read"].append(sum(reads))
+                per_turn[turn]["write"].append(sum(writes))
+
+    return {turn: {kind: statistics.median(values) for kind, values in samples.items()} for turn, samples in per_turn.items()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"], choices=["memory", "sqlite", "postgres"])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env.CHECKPOINT_SQLITE_PATH = os.path.join(directory, "checkpoints.sqlite")
+
+        for backend in args.backends:
+            results = asyncio.run(run_backend(backend, args.threads, args.turns))
+            print(f"\n{backend}: median checkpoint time per turn over {args.threads} threads")
+            print(f"{'turn':>6} {'read (ms)':>10} {'write (ms)':>11}")
+            for turn in sorted(results):
+                if turn in (0, 1) or (turn + 1) % 5 == 0:
+                    print(f"{turn + 1:>6} {results[turn]['read'] * 1e3:>10.2f} {results[turn]['write'] * 1e3:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Input tokens per model call over a long thread, with and without context management.
+
+Builds a thread turn by turn where every turn searches products, compares EMIs and
+checks eligibility with the real tools, and runs each model call through the
+context management middleware. Prints the approximate input tokens the model would
+receive, and how often the previous call's messages were a prefix of the next one,
+which is what lets the provider serve them from its prompt cache.
+
+Run from the backend directory:
+    python benchmarks/context.py --turns 60
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain.agents.middleware.types import ModelRequest, ModelResponse
+from langchain.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+import db
+from agent.context import ContextManagementMiddleware
+from agent.prompt import SYSTEM_PROMPT
+from agent.tools import calculate_emi_table, check_eligibility, search_loan_products, verify_identity
+
+TOOLS = [verify_identity, search_loan_products, check_eligibility, calculate_emi_table]
+
+def tool_step(turn: int, calls: list) -> list:
+    tool_calls = [{"name": tool.name, "args": args, "id": f"call-{turn}-{tool.name}", "type": "tool_call"} for tool, args in calls]
+    return [AIMessage(content="", tool_calls=tool_calls)] + [tool.invoke(call) for (tool, _), call in zip(calls, tool_calls)]
+
+def turn_steps(turn: int) -> list[list]:
+    amount = 300000 + (turn % 5) * 100000
+    if turn == 0:
+        return [tool_step(turn, [(verify_identity, {"identifier_type": "PAN", "identifier_value": "ABCDE1234G"})])]
+
+    return [
+        tool_step(turn, [
+            (search_loan_products, {"approved_amount": amount, "credit_score": 780, "employment_type": "salaried"}),
+            (check_eligibility, {"customer_id": "CUST-001", "credit_score": 780, "monthly_income": 150000, "existing_monthly_emi": 12000, "requested_amount": amount, "employment_type": "salaried", "loan_tenure_months": 36})
+        ]),
+        tool_step(turn, [(calculate_emi_table, {"principals": [amount, amount + 100000], "annual_rates_pct": [10.5, 11.5, 12.5], "tenures_months": [24, 36, 48, 60]})])
+    ]
+
+def run(turns: int, middleware: ContextManagementMiddleware) -> list[tuple[int, int, bool]]:
+    """(turn, approximate input tokens, previous call's messages were a prefix) of every model call."""
+
+    state: dict = {"messages": []}
+    system_message = SystemMessage(content=SYSTEM_PROMPT)
+    calls: list[tuple[int, int, bool]] = []
+    previous: list = []
+
+    def model_call(turn: int):
+        nonlocal previous
+        state.update(middleware.before_model(state, None) or {}) #type: ignore
+        sent = []
+        request = ModelRequest(model=None, messages=state["messages"], system_message=system_message, tools=TOOLS, state=state) #type: ignore
+        middleware.wrap_model_call(request, lambda request: sent.extend(request.messages) or ModelResponse(result=[AIMessage(content="")]))
+
+        calls.append((turn, count_tokens_approximately([system_message] + sent, tools=TOOLS), sent[:len(previous)] == previous))
+        previous = sent
+
+    for turn in range(turns):
+        state["messages"] = state["messages"] + [HumanMessage(content=f"What about another amount? (turn {turn})")]
+        for step in turn_steps(turn):
+            model_call(turn)
+            state["messages"] = state["messages"] + step
+        model_call(turn)
+        state["messages"] = state["messages"] + [AIMessage(content="Here are your options for this amount.")]
+
+    return calls
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=8000)
+    parser.add_argument("--target", type=int, default=4000)
+    args = parser.parse_args()
+
+    db.init_db()
+
+    full = run(args.turns, ContextManagementMiddleware(0, 0))
+    managed = run(args.turns, ContextManagementMiddleware(args.budget, args.target))
+
+    print(f"{'turn':>5} {'full tokens':>12} {'managed tokens':>15}")
+    # The last model call of every tenth of the turns, the one that writes the reply
+    last_calls = {turn: i for i, (turn, _, _) in enumerate(full)}
+    for turn in range(0, args.turns, max(1, args.turns // 10)):
+        i = last_calls[turn]
+        print(f"{turn:>5} {full[i][1]:>12} {managed[i][1]:>15}")
+
+    for name, calls in (("full", full), ("managed", managed)):
+        total = sum(tokens for _, tokens, _ in calls)
+        prefix_hits = sum(1 for _, _, is_prefix in calls if is_prefix)
+        print(f"{name:<8} total input tokens {total:>10}, max per call {max(tokens for _, tokens, _ in calls):>7}, calls extending the previous prompt {prefix_hits}/{len(calls)}")
+
+if __name__ == "__main__":
+    main()
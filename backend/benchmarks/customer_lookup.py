@@ -0,0 +1,60 @@
+"""
+Compares customer lookups through the indexed CustomerRepository against the
+list comprehension scan the tools used before.
+
+Run from the backend directory:
+    python benchmarks/customer_lookup.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from db.repository import CustomerRepository
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 200
+
+def make_customers(count: int) -> list[dict]:
+    return [
+        {
+            "customer_id": f"CUST-{i:07d}",
+            "pan": f"PAN{i:07d}X",
+            "aadhaar": f"{100000000000 + i}",
+            "phone": f"{9000000000 + i}",
+        }
+        for i in range(count)
+    ]
+
+def scan(customers: list[dict], field: str, value: str) -> dict:
+    [customer] = [customer for customer in customers if customer[field] == value]
+    return customer
+
+def time_per_lookup(lookup, keys: list[str]) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter() - start) / len(keys)
+
+def main():
+    print(f"{'customers':>10} {'build (ms)':>12} {'scan (us)':>12} {'index (us)':>12} {'speedup':>10}")
+
+    for size in SIZES:
+        customers = make_customers(size)
+        keys = [f"CUST-{random.randrange(size):07d}" for _ in range(LOOKUPS)]
+
+        start = time.perf_counter()
+        repository = CustomerRepository(customers) #type: ignore
+        build = time.perf_counter() - start
+
+        # Scans are slow at the larger sizes so they are sampled on fewer keys
+        scan_keys = keys[:max(5, LOOKUPS * 1_000 // size)]
+        scan_time = time_per_lookup(lambda key: scan(customers, "customer_id", key), scan_keys)
+        index_time = time_per_lookup(repository.get, keys)
+
+        print(f"{size:>10} {build * 1e3:>12.1f} {scan_time * 1e6:>12.1f} {index_time * 1e6:>12.2f} {scan_time / index_time:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Startup time and memory of the three ways the customer database can be loaded:
+
+    json      f.read() + json.loads with every customer as nested dicts (the old loader)
+    stream    db.json streamed item by item into compact CustomerRecords
+    snapshot  a memory-mapped snapshot, built once and shared by every worker
+
+Each mode loads a synthetic db.json in its own process, which reports how long the
+load took, its peak RSS, and its RSS and anonymous memory once loading has finished.
+Pages of the snapshot count towards RSS once touched but are shared between workers,
+so anonymous memory is what each extra worker costs.
+
+Run from the backend directory:
+    python benchmarks/db_loading.py --customers 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+MODES = ["json", "stream", "snapshot"]
+
+def make_db(path: str, count: int):
+    rng = random.Random(0)
+    with open(os.path.join(os.path.dirname(__file__), "..", "app", "db", "db.json")) as f:
+        products = json.load(f)["products"]
+
+    with open(path, "w") as f:
+        f.write('{"products": ' + json.dumps(products, indent=2) + ', "customers": [\n')
+        for i in range(count):
+            customer = {
+                "customer_id": f"CUST-{i:07d}",
+                "verified": True,
+                "full_name": f"Customer {i}",
+                "kyc_status": rng.choice(["complete", "pending"]),
+                "risk_flag": rng.choice(["none", "none", "watchlist"]),
+                "pan": f"PAN{i:07d}X",
+                "aadhaar": f"{100000000000 + i}",
+                "phone": f"{9000000000 + i}",
+                "credit_report": {
+                    "credit_score": rng.randint(500, 850),
+                    "active_loans": [{"type": "vehicle", "outstanding": rng.randrange(100000, 800000), "monthly_emi": rng.randrange(5000, 20000)} for _ in range(rng.randint(0, 2))],
+                    "defaults_last_3_years": rng.choice([0, 0, 1]),
+                    "credit_utilization_pct": rng.randint(5, 90)
+                },
+                "financial_profile": {
+                    "monthly_income": rng.randrange(20000, 300000),
+                    "employer": rng.choice(["Infosys Ltd", "Tata Consultancy Services", "Self", "Wipro Ltd"]),
+                    "employment_type": rng.choice(["salaried", "self-employed", "business"]),
+                    "employment_tenure_months": rng.randint(1, 240),
+                    "existing_monthly_emi": rng.randrange(0, 40000),
+                    "average_bank_balance_6m": rng.randrange(10000, 1000000)
+                },
+                "eligibility": {
+                    "eligible": True,
+                    "max_approved_amount": 500000,
+                    "requested_amount": 500000,
+                    "debt_to_income_ratio": 0.09,
+                    "rejection_reasons": [],
+                    "policy_version": "v3.2.1"
+                }
+            }
+            f.write(("  " if i == 0 else ", ") + json.dumps(customer, indent=2) + "\n")
+        f.write("]}\n")
+
+def memory_mb() -> dict[str, float]:
+    with open("/proc/self/smaps_rollup") as f:
+        fields = {line.split(":")[0]: line.split()[1] for line in f if ":" in line}
+
+    return {"rss_mb": int(fields["Rss"]) / 1024, "anon_mb": int(fields["Anonymous"]) / 1024}
+
+def load(mode: str, path: str, snapshot_path: str):
+    import db
+    from db.repository import CustomerRepository
+
+    start = time.perf_counter()
+    if mode == "json":
+        with open(path, "r") as f:
+            data = json.loads(f.read())
+        customers = CustomerRepository(data["customers"])
+    elif mode == "stream":
+        db.init_db(path)
+        customers = db.get_customers()
+    else:
+        db.init_db(path, snapshot_path)
+        customers = db.get_customers()
+    elapsed = time.perf_counter() - start
+
+    # Touch a sample of customers the way a worker serving /chat would
+    for i in range(0, len(customers), max(1, len(customers) // 1000)):
+        customers.get(f"CUST-{i:07d}")["credit_report"]
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        **memory_mb()
+    }))
+
+def measure(mode: str, path: str, snapshot_path: str) -> dict:
+    output = subprocess.run([sys.executable, __file__, "--load", mode, path, snapshot_path], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--load", nargs=3, metavar=("MODE", "DB", "SNAPSHOT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(*args.load)
+        return
+
+    print(f"{'customers':>10} {'mode':>9} {'load (s)':>9} {'peak RSS (MB)':>14} {'RSS (MB)':>9} {'anon (MB)':>10}")
+    for count in args.customers:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "db.json")
+            snapshot_path = os.path.join(directory, "db.snapshot")
+            make_db(path, count)
+
+            # The first snapshot load builds the snapshot, later ones (and other workers) only map it
+            build = measure("snapshot", path, snapshot_path)
+            print(f"{count:>10} {'build':>9} {build['seconds']:>9.2f} {build['peak_rss_mb']:>14.0f} {build['rss_mb']:>9.0f} {build['anon_mb']:>10.0f}")
+
+            for mode in MODES:
+                result = measure(mode, path, snapshot_path)
+                print(f"{count:>10} {mode:>9} {result['seconds']:>9.2f} {result['peak_rss_mb']:>14.0f} {result['rss_mb']:>9.0f} {result['anon_mb']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Customer lookup latency while the database is reloaded in the background.
+
+Loads a synthetic db.json, then times lookups through get_customers() first on
+their own and then while reload_db() rebuilds the database on another thread,
+for the streamed loader and the memory-mapped snapshot. Lookups are never
+blocked by the reload, only slowed down by sharing the interpreter with it.
+
+Run from the backend directory:
+    python benchmarks/db_reload.py --customers 200000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import db
+from db_loading import make_db
+
+def time_lookups(customers: int, until) -> list[float]:
+    latencies = []
+    i = 0
+    while not until():
+        start = time.perf_counter()
+        db.get_customers().get(f"CUST-{i % customers:07d}")
+        latencies.append(time.perf_counter() - start)
+        i += 7919
+        time.sleep(0.0005)
+
+    return latencies
+
+def summary(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return f"{len(latencies):>8} {statistics.median(latencies) * 1e6:>9.1f} {p99 * 1e6:>9.1f} {latencies[-1] * 1e3:>9.1f}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--idle-seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "db.json")
+        make_db(path, args.customers)
+
+        print(f"{'mode':>9} {'phase':>7} {'lookups':>8} {'p50 (us)':>9} {'p99 (us)':>9} {'max (ms)':>9} {'reload (s)':>11}")
+        for mode, snapshot_path in [("stream", None), ("snapshot", os.path.join(directory, "db.snapshot"))]:
+            db.init_db(path, snapshot_path)
+
+            deadline = time.monotonic() + args.idle_seconds
+            print(f"{mode:>9} {'idle':>7} {summary(time_lookups(args.customers, lambda: time.monotonic() > deadline))}")
+
+            # Touch db.json so the snapshot is rebuilt as well
+            os.utime(path)
+            started = time.perf_counter()
+            reload = threading.Thread(target=db.reload_db)
+            reload.start()
+            latencies = time_lookups(args.customers, lambda: not reload.is_alive())
+            print(f"{mode:>9} {'reload':>7} {summary(latencies)} {time.perf_counter() - started:>11.2f}")
+            print(f"{mode:>9} version {db.get_snapshot().version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Checks the batch eligibility engine against the check_eligibility tool and
+times both over synthetic customer books.
+
+Every customer is scored with a random requested amount and tenure, by calling
+the tool once per customer and by one batch pass, and the two sets of decisions
+must match exactly. The tool is only timed on the smaller books.
+
+Run from the backend directory:
+    python benchmarks/eligibility_batch.py
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import numpy as np
+
+import db
+from agent.tools import check_eligibility
+from db.products import ProductIndex
+from db.repository import CustomerRepository
+from services.eligibility import evaluate_book
+
+TENURES = [6, 12, 18, 24, 36, 48, 60, 72]
+
+def make_customers(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "customer_id": f"CUST-{i:07d}",
+            "pan": f"PAN{i:07d}X",
+            "aadhaar": f"{100000000000 + i}",
+            "phone": f"{9000000000 + i}",
+            "credit_report": {
+                "credit_score": rng.randint(500, 850),
+                "defaults_last_3_years": rng.choice([0, 0, 0, 1, 2, 5]),
+            },
+            "financial_profile": {
+                # A few customers have no income, which the tool reports as an error
+                "monthly_income": rng.choice([0, 4, 8, 25000, 60000, 95000, 150000]),
+                "existing_monthly_emi": rng.choice([0, 5000, 20000]),
+                "employment_type": rng.choice(["salaried", "self-employed", "business"]),
+            }
+        }
+        for i in range(count)
+    ]
+
+def load_book(customers: list[dict]):
+    with open(os.path.join(os.path.dirname(__file__), "..", "app", "db", "db.json")) as f:
+        products = json.load(f)["products"]
+
+    db.use_db(db.LoadedDB(1, "", None, 0, "", {"products": products, "customers": customers}, CustomerRepository(customers), ProductIndex(products))) #type: ignore
+
+def per_call(customers: list[dict], amounts: list[int], tenures: list[int]) -> dict:
+    return {
+        customer["customer_id"]: check_eligibility.invoke({
+            "customer_id": customer["customer_id"],
+            "credit_score": customer["credit_report"]["credit_score"],
+            "monthly_income": customer["financial_profile"]["monthly_income"],
+            "existing_monthly_emi": customer["financial_profile"]["existing_monthly_emi"],
+            "requested_amount": amount,
+            "employment_type": customer["financial_profile"]["employment_type"],
+            "loan_tenure_months": tenure
+        })
+        for customer, amount, tenure in zip(customers, amounts, tenures)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-per-call", type=int, default=10_000, help="largest book to also score with the tool")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # check_eligibility logs an error for every customer without an income
+    logging.disable(logging.ERROR)
+
+    print(f"{'customers':>10} {'tool (s)':>10} {'score (s)':>10} {'decisions (s)':>14} {'speedup':>9} {'match':>6}")
+    for size in args.sizes:
+        customers = make_customers(size, rng)
+        amounts = [rng.choice([50000, 100000, 250001, 450000, 500000, 750000]) for _ in range(size)]
+        tenures = [rng.choice(TENURES) for _ in range(size)]
+        load_book(customers)
+
+        # Scoring is vectorised; building a dict per customer afterwards is plain Python
+        start = time.perf_counter()
+        result = evaluate_book(np.array(amounts), np.array(tenures))
+        score = time.perf_counter() - start
+        decisions = result.decisions()
+        batch = time.perf_counter() - start
+
+        if size <= args.max_per_call:
+            start = time.perf_counter()
+            expected = per_call(customers, amounts, tenures)
+            tool = time.perf_counter() - start
+            match = decisions == expected
+            print(f"{size:>10} {tool:>10.3f} {score:>10.3f} {batch - score:>14.3f} {tool / batch:>8.0f}x {str(match):>6}")
+            if not match:
+                mismatched = [customer_id for customer_id in expected if expected[customer_id] != decisions[customer_id]]
+                print(f"  {len(mismatched)} mismatches, e.g. {mismatched[0]}: tool={expected[mismatched[0]]} batch={decisions[mismatched[0]]}")
+                sys.exit(1)
+        else:
+            print(f"{size:>10} {'-':>10} {score:>10.3f} {batch - score:>14.3f} {'-':>9} {'-':>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares the vectorised EMI engine with the scalar formula calculate_emi used
+before, over a comparison grid of principals, rates and tenures.
+
+Also checks a sample of the grid against an exact Decimal computation rounded
+half-up to the paise, and that schedules close at exactly zero and add up to
+the totals the table reports.
+
+Run from the backend directory:
+    python benchmarks/emi.py
+"""
+import os
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal, getcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import numpy as np
+
+from services.amortization import amortization_schedule, emi_paise, emi_table
+
+getcontext().prec = 60
+
+PRINCIPALS = np.arange(50_000, 2_050_000, 2_000)
+RATES = np.round(np.arange(0, 24, 0.25), 2)
+TENURES = np.arange(6, 366, 6)
+
+def scalar_emi(principal: float, annual_rate_pct: float, tenure_months: int) -> float:
+    """The formula calculate_emi used before, which fails for 0% rates."""
+
+    r = annual_rate_pct / 12 / 100
+    return principal * r * ((1 + r) ** tenure_months) / ((1 + r) ** tenure_months - 1)
+
+def exact_emi_paise(principal: int, annual_rate_pct: float, tenure_months: int) -> int:
+    principal_paise = Decimal(principal) * 100
+    rate = Decimal(str(annual_rate_pct)) / 1200
+    if rate == 0:
+        emi = principal_paise / tenure_months
+    else:
+        growth = (1 + rate) ** tenure_months
+        emi = principal_paise * rate * growth / (growth - 1)
+
+    return int(emi.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def main():
+    principal, rate, tenure = np.meshgrid(PRINCIPALS, RATES, TENURES, indexing="ij")
+    cells = principal.size
+    print(f"grid of {len(PRINCIPALS)} principals x {len(RATES)} rates x {len(TENURES)} tenures = {cells} EMIs")
+
+    start = time.perf_counter()
+    emis = emi_paise(principal, rate, tenure)
+    vectorised = time.perf_counter() - start
+
+    # The scalar formula is timed on the non-zero rates it can handle, on a sample
+    sample = np.random.default_rng(0).choice(np.flatnonzero(rate.ravel() > 0), 100_000, replace=False)
+    start = time.perf_counter()
+    for index in sample:
+        scalar_emi(float(principal.flat[index]), float(rate.flat[index]), int(tenure.flat[index]))
+    scalar = (time.perf_counter() - start) / len(sample) * cells
+
+    print(f"scalar loop (extrapolated)  {scalar:8.3f} s")
+    print(f"vectorised                  {vectorised:8.3f} s  ({scalar / vectorised:.0f}x)")
+
+    check = np.random.default_rng(1).choice(cells, 20_000, replace=False)
+    mismatches = sum(
+        int(emis.flat[index]) != exact_emi_paise(int(principal.flat[index]), float(rate.flat[index]), int(tenure.flat[index]))
+        for index in check
+    )
+    print(f"paise mismatches against Decimal on {len(check)} EMIs: {mismatches}")
+
+    for args in [(500_000, 11.5, 36), (100_000, 0, 12), (1_999_999, 23.75, 360)]:
+        schedule = amortization_schedule(*args)
+        [summary] = emi_table(*([arg] for arg in args))
+        paid = sum(round(row["installment"] * 100) for row in schedule) / 100
+        print(f"schedule {args}: emi {summary['emi']}, last installment {schedule[-1]['installment']}, final balance {schedule[-1]['balance']}, paid {paid} = total_payable {summary['total_payable']}: {paid == summary['total_payable']}")
+
+if __name__ == "__main__":
+    main()
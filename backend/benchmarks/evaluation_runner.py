@@ -0,0 +1,50 @@
+"""
+Runs /single-turn offline against the stub LLM and the Netra stand-in at
+several EVALUATION_MAX_CONCURRENCY values, and reports the wall-clock time,
+throughput and whether items came back in dataset order.
+
+Run from the backend directory:
+    python benchmarks/evaluation_runner.py --items 50 --concurrency 5 10 20
+
+Netra runs at least 5 items at a time whatever max_concurrency is set to.
+"""
+import argparse
+import sys
+
+import httpx
+
+from harness import backend, running, stub_llm
+
+def netra_standin(port: int, items: int):
+    return running(
+        [sys.executable, "benchmarks/netra_standin.py", "--port", str(port), "--items", str(items)],
+        f"http://127.0.0.1:{port}/stats"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--netra-port", type=int, default=8200)
+    args = parser.parse_args()
+
+    with stub_llm(args.llm_port, args.latency), netra_standin(args.netra_port, args.items):
+        print(f"{'concurrency':>12} {'items':>6} {'wall (s)':>9} {'items/s':>8} {'ordered':>8}")
+        for concurrency in args.concurrency:
+            env = {
+                "NETRA_OTLP_ENDPOINT": f"http://127.0.0.1:{args.netra_port}/telemetry",
+                "EVALUATION_MAX_CONCURRENCY": str(concurrency),
+                # Measure the runner itself, not the rate limiter
+                "RUNNER_TURNS_PER_SECOND": "0"
+            }
+            with backend(args.port, args.llm_port, env=env):
+                result = httpx.post(f"http://127.0.0.1:{args.port}/single-turn/bench", timeout=3600).json()
+
+            indexes = [item["index"] for item in result.get("items", [])]
+            print(f"{concurrency:>12} {len(indexes):>6} {result['wall_clock_s']:>9.2f} {result['items_per_s']:>8.2f} {str(indexes == sorted(indexes)):>8}")
+
+if __name__ == "__main__":
+    main()
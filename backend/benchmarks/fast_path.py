@@ -0,0 +1,105 @@
+"""
+Prequalifying a customer from one structured prompt ("my PAN is ..., I need 3 lakh for 3
+years") through the agent, which makes a model call per step, and through the fast path,
+which runs verify_identity, the reports, check_eligibility and search_loan_products in code:
+    agent              every step decided by the (fake) model
+    router, phrased    FAST_PATH_ROUTER, one model call to phrase the reply
+    router, template   FAST_PATH_ROUTER without FAST_PATH_PHRASING, no model call
+    /eligibility       the structured API's pipeline on its own
+
+The fake model waits --latency seconds per call, standing in for the provider's round trip.
+Prints the model calls per prequalification and the median milliseconds of one.
+
+Run from the backend directory:
+    python benchmarks/fast_path.py --runs 20 --latency 0.3
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from suite import FakeLoanModel, pick_customer
+
+import db
+from agent import cache_tool_results, get_response, use_model
+from config import env
+from schema.eligibility import EligibilityRequest
+from services.prequalification import Prequalification
+
+class CountingModel(FakeLoanModel):
+    calls: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+def scripted_turn(customer) -> tuple[str, list, str]:
+    """The prompt, the steps the model takes through the agent, and its reply."""
+
+    credit_score = customer["credit_report"]["credit_score"]
+    profile = customer["financial_profile"]
+    prompt = f"Hi, my PAN is {customer['pan']}, I need 3 lakh for 3 years"
+    steps = [
+        [("verify_identity", {"identifier_type": "PAN", "identifier_value": customer["pan"]})],
+        [("fetch_credit_report", {"customer_id": customer["customer_id"]}), ("fetch_financial_profile", {"customer_id": customer["customer_id"]})],
+        [("check_eligibility", {
+            "customer_id": customer["customer_id"],
+            "credit_score": credit_score,
+            "monthly_income": profile["monthly_income"],
+            "existing_monthly_emi": profile["existing_monthly_emi"],
+            "requested_amount": 300000,
+            "employment_type": profile["employment_type"],
+            "loan_tenure_months": 36
+        })],
+        [("search_loan_products", {"approved_amount": 300000, "credit_score": credit_score, "employment_type": profile["employment_type"]})]
+    ]
+
+    return prompt, steps, "You are eligible for Rs. 300000, here are the loans you qualify for."
+
+def measure(prompt: str, runs: int, model: CountingModel) -> tuple[float, float]:
+    """Model calls per prequalification and the median seconds of one, each on a new thread."""
+
+    model.calls = 0
+    seconds = []
+    for _ in range(runs):
+        cache_tool_results.cache.clear()
+        start = time.perf_counter()
+        get_response(prompt, uuid.uuid4().hex)
+        seconds.append(time.perf_counter() - start)
+
+    return model.calls / runs, statistics.median(seconds)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake model latency per call in seconds")
+    args = parser.parse_args()
+
+    db.init_db(db.DB_PATH)
+    customer = pick_customer()
+    turn = scripted_turn(customer)
+    model = CountingModel(turns=[turn], latency=args.latency)
+    use_model(model)
+
+    print(f"{'':<18} {'model calls':>12} {'p50 (ms)':>9}")
+    modes = {
+        "agent": (False, True),
+        "router, phrased": (True, True),
+        "router, template": (True, False)
+    }
+    for mode, (router, phrasing) in modes.items():
+        env.FAST_PATH_ROUTER = router
+        env.FAST_PATH_PHRASING = phrasing
+        calls, seconds = measure(turn[0], args.runs, model)
+        print(f"{mode:<18} {calls:>12.1f} {seconds * 1000:>9.2f}")
+
+    request = EligibilityRequest(identifier_type="PAN", identifier_value=customer["pan"], requested_amount=300000, loan_tenure_months=36)
+    seconds = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        Prequalification(request)
+        seconds.append(time.perf_counter() - start)
+    print(f"{'/eligibility':<18} {0:>12.1f} {statistics.median(seconds) * 1000:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Helpers shared by the load-test benchmarks: start the stub LLM and the backend
+as subprocesses and drive concurrent chat sessions against them.
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# X-Admin-Key of the backends started here, the /admin endpoints are disabled without one
+ADMIN_KEY = "bench"
+
+def wait_until_up(url: str, timeout: float = 180):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # The backend answers 503 on /health/ready until it has loaded everything
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+@contextmanager
+def running(args: list[str], url: str, env: dict[str, str] | None = None):
+    process = subprocess.Popen(
+        args,
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(url)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def stub_llm(port: int, latency: float, quota: int = 0, fail_status: int = 0):
+    return running(
+        [sys.executable, "benchmarks/stub_llm.py", "--port", str(port), "--latency", str(latency), "--quota", str(quota), "--fail-status", str(fail_status)],
+        f"http://127.0.0.1:{port}/stats"
+    )
+
+def backend(port: int, llm_port: int, workers: int = 1, env: dict[str, str] | None = None):
+    return running(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", "app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        f"http://127.0.0.1:{port}/health/ready",
+        env={
+            "ENVIRONMENT": "bench",
+            "NETRA_API_KEY": os.environ.get("NETRA_API_KEY", "bench"),
+            "NETRA_OTLP_ENDPOINT": os.environ.get("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9"),
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "LITELLM_API_KEY": "",
+            "ADMIN_API_KEY": ADMIN_KEY,
+            **(env or {})
+        }
+    )
+
+def serve(port: int, llm_port: int, workers: int, env: dict[str, str] | None = None):
+    """The backend as it is deployed, through python app/main.py with WORKERS worker processes."""
+
+    return running(
+        [sys.executable, "app/main.py"],
+        f"http://127.0.0.1:{port}/health/ready",
+        env={
+            "ENVIRONMENT": "bench",
+            "HOST": "127.0.0.1",
+            "PORT": str(port),
+            "WORKERS": str(workers),
+            "NETRA_API_KEY": os.environ.get("NETRA_API_KEY", "bench"),
+            "NETRA_OTLP_ENDPOINT": os.environ.get("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9"),
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+            "LITELLM_API_KEY": "",
+            "ADMIN_API_KEY": ADMIN_KEY,
+            **(env or {})
+        }
+    )
+
+async def run_sessions(url: str, sessions: int, turns: int) -> dict:
+    """Run `sessions` concurrent chat sessions of `turns` turns each and summarise the latencies."""
+
+    latencies: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=sessions)) as client:
+        async def session():
+            nonlocal errors
+            thread_id = uuid.uuid4().hex
+            for _ in range(turns):
+                start = time.perf_counter()
+                response = await client.post(f"{url}/chat", json={"prompt": "Hi, I would like a personal loan", "thread_id": thread_id})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[session() for _ in range(sessions)])
+        wall_clock = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "sessions": sessions,
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_clock_s": wall_clock,
+        "requests_per_s": len(latencies) / wall_clock,
+        "p50_s": statistics.median(latencies),
+        "p95_s": latencies[int(len(latencies) * 0.95) - 1]
+    }
@@ -0,0 +1,96 @@
+"""
+The LLM transport under provider throttling and during an outage.
+
+Runs concurrent /chat sessions against the stub LLM with a quota of --quota
+requests per second, answering the rest with 429:
+    unlimited     no limits in the backend, retries pile onto the throttled provider
+    rate limited  LLM_REQUESTS_PER_SECOND just under the quota, LLM_MAX_CONCURRENT_REQUESTS set
+Then has the stub fail every request with 503 and sends a burst of turns, with the
+circuit breaker off and on, to count how many requests still reach the provider.
+
+Prints the failed turns, the requests the stub answered and throttled, the most
+it accepted in any second, and the backend's LLM request outcomes from /metrics.
+
+Run from the backend directory:
+    python benchmarks/llm_transport.py --sessions 100 --quota 20
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+import uuid
+
+import httpx
+
+from harness import backend, stub_llm
+from stub_llm import REPLY
+
+# The same prompt on every session must reach the model
+NO_RESPONSE_CACHE = {"RESPONSE_CACHE_MAX_ENTRIES": "0"}
+
+def llm_outcomes(metrics: str) -> dict[str, int]:
+    return {
+        match.group(1): int(float(match.group(2)))
+        for match in re.finditer(r'^nova_llm_requests_total\{outcome="(\w+)"\} ([\d.e+]+)$', metrics, re.MULTILINE)
+    }
+
+async def turn(client: httpx.AsyncClient, url: str) -> tuple[bool, float]:
+    """Whether the turn got the model's reply, rather than an error or the retry middleware's failure message, and how long it took."""
+
+    start = time.perf_counter()
+    response = await client.post(f"{url}/chat", json={"prompt": "Hi, I would like a personal loan", "thread_id": uuid.uuid4().hex})
+    return response.status_code == 200 and response.json().get("response") == REPLY, time.perf_counter() - start
+
+async def run(url: str, llm_url: str, sessions: int, fail_status: int = 0) -> str:
+    async with httpx.AsyncClient(timeout=300, limits=httpx.Limits(max_connections=sessions)) as client:
+        await client.post(f"{llm_url}/reset")
+        await client.post(f"{llm_url}/fail", params={"status": fail_status})
+
+        results = await asyncio.gather(*(turn(client, url) for _ in range(sessions)))
+
+        stats = (await client.get(f"{llm_url}/stats")).json()
+        outcomes = llm_outcomes((await client.get(f"{url}/metrics/")).text)
+
+    failed_turns = sum(1 for ok, _ in results if not ok)
+    answered = stats["requests"] - stats["throttled"] - stats["failed"]
+    return (
+        f"{failed_turns:>8}/{sessions:<4} {answered:>9} {stats['throttled']:>10} {stats['failed']:>7}"
+        f" {stats['max_per_second']:>8} {statistics.median(seconds for _, seconds in results):>7.2f}   {outcomes}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--quota", type=int, default=20, help="stub LLM requests per second before it answers 429")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    throttling = {
+        "unlimited": {},
+        # A second of the quota fits the burst plus a second of the rate
+        "rate limited": {"LLM_REQUESTS_PER_SECOND": str(args.quota - 2), "LLM_REQUEST_BURST": "2", "LLM_MAX_CONCURRENT_REQUESTS": str(args.quota)}
+    }
+    outage = {
+        "breaker off": {"LLM_CIRCUIT_FAILURES": "0"},
+        "breaker on": {"LLM_CIRCUIT_FAILURES": "5", "LLM_CIRCUIT_RESET_SECONDS": "30"}
+    }
+
+    header = f"{'':<14} {'failed turns':>13} {'answered':>9} {'throttled':>10} {'failed':>7} {'max/s':>8} {'p50 s':>7}   backend LLM requests"
+    with stub_llm(args.llm_port, args.latency, quota=args.quota):
+        print(f"provider quota {args.quota}/s\n{header}")
+        for mode, env in throttling.items():
+            with backend(args.port, args.llm_port, env={**NO_RESPONSE_CACHE, **env}):
+                print(f"{mode:<14} {asyncio.run(run(url, llm_url, args.sessions))}")
+
+        print(f"\nprovider failing with 503\n{header}")
+        for mode, env in outage.items():
+            with backend(args.port, args.llm_port, env={**NO_RESPONSE_CACHE, **env}):
+                print(f"{mode:<14} {asyncio.run(run(url, llm_url, args.sessions, fail_status=503))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Local stand-in for the Netra evaluation API, enough to run /single-turn
+offline. It serves a synthetic dataset of DATASET_ITEMS prompts and accepts
+run items and telemetry.
+
+Point the backend at it with NETRA_OTLP_ENDPOINT=http://127.0.0.1:<port>/telemetry.
+
+Run standalone:
+    python benchmarks/netra_standin.py --port 8200 --items 50
+"""
+import argparse
+import os
+import uuid
+
+import uvicorn
+from fastapi import FastAPI
+
+app = FastAPI()
+app.state.items = int(os.environ.get("DATASET_ITEMS", "50"))
+
+PROMPTS = [
+    "What documents do I need for a personal loan?",
+    "What tenures do you offer?",
+    "Hi, I would like to borrow 5 lakh",
+    "What is the interest rate on the FlexiLoan?"
+]
+
+@app.get("/evaluations/dataset/{dataset_id}")
+def get_dataset(dataset_id: str):
+    return {
+        "data": [
+            {
+                "id": f"item-{i}",
+                "datasetId": dataset_id,
+                "input": f"{PROMPTS[i % len(PROMPTS)]} (item {i})",
+                "expectedOutput": ""
+            }
+            for i in range(app.state.items)
+        ]
+    }
+
+@app.post("/evaluations/test_run")
+def create_run():
+    return {"data": {"id": uuid.uuid4().hex}}
+
+@app.post("/evaluations/run/{run_id}/item")
+def post_run_item(run_id: str):
+    return {"data": {"item": {"id": uuid.uuid4().hex}}}
+
+@app.post("/evaluations/run/{run_id}/status")
+def post_run_status(run_id: str):
+    return {"data": {}}
+
+@app.get("/stats")
+def stats():
+    return {"items": app.state.items}
+
+@app.post("/{path:path}")
+def telemetry(path: str):
+    return {}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--items", type=int, default=app.state.items)
+    args = parser.parse_args()
+
+    app.state.items = args.items
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
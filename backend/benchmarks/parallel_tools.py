@@ -0,0 +1,120 @@
+"""
+Latency of the tool steps at the start of a session.
+
+Runs the agent in process against a scripted model that waits --latency seconds
+per call, for many concurrent sessions:
+    sequential - verify_identity, then fetch_credit_report, then fetch_financial_profile,
+                 each in its own model step, as the model did before the prompt asked for both at once
+    parallel   - verify_identity, then both fetches from one AI message, run concurrently
+    snapshot   - fetch_customer_snapshot once
+Each flow runs with the tools in worker threads (sync only) and on the event loop
+(their async versions), to show the cost of handing every call to a thread.
+
+Run from the backend directory:
+    python benchmarks/parallel_tools.py --sessions 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import db
+from agent.tools import fetch_credit_report, fetch_customer_snapshot, fetch_financial_profile, verify_identity
+
+def call(name: str, args: dict) -> dict:
+    return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+
+CUSTOMER = {"customer_id": "CUST-001"}
+IDENTIFIER = {"identifier_type": "PAN", "identifier_value": "ABCDE1234G"}
+
+# The tool calls of each model step, the last step replies to the user
+FLOWS = {
+    "sequential": [
+        [("verify_identity", IDENTIFIER)],
+        [("fetch_credit_report", CUSTOMER)],
+        [("fetch_financial_profile", CUSTOMER)],
+        []
+    ],
+    "parallel": [
+        [("verify_identity", IDENTIFIER)],
+        [("fetch_credit_report", CUSTOMER), ("fetch_financial_profile", CUSTOMER)],
+        []
+    ],
+    "snapshot": [
+        [("fetch_customer_snapshot", IDENTIFIER)],
+        []
+    ]
+}
+
+class ScriptedModel(BaseChatModel):
+    """Replies with the next step of a flow, picked by how many AI messages the thread already has."""
+
+    steps: list
+    latency: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _reply(self, messages) -> ChatResult:
+        step = self.steps[sum(1 for message in messages if message.type == "ai")]
+        message = AIMessage(content="" if step else "Thank you, you are verified.", tool_calls=[call(name, args) for name, args in step])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+async def run_flow(steps: list, latency: float, sessions: int, on_event_loop: bool) -> list[float]:
+    tools = [verify_identity, fetch_credit_report, fetch_financial_profile, fetch_customer_snapshot]
+    if not on_event_loop:
+        tools = [tool.model_copy(update={"coroutine": None}) for tool in tools]
+
+    agent = create_agent(model=ScriptedModel(steps=steps, latency=latency), tools=tools, checkpointer=InMemorySaver())
+
+    async def session() -> float:
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [{"role": "user", "content": "My PAN is ABCDE1234G"}]}, {"configurable": {"thread_id": uuid.uuid4().hex}})
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(session() for _ in range(sessions)))
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    db.init_db()
+
+    print(f"{'flow':<12} {'tools run':<14} {'model calls':>11} {'p50 ms':>8} {'p95 ms':>8}")
+    for flow, steps in FLOWS.items():
+        for on_event_loop in (False, True):
+            latencies = sorted(await run_flow(steps, args.latency, args.sessions, on_event_loop))
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f"{flow:<12} {'on event loop' if on_event_loop else 'in threads':<14} {len(steps):>11} {statistics.median(latencies) * 1e3:>8.1f} {p95 * 1e3:>8.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Compares product lookups through ProductIndex against the filtering and
+sorting check_eligibility and search_loan_products did on every call, over
+catalogues of increasing size. Both must give the same answers.
+
+Run from the backend directory:
+    python benchmarks/product_index.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from db.products import ProductIndex
+
+SIZES = [3, 30, 300, 3_000]
+LOOKUPS = 2_000
+TENURES = [6, 12, 18, 24, 36, 48, 60, 72, 84]
+
+def make_products(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "product_id": f"P{i:05d}",
+            "name": f"Product {i}",
+            "interest_rate_annual_pct": round(rng.uniform(9, 18), 1),
+            "min_credit_score": rng.randrange(550, 800, 10),
+            "available_tenures_months": sorted(rng.sample(TENURES, 3)),
+            "processing_fee_pct": 1.5,
+            "max_amount": rng.randrange(100000, 2000001, 100000)
+        }
+        for i in range(count)
+    ]
+
+def scan(products: list[dict], credit_score: int, tenure: int, approved_amount: int) -> tuple[int | None, bool, list]:
+    eligible = sorted([product for product in products if product["min_credit_score"] <= credit_score], key=lambda product: product["max_amount"])
+    by_tenure = [product for product in products if tenure in product["available_tenures_months"]]
+
+    qualifying = sorted([product for product in products if product["min_credit_score"] <= credit_score], key=lambda product: product["min_credit_score"])
+    covering = [product for product in qualifying if product["max_amount"] >= approved_amount]
+    if not covering and qualifying:
+        covering = [product for product in qualifying if product["max_amount"] == eligible[-1]["max_amount"]]
+
+    return (eligible[-1]["max_amount"] if eligible else None), len(by_tenure) > 0, covering
+
+def indexed(index: ProductIndex, credit_score: int, tenure: int, approved_amount: int) -> tuple[int | None, bool, list]:
+    return index.best_max_amount(credit_score), index.offers_tenure(tenure), index.search(credit_score, approved_amount, "salaried")
+
+def main():
+    rng = random.Random(0)
+    print(f"{'products':>9} {'scan (us)':>10} {'index (us)':>11} {'speedup':>8}")
+
+    for size in SIZES:
+        products = make_products(size, rng)
+        index = ProductIndex(products) #type: ignore
+        queries = [(rng.randint(500, 850), rng.choice(TENURES + [7]), rng.randrange(100000, 2500001, 100000)) for _ in range(LOOKUPS)]
+
+        assert all(scan(products, *query) == indexed(index, *query) for query in queries)
+
+        start = time.perf_counter()
+        for query in queries:
+            scan(products, *query)
+        scan_time = (time.perf_counter() - start) / LOOKUPS
+
+        start = time.perf_counter()
+        for query in queries:
+            indexed(index, *query)
+        index_time = (time.perf_counter() - start) / LOOKUPS
+
+        print(f"{size:>9} {scan_time * 1e6:>10.1f} {index_time * 1e6:>11.2f} {scan_time / index_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+FAQ traffic through /chat with the response cache off, exact only, and with the
+similarity index.
+
+Every request asks one of a few generic questions, worded a little differently,
+on a new thread against the stub LLM. Prints the LLM calls made, the latencies
+and the cache outcomes from /metrics. Then reloads the database and checks that
+the first question is answered by the model again.
+
+Run from the backend directory:
+    python benchmarks/response_cache.py --requests 200
+"""
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import time
+import uuid
+
+import httpx
+
+from harness import ADMIN_KEY, backend, stub_llm
+
+QUESTIONS = [
+    ["What documents do I need?", "what documents do i need", "What documents do I need to apply?"],
+    ["What tenures do you offer?", "what tenures do you offer ?", "Which tenures do you offer?"],
+    ["How long does approval take?", "How long does the approval take?", "how long does approval take"],
+    ["Can I prepay my loan?", "can i prepay my loan", "Can I prepay the loan?"],
+    ["What interest rates do you have?", "What interest rates do you have", "Which interest rates do you have?"]
+]
+
+def outcomes(metrics: str) -> dict[str, int]:
+    return {
+        match.group(1): int(float(match.group(2)))
+        for match in re.finditer(r'^nova_response_cache_total\{outcome="(\w+)"\} ([\d.e+]+)$', metrics, re.MULTILINE)
+    }
+
+async def ask(client: httpx.AsyncClient, url: str, prompt: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(f"{url}/chat", json={"prompt": prompt, "thread_id": uuid.uuid4().hex})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def run(url: str, llm_url: str, requests: int) -> str:
+    prompts = [random.Random(i).choice(random.Random(i * 7).choice(QUESTIONS)) for i in range(requests)]
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        llm_calls = (await client.get(f"{llm_url}/stats")).json()["requests"]
+        latencies = sorted([await ask(client, url, prompt) for prompt in prompts])
+        llm_calls = (await client.get(f"{llm_url}/stats")).json()["requests"] - llm_calls
+
+        # Products may have changed, so the same question must reach the model again
+        admin = {"X-Admin-Key": ADMIN_KEY}
+        version = (await client.get(f"{url}/admin/db", headers=admin)).json()["version"]
+        await client.post(f"{url}/admin/db/reload", headers=admin)
+        while (await client.get(f"{url}/admin/db", headers=admin)).json()["version"] == version:
+            await asyncio.sleep(0.1)
+        before = (await client.get(f"{llm_url}/stats")).json()["requests"]
+        await ask(client, url, prompts[0])
+        after_reload = (await client.get(f"{llm_url}/stats")).json()["requests"] - before
+
+        counts = outcomes((await client.get(f"{url}/metrics/")).text)
+
+    return f"{llm_calls:>9} {statistics.median(latencies) * 1e3:>8.1f} {latencies[int(len(latencies) * 0.95) - 1] * 1e3:>8.1f} {after_reload:>13}   {counts}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    modes = {
+        "off": {"RESPONSE_CACHE_MAX_ENTRIES": "0"},
+        "exact": {"RESPONSE_CACHE_SIMILARITY_THRESHOLD": "0"},
+        "similar 0.8": {"RESPONSE_CACHE_SIMILARITY_THRESHOLD": "0.8"}
+    }
+
+    with stub_llm(args.llm_port, args.latency):
+        print(f"{'mode':<12} {'llm calls':>9} {'p50 ms':>8} {'p95 ms':>8} {'after reload':>13}   cache outcomes")
+        for mode, env in modes.items():
+            with backend(args.port, args.llm_port, env=env):
+                print(f"{mode:<12} {asyncio.run(run(f'http://127.0.0.1:{args.port}', f'http://127.0.0.1:{args.llm_port}', args.requests))}")
+
+if __name__ == "__main__":
+    main()
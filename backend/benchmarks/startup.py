@@ -0,0 +1,106 @@
+"""
+Cold start of the backend: where importing main spends its time, and how long a
+fresh process takes to answer liveness and readiness with and without LAZY_STARTUP.
+
+The import profile comes from python -X importtime in a new process and lists the
+modules main imports with the largest cumulative import time. Startup runs python app/main.py
+the way the container does and polls /health/live and /health/ready.
+
+Run from the backend directory:
+    python benchmarks/startup.py --runs 3
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENV = {
+    "ENVIRONMENT": "bench",
+    "HOST": "127.0.0.1",
+    "NETRA_API_KEY": os.environ.get("NETRA_API_KEY", "bench"),
+    "NETRA_OTLP_ENDPOINT": os.environ.get("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9"),
+    "OPENAI_API_KEY": "stub",
+    "LITELLM_API_KEY": ""
+}
+
+def import_profile(modules: int, lazy: bool) -> list[tuple[float, str]]:
+    """(cumulative seconds, module) of the modules main imports itself that are slowest to import."""
+
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.join(BACKEND_DIR, "app"),
+        env={**os.environ, **ENV, "LAZY_STARTUP": str(lazy).lower()},
+        capture_output=True,
+        text=True,
+        check=True
+    ).stderr
+
+    imported: dict[str, float] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Names are indented two spaces per level of nesting, main itself is at the first level
+        if name.startswith("   ") and not name.startswith("     "):
+            imported[name.strip()] = int(cumulative) / 1e6
+
+    return sorted(((seconds, module) for module, seconds in imported.items()), reverse=True)[:modules]
+
+def wait_for(client: httpx.Client, url: str, deadline: float) -> float:
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+
+    raise TimeoutError(f"{url} did not answer in time")
+
+def cold_start(port: int, lazy: bool) -> tuple[float, float]:
+    """Seconds from starting the process until /health/live and /health/ready answer 200."""
+
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "app/main.py"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **ENV, "PORT": str(port), "LAZY_STARTUP": str(lazy).lower()},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            live = wait_for(client, f"http://127.0.0.1:{port}/health/live", start + 180)
+            ready = wait_for(client, f"http://127.0.0.1:{port}/health/ready", start + 180)
+        return live - start, ready - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modules", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    for lazy in (False, True):
+        print(f"slowest imports of main with LAZY_STARTUP={str(lazy).lower()}:")
+        for seconds, module in import_profile(args.modules, lazy):
+            print(f"  {seconds:>7.2f}s  {module}")
+
+    print(f"\n{'LAZY_STARTUP':<13} {'live (s)':>9} {'ready (s)':>10}")
+    for lazy in (False, True):
+        starts = [cold_start(args.port, lazy) for _ in range(args.runs)]
+        print(f"{str(lazy).lower():<13} {statistics.median(live for live, _ in starts):>9.2f} {statistics.median(ready for _, ready in starts):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Minimal OpenAI-compatible chat completions server for load testing the agent
+without calling a real model. Every completion waits STUB_LLM_LATENCY seconds
+and replies with a fixed message, streamed or not depending on the request.
+
+Like a provider it can enforce a quota of requests per second, answering the
+requests over it with 429 and a Retry-After header, and it can be made to fail
+every request with a given status to simulate an outage.
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Run standalone:
+    python benchmarks/stub_llm.py --port 8100 --latency 0.5 --quota 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = "Sure, please share your PAN, Aadhaar or phone number so I can verify your identity."
+
+app = FastAPI()
+app.state.latency = float(os.environ.get("STUB_LLM_LATENCY", "0.5"))
+app.state.requests = 0
+# Requests per second accepted before answering 429, 0 for no quota
+app.state.quota = int(os.environ.get("STUB_LLM_QUOTA", "0"))
+# Status every request fails with, 0 to answer normally
+app.state.fail_status = int(os.environ.get("STUB_LLM_FAIL_STATUS", "0"))
+app.state.throttled = 0
+app.state.failed = 0
+# Accepted requests by the second they arrived in
+app.state.per_second = Counter()
+
+def completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 20, "total_tokens": 1020}
+    }
+
+def chunk(completion_id: str, model: str, delta: dict, finish_reason: str | None = None) -> str:
+    return "data: " + json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }) + "\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    app.state.requests += 1
+
+    if app.state.fail_status:
+        app.state.failed += 1
+        return JSONResponse({"error": {"message": "Stub outage", "type": "server_error"}}, status_code=app.state.fail_status)
+
+    second = int(time.time())
+    if app.state.quota and app.state.per_second[second] >= app.state.quota:
+        app.state.throttled += 1
+        return JSONResponse({"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, status_code=429, headers={"Retry-After": "1"})
+    app.state.per_second[second] += 1
+
+    if not body.get("stream"):
+        await asyncio.sleep(app.state.latency)
+        return completion(model, REPLY)
+
+    async def stream():
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        words = REPLY.split(" ")
+        # Spend roughly a fifth of the latency before the first token, like a real model
+        await asyncio.sleep(app.state.latency / 5)
+        yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for i, word in enumerate(words):
+            await asyncio.sleep(app.state.latency * 4 / 5 / len(words))
+            yield chunk(completion_id, model, {"content": word if i == 0 else f" {word}"})
+        yield chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/stats")
+def stats():
+    return {
+        "requests": app.state.requests,
+        "throttled": app.state.throttled,
+        "failed": app.state.failed,
+        "max_per_second": max(app.state.per_second.values(), default=0)
+    }
+
+@app.post("/reset")
+def reset():
+    app.state.requests = 0
+    app.state.throttled = 0
+    app.state.failed = 0
+    app.state.per_second.clear()
+    return stats()
+
+@app.post("/fail")
+def fail(status: int = 0):
+    """Fail every request with status from now on, 0 to recover."""
+
+    app.state.fail_status = status
+    return {"fail_status": status}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=app.state.latency)
+    parser.add_argument("--quota", type=int, default=app.state.quota, help="requests per second accepted before answering 429, 0 for no quota")
+    parser.add_argument("--fail-status", type=int, default=app.state.fail_status, help="fail every request with this status")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.quota = args.quota
+    app.state.fail_status = args.fail_status
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,391 @@
+"""
+Offline benchmark suite: whole loan conversations through get_response against a
+deterministic fake model, at several database sizes, compared with a saved baseline.
+
+The fake model replays the same conversation every time, with tool arguments taken
+from a customer of the loaded database:
+    1. "my PAN is ..."       verify_identity, then fetch_credit_report and fetch_financial_profile
+    2. "3 lakh, 36 months"   check_eligibility, then search_loan_products
+    3. "what would my EMI be" calculate_emi_table
+    4. "go ahead with ..."   generate_pre_approval
+It answers the amount verification with the reply unchanged. It waits --latency seconds
+per call, 0 by default, so only the agent's own work is measured.
+
+For each database size it reports:
+    turn p50/p95       get_response latency per turn
+    bare turn          the same turns through an agent without any middleware
+    middleware         what get_response adds per turn over the bare agent, from the medians
+    tool               time per tool call of the tool functions alone
+    tool overhead      time per tool call spent around the tool functions in the agent
+    memory per thread  Python heap kept per finished conversation, from tracemalloc
+plus the model calls, tool calls and input tokens of a conversation, which only change
+when the conversation or the context handling does. Conversations run against a checkpointer
+already holding --resident-threads finished threads, as a busy worker's does.
+
+Every database size is measured --repeats times and each timing is the median of them.
+
+Run from the backend directory:
+    python benchmarks/suite.py                 # compare with benchmarks/baseline.json
+    python benchmarks/suite.py --save          # record a new baseline
+The baseline holds timings of one machine, record it again on the machine you compare on.
+The command exits with status 1 when a timing other than p95 (by more than --min-change-ms as well)
+or the memory per thread grew by more than --tolerance over the baseline, or a counted
+metric changed at all. Middleware and tool overhead are differences of two timings and move
+more from run to run, they are allowed --derived-tolerance instead.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+# Traces are exported from a background thread, which would compete with the turns for the CPU
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+
+from db_loading import make_db
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import agent
+import db
+from agent import agent_tools, cache_tool_results, get_response, system_prompt, use_model
+from agent.timing import turn_timing
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Metrics that are counted rather than timed, any change is reported
+COUNTED = ("model_calls", "tool_calls", "input_tokens")
+# Timed metrics, lower is better
+TIMED = ("turn_p50_ms", "turn_p95_ms", "bare_turn_ms", "middleware_ms", "tool_ms", "tool_overhead_ms", "memory_kb_per_thread")
+# Too noisy from run to run to fail a comparison, only shown
+UNGATED = ("turn_p95_ms",)
+# One timing less another, so the noise of both shows up in a smaller number
+DERIVED = ("middleware_ms", "tool_overhead_ms")
+
+def pick_customer() -> Any:
+    """The first customer who qualifies for the best products, so every step of the conversation succeeds."""
+
+    customers = db.get_customers()
+    for customer in customers:
+        if customer["credit_report"]["credit_score"] >= 750 and customer["financial_profile"]["monthly_income"] >= 80000:
+            return customer
+
+    return next(iter(customers))
+
+def conversation(customer: Any) -> list[tuple[str, list[list[tuple[str, dict]]], str]]:
+    """(prompt, tool calls of each model step, reply) of every turn."""
+
+    credit_score = customer["credit_report"]["credit_score"]
+    profile = customer["financial_profile"]
+    product = db.get_products().for_credit_score(credit_score)[-1]
+    rates = sorted({product["interest_rate_annual_pct"] for product in db.get_products().for_credit_score(credit_score)})
+
+    return [
+        (
+            f"Hi, my PAN is {customer['pan']}",
+            [
+                [("verify_identity", {"identifier_type": "PAN", "identifier_value": customer["pan"]})],
+                [("fetch_credit_report", {"customer_id": customer["customer_id"]}), ("fetch_financial_profile", {"customer_id": customer["customer_id"]})]
+            ],
+            f"Thank you {customer['full_name']}, you are verified. How much would you like to borrow?"
+        ),
+        (
+            "I would like 3 lakh for 36 months",
+            [
+                [("check_eligibility", {
+                    "customer_id": customer["customer_id"],
+                    "credit_score": credit_score,
+                    "monthly_income": profile["monthly_income"],
+                    "existing_monthly_emi": profile["existing_monthly_emi"],
+                    "requested_amount": 300000,
+                    "employment_type": profile["employment_type"],
+                    "loan_tenure_months": 36
+                })],
+                [("search_loan_products", {"approved_amount": 300000, "credit_score": credit_score, "employment_type": profile["employment_type"]})]
+            ],
+            "You are eligible for 3 lakh. Here are the loans you qualify for."
+        ),
+        (
+            "What would my EMI be?",
+            [
+                [("calculate_emi_table", {"principals": [300000], "annual_rates_pct": rates, "tenures_months": [24, 36, 48]})]
+            ],
+            "Here are the monthly EMIs for each rate and tenure."
+        ),
+        (
+            f"Please go ahead with {product['name']} for 36 months",
+            [
+                [("generate_pre_approval", {
+                    "customer_id": customer["customer_id"],
+                    "product_id": product["product_id"],
+                    "amount": 300000,
+                    "annual_rate_pct": product["interest_rate_annual_pct"],
+                    "tenure_months": 36
+                })]
+            ],
+            "Your pre-approval is ready, please visit a branch with your documents within 30 days."
+        )
+    ]
+
+class FakeLoanModel(BaseChatModel):
+    """
+    Replays a conversation. The turn is picked by the latest human message, the step within
+    it by the AI messages since then, so it still follows when older turns are trimmed.
+    """
+
+    turns: list
+    latency: float = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-loan"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _reply(self, messages) -> ChatResult:
+        # The amount verification sends its prompt on its own, it gets the reply back unchanged
+        if len(messages) == 1 and "You are verifying" in messages[0].text:
+            reply = messages[0].text.split("Agent's Response:\n", 1)[1].split("\n\nTask:", 1)[0]
+            return self._result(AIMessage(content=reply), messages)
+
+        start = max(i for i, message in enumerate(messages) if message.type == "human")
+        turn = [prompt for prompt, _, _ in self.turns].index(messages[start].text)
+        step = sum(1 for message in messages[start:] if message.type == "ai")
+        _, steps, reply = self.turns[turn]
+
+        if step < len(steps):
+            tool_calls = [{"name": name, "args": args, "id": f"call_{turn}_{step}_{i}", "type": "tool_call"} for i, (name, args) in enumerate(steps[step])]
+            return self._result(AIMessage(content="", tool_calls=tool_calls), messages)
+
+        return self._result(AIMessage(content=reply), messages)
+
+    def _result(self, message: AIMessage, messages) -> ChatResult:
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+def run_conversation(turns: list, on_turn=None) -> str:
+    # Every conversation is a new customer as far as the tool cache goes
+    cache_tool_results.cache.clear()
+    thread_id = uuid.uuid4().hex
+    for prompt, _, _ in turns:
+        start = time.perf_counter()
+        with turn_timing() as timing:
+            get_response(prompt, thread_id)
+        if on_turn:
+            on_turn(time.perf_counter() - start, timing)
+
+    return thread_id
+
+def fill_checkpointer(thread_id: str, count: int):
+    """Copy a finished thread to count new threads in the agent's checkpointer."""
+
+    saver = agent._agent.checkpointer
+    namespaces = list(saver.storage[thread_id].items()) #type: ignore
+    writes = [key for key in saver.writes if key[0] == thread_id] #type: ignore
+    blobs = [key for key in saver.blobs if key[0] == thread_id] #type: ignore
+    for _ in range(count):
+        copy = uuid.uuid4().hex
+        for checkpoint_ns, checkpoints in namespaces:
+            saver.storage[copy][checkpoint_ns] = dict(checkpoints) #type: ignore
+        for key in writes:
+            saver.writes[(copy, *key[1:])] = dict(saver.writes[key]) #type: ignore
+        for key in blobs:
+            saver.blobs[(copy, *key[1:])] = saver.blobs[key] #type: ignore
+
+def measure(turns: list, conversations: int, memory_conversations: int, resident_threads: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    phases: dict[str, float] = {}
+    counts: dict[str, int] = {}
+
+    def on_turn(seconds: float, timing):
+        latencies.append(seconds)
+        for phase, value in timing.seconds.items():
+            phases[phase] = phases.get(phase, 0) + value
+        for phase, value in timing.counts.items():
+            counts[phase] = counts.get(phase, 0) + value
+
+    for _ in range(2):
+        thread_id = run_conversation(turns)
+    fill_checkpointer(thread_id, resident_threads)
+    for _ in range(conversations):
+        thread_id = run_conversation(turns, on_turn)
+
+    messages = agent._agent.get_state({"configurable": {"thread_id": thread_id}}).values["messages"]
+    input_tokens = sum(message.usage_metadata["input_tokens"] for message in messages if message.type == "ai" and message.usage_metadata)
+
+    # The same turns through an agent with the same model, tools and prompt but no middleware
+    bare = create_agent(model=agent.llm, system_prompt=system_prompt, tools=agent_tools, checkpointer=InMemorySaver())
+    bare_latencies = []
+    for _ in range(conversations):
+        config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+        for prompt, _, _ in turns:
+            start = time.perf_counter()
+            bare.invoke({"messages": [{"role": "user", "content": prompt}]}, config) #type: ignore
+            bare_latencies.append(time.perf_counter() - start)
+
+    # The tool functions alone, called with the arguments of the conversation
+    tools = {tool.name: tool for tool in agent_tools}
+    calls = [(tools[name].func, args) for _, steps, _ in turns for step in steps for name, args in step]
+    tool_latencies = []
+    for _ in range(conversations):
+        start = time.perf_counter()
+        for func, args in calls:
+            func(**args) #type: ignore
+        tool_latencies.append((time.perf_counter() - start) / len(calls))
+    tool_seconds = statistics.median(tool_latencies)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(memory_conversations):
+        run_conversation(turns)
+    gc.collect()
+    memory_per_thread = (tracemalloc.get_traced_memory()[0] - before) / memory_conversations
+    tracemalloc.stop()
+
+    latencies.sort()
+    turn_count = len(latencies)
+    return {
+        "model_calls": counts["model"] // conversations,
+        "tool_calls": counts["tools"] // conversations,
+        "input_tokens": input_tokens,
+        "turn_p50_ms": statistics.median(latencies) * 1e3,
+        "turn_p95_ms": latencies[int(turn_count * 0.95) - 1] * 1e3,
+        "bare_turn_ms": statistics.median(bare_latencies) * 1e3,
+        "middleware_ms": (statistics.median(latencies) - statistics.median(bare_latencies)) * 1e3,
+        "tool_ms": tool_seconds * 1e3,
+        "tool_overhead_ms": (phases["tools"] / counts["tools"] - tool_seconds) * 1e3,
+        "memory_kb_per_thread": memory_per_thread / 1024,
+        "phase_ms_per_turn": {phase: phases[phase] / turn_count * 1e3 for phase in ("model", "tools", "verification", "checkpoint", "trace", "other")}
+    }
+
+def median_of(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """The median of every timed metric and phase over repeated measurements, the counted metrics of the first."""
+
+    return {
+        **runs[0],
+        **{metric: statistics.median(run[metric] for run in runs) for metric in TIMED},
+        "phase_ms_per_turn": {phase: statistics.median(run["phase_ms_per_turn"][phase] for run in runs) for phase in runs[0]["phase_ms_per_turn"]}
+    }
+
+def run(sizes: list[int], conversations: int, memory_conversations: int, resident_threads: int, latency: float, repeats: int) -> dict[str, dict[str, Any]]:
+    results = {}
+    databases = [("db.json", db.DB_PATH)]
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"db-{size}.json")
+            make_db(path, size)
+            databases.append((str(size), path))
+
+        for label, path in databases:
+            db.init_db(path)
+            turns = conversation(pick_customer())
+            use_model(FakeLoanModel(turns=turns, latency=latency))
+            runs = []
+            for _ in range(repeats):
+                agent.use_checkpointer(InMemorySaver())
+                runs.append(measure(turns, conversations, memory_conversations, resident_threads))
+            results[label] = {"customers": len(db.get_customers()), **median_of(runs)}
+            print(f"measured {label}", file=sys.stderr)
+
+    return results
+
+def print_results(results: dict[str, dict[str, Any]]):
+    labels = list(results)
+    print(f"{'':<22}" + "".join(f"{label:>14}" for label in labels))
+    for metric in ("customers",) + COUNTED + TIMED:
+        print(f"{metric:<22}" + "".join(f"{results[label][metric]:>14.2f}" if isinstance(results[label][metric], float) else f"{results[label][metric]:>14}" for label in labels))
+    for phase in results[labels[0]]["phase_ms_per_turn"]:
+        print(f"{'phase ' + phase + ' ms':<22}" + "".join(f"{results[label]['phase_ms_per_turn'][phase]:>14.2f}" for label in labels))
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], tolerance: float, derived_tolerance: float, min_change_ms: float) -> bool:
+    """Print every metric against the baseline, and return whether none regressed."""
+
+    ok = True
+    print(f"\n{'database':<10} {'metric':<22} {'baseline':>10} {'now':>10} {'change':>9}")
+    for label, result in results.items():
+        if label not in baseline:
+            print(f"{label:<10} not in the baseline")
+            continue
+
+        for metric in COUNTED + TIMED:
+            before, now = baseline[label][metric], result[metric]
+            change = (now - before) / before if before else 0.0
+            if metric in COUNTED:
+                regressed = now != before
+            elif metric in UNGATED:
+                regressed = False
+            else:
+                # Timings of well under a millisecond move by more than any tolerance from run to run
+                allowed = derived_tolerance if metric in DERIVED else tolerance
+                regressed = change > allowed and (not metric.endswith("_ms") or now - before > min_change_ms)
+            ok = ok and not regressed
+            print(f"{label:<10} {metric:<22} {before:>10.2f} {now:>10.2f} {change:>+8.1%}{'  REGRESSED' if regressed else ''}")
+
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, nargs="*", default=[10_000, 100_000], help="sizes of synthetic databases to run besides db.json")
+    parser.add_argument("--conversations", type=int, default=30)
+    parser.add_argument("--memory-conversations", type=int, default=20)
+    parser.add_argument("--resident-threads", type=int, default=10_000, help="finished threads already in the checkpointer, CHECKPOINT_MAX_THREADS by default")
+    parser.add_argument("--latency", type=float, default=0, help="fake model latency per call in seconds")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline instead of comparing")
+    parser.add_argument("--repeats", type=int, default=3, help="measurements per database size, timings are their median")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative growth of timed metrics")
+    parser.add_argument("--derived-tolerance", type=float, default=0.6, help="allowed relative growth of middleware and tool overhead")
+    parser.add_argument("--min-change-ms", type=float, default=1.0, help="timings that grew by less than this never count as regressed")
+    args = parser.parse_args()
+
+    results = run(args.customers, args.conversations, args.memory_conversations, args.resident_threads, args.latency, args.repeats)
+    print_results(results)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"latency": args.latency, "conversations": args.conversations, "resident_threads": args.resident_threads, "repeats": args.repeats, "results": results}, f, indent=2)
+        print(f"\nsaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}, record one with --save")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["latency"] != args.latency:
+        print(f"\nthe baseline was recorded with --latency {baseline['latency']}, timings are not comparable")
+
+    if not compare(results, baseline["results"], args.tolerance, args.derived_tolerance, args.min_change_ms):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
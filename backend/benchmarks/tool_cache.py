@@ -0,0 +1,99 @@
+"""
+Cost of repeated tool calls with and without the tool result cache.
+
+Runs the read-only tools through the cache middleware the way the agent's tool
+node does: once cold, again from the cache, and again with the first result in
+the thread history. Then reloads the database, unchanged and after db.json
+changed, and checks that results are reused only while the data is the same.
+
+Run from the backend directory:
+    python benchmarks/tool_cache.py --repeats 2000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain.messages import AIMessage
+
+import db
+from agent.cache import ToolCacheMiddleware, ToolResultCache
+from agent.tools import calculate_emi_table, check_eligibility, fetch_credit_report, fetch_financial_profile
+
+CALLS = [
+    (fetch_credit_report, {"customer_id": "CUST-001"}),
+    (fetch_financial_profile, {"customer_id": "CUST-001"}),
+    (check_eligibility, {"customer_id": "CUST-001", "credit_score": 780, "monthly_income": 150000, "existing_monthly_emi": 12000, "requested_amount": 500000, "employment_type": "salaried", "loan_tenure_months": 36}),
+    (calculate_emi_table, {"principals": [300000, 500000, 800000], "annual_rates_pct": [10.5, 11.5, 12.5], "tenures_months": [24, 36, 48, 60]})
+]
+
+def run(tool, args: dict, middleware: ToolCacheMiddleware | None, messages: list, call_id: str):
+    request = ToolCallRequest(tool_call={"name": tool.name, "args": args, "id": call_id, "type": "tool_call"}, tool=tool, state={"messages": messages}, runtime=None) #type: ignore
+    handler = lambda request: request.tool.invoke(request.tool_call)
+    return handler(request) if middleware is None else middleware.wrap_tool_call(request, handler)
+
+def timed(repeats: int, call) -> float:
+    start = time.perf_counter()
+    for i in range(repeats):
+        call(i)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    db.init_db()
+
+    print(f"{'tool':<24} {'uncached us':>12} {'cache hit us':>13} {'history hit us':>15}")
+    for tool, tool_args in CALLS:
+        uncached = timed(args.repeats, lambda i: run(tool, tool_args, None, [], f"call-{i}"))
+
+        middleware = ToolCacheMiddleware(ToolResultCache(1000, 300))
+        first = run(tool, tool_args, middleware, [], "call-first")
+        cached = timed(args.repeats, lambda i: run(tool, tool_args, middleware, [], f"call-{i}"))
+        assert middleware.cache.get(tuple(first.artifact["tool_cache_key"])) == first.content
+
+        # What the thread looks like after the first call: the model's call and the tool's reply
+        history = [AIMessage(content="", tool_calls=[{"name": tool.name, "args": tool_args, "id": "call-first"}]), first]
+        middleware.cache.clear()
+        history_hit = run(tool, tool_args, middleware, history, "call-again")
+        assert history_hit.content == first.content and history_hit.tool_call_id == "call-again"
+        from_history = timed(args.repeats, lambda i: run(tool, tool_args, middleware, history, f"call-{i}"))
+
+        print(f"{tool.name:<24} {uncached:>12.1f} {cached:>13.1f} {from_history:>15.1f}")
+
+    # Results survive a reload of the same data, a changed db.json invalidates both the cache
+    # and results already in the thread history
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "db.json")
+        shutil.copy(db.DB_PATH, path)
+        db.init_db(path)
+
+        middleware = ToolCacheMiddleware(ToolResultCache(1000, 300))
+        tool, tool_args = CALLS[0]
+        first = run(tool, tool_args, middleware, [], "call-first")
+        history = [AIMessage(content="", tool_calls=[{"name": tool.name, "args": tool_args, "id": "call-first"}]), first]
+
+        reloaded = db.reload_db()
+        again = run(tool, tool_args, middleware, history, "call-again")
+        assert again.artifact["tool_cache_key"] == first.artifact["tool_cache_key"]
+        print(f"after reload to version {reloaded.version} of the same data: reused")
+
+        changed = os.stat(path).st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(changed, changed))
+        reloaded = db.reload_db()
+        after = run(tool, tool_args, middleware, history, "call-after")
+        assert after.artifact["tool_cache_key"][-1] == reloaded.fingerprint != first.artifact["tool_cache_key"][-1]
+        print(f"after reload to version {reloaded.version} of changed data: recomputed, {len(middleware.cache)} cached entries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Overhead of the turn timing instrumentation, and what its breakdown looks like.
+
+Runs the session-start flow (verify, then both report fetches at once, then a
+reply) against a scripted model that answers instantly, so the agent's own work is
+all that is measured. The same flow runs with and without the timing middleware
+and checkpointer wrapping.
+
+Run from the backend directory:
+    python benchmarks/turn_timing.py --turns 300
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from parallel_tools import FLOWS, ScriptedModel
+
+from langchain.agents import create_agent
+from langgraph.checkpoint.memory import InMemorySaver
+
+import db
+from agent import agent_tools
+from agent.timing import time_checkpointer, time_model_attempts, time_turns, turn_timing
+
+def build(timed: bool):
+    checkpointer = time_checkpointer(InMemorySaver()) if timed else InMemorySaver()
+    middleware = [time_turns, time_model_attempts] if timed else []
+    return create_agent(model=ScriptedModel(steps=FLOWS["parallel"], latency=0), tools=agent_tools, checkpointer=checkpointer, middleware=middleware)
+
+async def run(agent, turns: int) -> tuple[list[float], str]:
+    latencies = []
+    header = ""
+    for _ in range(turns):
+        start = time.perf_counter()
+        with turn_timing() as timing:
+            await agent.ainvoke({"messages": [{"role": "user", "content": "My PAN is ABCDE1234G"}]}, {"configurable": {"thread_id": uuid.uuid4().hex}})
+            header = timing.header()
+        latencies.append(time.perf_counter() - start)
+
+    return latencies, header
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=300)
+    args = parser.parse_args()
+
+    db.init_db()
+
+    # Warm up imports and caches before timing either
+    await run(build(False), 20)
+    await run(build(True), 20)
+
+    plain, _ = await run(build(False), args.turns)
+    timed, header = await run(build(True), args.turns)
+
+    print(f"without timing: {statistics.mean(plain) * 1e3:.2f} ms per turn")
+    print(f"with timing:    {statistics.mean(timed) * 1e3:.2f} ms per turn ({(statistics.mean(timed) / statistics.mean(plain) - 1) * 100:+.1f}%)")
+    print(f"X-Timing: {header}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Cost of the amount verification hook per turn over long threads.
+
+Builds a 200-turn thread where every turn runs check_eligibility and replies
+with the approved amount, then times the hook at each turn. The hook only scans
+the current turn, so its cost should stay flat; the full-history scan it
+replaced is timed alongside for comparison.
+
+Run from the backend directory:
+    python benchmarks/verification.py --turns 200
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("NETRA_API_KEY", "bench")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent import verify_agent_response
+
+ELIGIBILITY = json.dumps({"eligible": True, "max_approved_amount": 500000, "requested_amount": 500000, "debt_to_income_ratio": 0.0, "rejection_reasons": [], "policy_version": "v3.2.1"})
+
+def full_history_scan(messages) -> bool:
+    """The scan the hook did before: walk every message and recompile the pattern."""
+
+    eligibility_output = None
+    for message in messages:
+        if message.type == "tool" and message.name == "check_eligibility":
+            eligibility_output = message.content
+
+    lakh_pattern = r'\d+\.?\d*\s*(?:lakh|lakhs|L\b)|\d{1,3}(?:[,.]?\d{2,3})+'
+    return eligibility_output is not None and bool(re.search(lakh_pattern, messages[-1].content, re.IGNORECASE))
+
+def turn_messages(turn: int) -> list:
+    return [
+        HumanMessage(content=f"Can I borrow 5 lakh? (turn {turn})"),
+        AIMessage(content="", tool_calls=[{"name": "check_eligibility", "args": {}, "id": f"call-{turn}"}]),
+        ToolMessage(content=ELIGIBILITY, name="check_eligibility", tool_call_id=f"call-{turn}"),
+        AIMessage(content="You are eligible for a loan of ₹5,00,000.")
+    ]
+
+def time_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    messages = []
+    state: dict = {"messages": messages}
+
+    print(f"{'turn':>6} {'messages':>9} {'hook (us)':>10} {'full scan (us)':>15}")
+    for turn in range(1, args.turns + 1):
+        messages.extend(turn_messages(turn))
+
+        hook = time_call(lambda: verify_agent_response.after_agent(state, None), args.repeat) #type: ignore
+        scan = time_call(lambda: full_history_scan(messages), args.repeat)
+
+        if turn in (1, 10) or turn % 25 == 0:
+            print(f"{turn:>6} {len(messages):>9} {hook * 1e6:>10.1f} {scan * 1e6:>15.1f}")
+
+if __name__ == "__main__":
+    main()
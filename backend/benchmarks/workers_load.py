@@ -0,0 +1,63 @@
+"""
+Throughput of /chat against the stub LLM as the number of worker processes grows.
+
+Starts the backend the way it is deployed, python app/main.py with WORKERS set, on
+a shared SQLite checkpointer and a memory-mapped customer snapshot. Each session
+sends several turns on one thread, and consecutive turns land on whichever worker
+accepts them. After every run the threads are read back from the checkpointer to
+check that no turn was lost, i.e. that workers are stateless.
+
+Requests per second only scale with workers up to the number of CPU cores, since
+a single worker is bound by the CPU time of running the agent graph.
+
+Run from the backend directory:
+    python benchmarks/workers_load.py --workers 1 2 4 --sessions 200
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+from harness import run_sessions, serve, stub_llm
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+def thread_lengths(path: str) -> list[int]:
+    """Number of messages in every thread stored in the checkpointer."""
+
+    with sqlite3.connect(path) as conn:
+        saver = SqliteSaver(conn)
+        thread_ids = [row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+        return [len(saver.get_tuple({"configurable": {"thread_id": thread_id}}).checkpoint["channel_values"]["messages"]) for thread_id in thread_ids] #type: ignore
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency per call in seconds")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    print(f"cpu cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'threads complete':>17}")
+    with stub_llm(args.llm_port, args.latency), tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "db.snapshot")
+        for workers in args.workers:
+            checkpoints = os.path.join(directory, f"checkpoints-{workers}.sqlite")
+            env = {
+                "CHECKPOINTER": "sqlite",
+                "CHECKPOINT_SQLITE_PATH": checkpoints,
+                "DB_SNAPSHOT_PATH": snapshot_path,
+                "MAX_CONCURRENT_TURNS": str(args.sessions)
+            }
+            with serve(args.port, args.llm_port, workers, env):
+                result = asyncio.run(run_sessions(f"http://127.0.0.1:{args.port}", args.sessions, args.turns))
+
+            # Every turn adds the prompt and the reply to its thread
+            complete = sum(1 for length in thread_lengths(checkpoints) if length == args.turns * 2)
+            print(f"{workers:>8} {result['requests']:>9} {result['errors']:>7} {result['requests_per_s']:>8.1f} {result['p50_s']:>8.2f} {result['p95_s']:>8.2f} {complete:>10}/{args.sessions}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# Settings are read on import, the tests never reach Netra or the model provider
+os.environ.setdefault("NETRA_API_KEY", "test")
+os.environ.setdefault("NETRA_OTLP_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,153 @@
+"""
+The batch eligibility engine must return exactly what the check_eligibility tool returns
+for every customer, including the customers the tool cannot score.
+"""
+import json
+import logging
+import os
+import random
+
+import numpy as np
+import pytest
+
+import db
+from agent.tools import check_eligibility
+from db.products import ProductIndex
+from db.repository import CustomerRepository
+from services.eligibility import evaluate_book
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "db", "db.json")
+
+def make_customer(i: int, credit_score: int = 780, defaults: int = 0, monthly_income: int = 150000) -> dict:
+    return {
+        "customer_id": f"CUST-{i:07d}",
+        "pan": f"PAN{i:07d}X",
+        "aadhaar": f"{100000000000 + i}",
+        "phone": f"{9000000000 + i}",
+        "credit_report": {
+            "credit_score": credit_score,
+            "defaults_last_3_years": defaults
+        },
+        "financial_profile": {
+            "monthly_income": monthly_income,
+            "existing_monthly_emi": 12000,
+            "employment_type": "salaried"
+        }
+    }
+
+@pytest.fixture
+def load_book():
+    with open(DB_PATH) as f:
+        products = json.load(f)["products"]
+
+    previous = db.current
+
+    def load(customers: list[dict]):
+        db.use_db(db.LoadedDB(1, "", None, 0, "", {"products": products, "customers": customers}, CustomerRepository(customers), ProductIndex(products))) #type: ignore
+
+    yield load
+
+    db.current = previous
+
+def tool_decisions(customers: list[dict], amounts: list[int], tenures: list[int]) -> dict:
+    # The agent passes the score it fetched, a customer without a credit report has none
+    return {
+        customer["customer_id"]: check_eligibility.invoke({
+            "customer_id": customer["customer_id"],
+            "credit_score": customer.get("credit_report", {}).get("credit_score", 0),
+            "monthly_income": customer["financial_profile"]["monthly_income"],
+            "existing_monthly_emi": customer["financial_profile"]["existing_monthly_emi"],
+            "requested_amount": amount,
+            "employment_type": customer["financial_profile"]["employment_type"],
+            "loan_tenure_months": tenure
+        })
+        for customer, amount, tenure in zip(customers, amounts, tenures)
+    }
+
+def assert_matches_tool(customers: list[dict], amounts: list[int], tenures: list[int]) -> dict:
+    batch = evaluate_book(np.array(amounts), np.array(tenures)).decisions()
+    expected = tool_decisions(customers, amounts, tenures)
+
+    assert batch == expected
+    return batch
+
+@pytest.fixture(autouse=True)
+def quiet_tool_errors():
+    # check_eligibility logs an error for every customer it cannot score
+    logging.disable(logging.ERROR)
+    yield
+    logging.disable(logging.NOTSET)
+
+def test_generated_book_matches_tool(load_book):
+    rng = random.Random(0)
+    customers = [
+        make_customer(
+            i,
+            credit_score=rng.randint(500, 850),
+            defaults=rng.choice([0, 0, 0, 1, 2, 5]),
+            monthly_income=rng.choice([0, 4, 8, 25000, 60000, 95000, 150000])
+        )
+        for i in range(2000)
+    ]
+    for customer in rng.sample(customers, 50):
+        del customer["credit_report"]
+    amounts = [rng.choice([50000, 100000, 250001, 450000, 500000, 500001, 750000]) for _ in customers]
+    tenures = [rng.choice([6, 7, 12, 18, 24, 36, 48, 60, 72, 120]) for _ in customers]
+    load_book(customers)
+
+    decisions = assert_matches_tool(customers, amounts, tenures)
+
+    assert any(decision.get("eligible") for decision in decisions.values())
+    assert any(decision.get("eligible") is False for decision in decisions.values())
+    assert any("error" in decision for decision in decisions.values())
+
+def test_missing_credit_report_is_an_error(load_book):
+    customers = [make_customer(0), make_customer(1)]
+    del customers[1]["credit_report"]
+    load_book(customers)
+
+    decisions = assert_matches_tool(customers, [500000, 500000], [36, 36])
+
+    assert decisions["CUST-0000000"]["eligible"] is True
+    assert decisions["CUST-0000001"] == {"error": "An error occurred"}
+
+def test_zero_income_is_an_error(load_book):
+    customers = [make_customer(0, monthly_income=0)]
+    load_book(customers)
+
+    decisions = assert_matches_tool(customers, [500000], [36])
+
+    assert decisions["CUST-0000000"] == {"error": "An error occurred"}
+
+def test_amount_at_cap(load_book):
+    customers = [make_customer(0), make_customer(1), make_customer(2)]
+    load_book(customers)
+
+    # Every product lends up to 500000; anything above it, even within the same lakh, is rejected
+    decisions = assert_matches_tool(customers, [500000, 499999, 500001], [36, 36, 36])
+
+    at_cap, below_cap, above_cap = (decisions[customer["customer_id"]] for customer in customers)
+    assert at_cap["eligible"] is True and at_cap["max_approved_amount"] == 500000
+    assert below_cap["eligible"] is True and below_cap["requested_amount"] == 500000
+    assert above_cap["eligible"] is False and above_cap["max_approved_amount"] == 500000
+    assert above_cap["rejection_reasons"] == ["Requested amount of Rs.500001 is more than the maximum loanable amount"]
+
+@pytest.mark.parametrize("tenure", [0, 6, 7, 120])
+def test_tenure_outside_product_range(load_book, tenure):
+    customers = [make_customer(0)]
+    load_book(customers)
+
+    decisions = assert_matches_tool(customers, [300000], [tenure])
+
+    assert decisions["CUST-0000000"]["eligible"] is False
+    assert decisions["CUST-0000000"]["rejection_reasons"] == [f"Requested tenure of {tenure} months is not available."]
+
+def test_low_credit_score_gets_no_products(load_book):
+    customers = [make_customer(0, credit_score=599), make_customer(1, credit_score=600)]
+    load_book(customers)
+
+    decisions = assert_matches_tool(customers, [300000, 300000], [24, 24])
+
+    assert decisions["CUST-0000000"]["max_approved_amount"] == 0
+    assert decisions["CUST-0000000"]["rejection_reasons"] == ["Credit score 599 is below minimum threshold of 600"]
+    assert decisions["CUST-0000001"]["eligible"] is True